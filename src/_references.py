@@ -3,10 +3,20 @@ from dataclasses import dataclass
 ONLY_DRIVES = False
 
 SOURCE_DATA_FOLDER = '../data/source/'
+CACHE_DATA_FOLDER = '../data/cache/'
 
 NAMES_FILE = SOURCE_DATA_FOLDER + 'Edge_Names_With_Nodes.csv'
 ROUTES_FILE = SOURCE_DATA_FOLDER + 'Bus_Routes.csv'
 STOPS_FILE = SOURCE_DATA_FOLDER + 'Bus_Stops.csv'
-NODES_FILE = SOURCE_DATA_FOLDER + ('nodes_all.csv' if not ONLY_DRIVES else 'nodes_drive.csv')
-EDGES_FILE = SOURCE_DATA_FOLDER + ('edges_all.csv' if not ONLY_DRIVES else 'edges_drive.csv')
+# Source files of the network variants: (nodes file, edges file)
+NETWORK_VARIANTS = {
+    'all': (SOURCE_DATA_FOLDER + 'nodes_all.csv', SOURCE_DATA_FOLDER + 'edges_all.csv'),
+    'drive': (SOURCE_DATA_FOLDER + 'nodes_drive.csv', SOURCE_DATA_FOLDER + 'edges_drive.csv'),
+}
+# The variant loaded by default, see Dataset(variant=...)
+NETWORK_VARIANT = 'drive' if ONLY_DRIVES else 'all'
+NODES_FILE, EDGES_FILE = NETWORK_VARIANTS[NETWORK_VARIANT]
 TRAFFIC_DATA_FILE = SOURCE_DATA_FOLDER + 'MDOT_SHA_Annual_Average_Daily_Traffic_Baltimore.csv'
+
+# (min_lat, max_lat, min_lon, max_lon) of the analysed area
+BOUNDING_BOX = (39.18, 39.33, -76.71, -76.45)
@@ -0,0 +1,4 @@
+"""
+Reproducible benchmarks of the pipeline on synthetic networks in the schemas of the source files.
+Run from the src folder: python -m benchmark --sizes 10000 100000 --output ../target/benchmark.json
+"""
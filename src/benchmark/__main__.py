@@ -0,0 +1,33 @@
+import argparse
+
+from benchmark.suite import DEFAULT_SIZES, compare_results, load_results, run_benchmark, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description="Time the pipeline on synthetic cities.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="edge rows of every run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', choices=('exact', 'approx'), default='approx')
+    parser.add_argument('--epsilon', type=float, default=0.05)
+    parser.add_argument('--skip', nargs='*', default=[], help="stages to leave out")
+    parser.add_argument('--compact', action='store_true', help="load the dataset in its compact mode")
+    parser.add_argument('--output', default='../target/benchmark.json')
+    parser.add_argument('--compare', help="a previous result file to compare with")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f"Benchmarking {size} edges...")
+        results.append(run_benchmark(size, seed=args.seed, mode=args.mode, epsilon=args.epsilon, skip=args.skip,
+                                     compact=args.compact))
+        for name, seconds in results[-1]['stages'].items():
+            print(f"  {name:<28}{seconds:10.3f} s")
+        save_results(results, args.output)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        print(compare_results(load_results(args.compare), results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import geopandas as gpd
+import networkit as nk
+import numpy as np
+import pandas as pd
+
+from benchmark.synthetic import write_synthetic_city
+from data import read_geo
+from data.dataset import Dataset
+from data.loader import load_sets
+from data.traffic import TrafficSet
+from data.transit import TransitSet
+from graph.road_network import draw_traffic_map
+from model.metrics import _build_networkit_graph, _metric_tasks, topsis_evaluate
+
+# Sizes (edge rows) of the default benchmark runs
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000, 5_000_000)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(edges: int, folder: Optional[str] = None, seed: int = 0, mode: str = 'approx',
+                  epsilon: float = 0.05, delta: float = 0.1, closeness_epsilon: float = 0.05,
+                  skip: List[str] = (), compact: bool = False) -> Dict:
+    """
+    Time every stage of the pipeline on a synthetic city with about the given number of edge rows.
+    Nothing is read from or written to the cache, so every stage does its full work.
+    :param folder: where the synthetic source files are written, a temporary folder by default
+    :param mode: the centrality mode, see calculate_metrics; 'exact' is only practical for small sizes
+    :param skip: names of the stages to leave out, e.g. the centralities on the largest sizes
+    :param compact: load the dataset and the transit set in their compact mode
+    :return: the run description with the seconds of every stage under 'stages'
+    """
+    stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(name: str):
+        start = time.perf_counter()
+        yield
+        stages[name] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = folder or temporary
+        with stage('generate'):
+            paths = write_synthetic_city(folder, edges, seed)
+
+        if 'read_geo' not in skip:
+            with stage('read_geo'):
+                read_geo(paths['edges'], ['u', 'v', 'key'],
+                         converter=(lambda data: gpd.GeoSeries.from_wkt(data['geometry'])))
+        with stage('dataset_init'):
+            dataset = Dataset(bbox=None, cache=False, nodes_file=paths['nodes'], edges_file=paths['edges'],
+                              compact=compact)
+        with stage('dataset_load'):
+            dataset.load()
+        with stage('traffic_init'):
+            traffic = TrafficSet(paths['traffic'])
+        with stage('transit_init'):
+            transit = TransitSet(paths['stops'], paths['routes'], compact=compact)
+            transit.load()
+        if 'load_sets' not in skip:
+            with stage('load_sets'):
+                load_sets(bbox=None, cache=False, compact=compact, nodes_file=paths['nodes'],
+                          edges_file=paths['edges'], traffic_file=paths['traffic'], stops_file=paths['stops'],
+                          routes_file=paths['routes'])
+        with stage('build_node_traffic_dict'):
+            traffic.build_node_traffic_dict(lambda record: record.aadt())
+
+        with stage('build_networkit_graph'):
+            graph = _build_networkit_graph(dataset, cache=False)
+        scores = {}
+        for name, (function, params) in _metric_tasks(mode, epsilon, delta, closeness_epsilon).items():
+            if name in skip:
+                continue
+            with stage(name):
+                result = function(dataset, graph, **params)
+            scores[name] = (result[0] if isinstance(result, tuple) else result) or {}
+
+        if 'topsis_evaluate' not in skip and scores:
+            metrics = pd.DataFrame({name: pd.Series(values, dtype=np.float64) for name, values in scores.items()})
+            with stage('topsis_evaluate'):
+                topsis_evaluate(metrics.dropna(axis=1, how='all'), as_array=True)
+
+        if 'draw_traffic_map' not in skip:
+            with stage('draw_traffic_map'):
+                draw_traffic_map(dataset, traffic, lambda record: record.aadt()).get_root().render()
+
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'threads': nk.getMaxNumberOfThreads(),
+        'seed': seed,
+        'mode': mode,
+        'epsilon': epsilon,
+        'edges': dataset.edge_count,
+        'nodes': dataset.node_count,
+        'compact': compact,
+        'dataset_bytes': dataset.memory_usage(),
+        'stages': stages,
+    }
+
+
+def save_results(results: List[Dict], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline: List[Dict], current: List[Dict]) -> pd.DataFrame:
+    """
+    Compare two benchmark result files run by run (matched by edge count) and stage by stage.
+    :return: the seconds of both runs and their ratio (current / baseline, above 1 is a slowdown)
+    """
+    rows = []
+    baseline_runs = {run['edges']: run for run in baseline}
+    for run in current:
+        previous = baseline_runs.get(run['edges'])
+        if previous is None:
+            continue
+        for name, seconds in run['stages'].items():
+            before = previous['stages'].get(name)
+            rows.append({'edges': run['edges'], 'stage': name, 'baseline': before, 'current': seconds,
+                         'ratio': seconds / before if before else np.nan})
+    return pd.DataFrame(rows, columns=['edges', 'stage', 'baseline', 'current', 'ratio'])
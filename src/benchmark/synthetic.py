@@ -0,0 +1,153 @@
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from _references import BOUNDING_BOX, EDGES_FILE, NODES_FILE, ROUTES_FILE, STOPS_FILE, TRAFFIC_DATA_FILE
+
+# Highway types of the synthetic roads with their probability, lanes and maxspeed values
+HIGHWAYS = ('residential', 'tertiary', 'secondary', 'primary', 'motorway', 'service', 'footway')
+HIGHWAY_WEIGHTS = (0.45, 0.15, 0.1, 0.08, 0.02, 0.1, 0.1)
+LANES = ('', '1', '2', '3', "['2', '3']")
+MAXSPEEDS = ('', '25 mph', '30 mph', '35 mph', '55 mph', "['25 mph', '35 mph']")
+
+# Rows of the source edge table per grid cell: two road segments, most of them two-way (two rows)
+EDGES_PER_CELL = 3.6
+ONEWAY_SHARE = 0.2
+PARALLEL_SHARE = 0.01
+TRAFFIC_YEARS = range(2014, 2023)
+ROUTE_NAMES = ('22', '26', '31', '54', '91', 'BL', 'GR', 'OR', 'PK', 'RD')
+
+
+def _wkt_points(x: np.ndarray, y: np.ndarray) -> pd.Series:
+    return 'POINT (' + pd.Series(x).astype(str) + ' ' + pd.Series(y).astype(str) + ')'
+
+
+def _node_set(values: np.ndarray, width: np.ndarray) -> pd.Series:
+    """Format groups of node ids like '{1, 2}', leaving records without nodes empty."""
+    text = pd.Series(values[:, 0]).astype(str)
+    for column in range(1, values.shape[1]):
+        text = text.where(width <= column, text + ', ' + pd.Series(values[:, column]).astype(str))
+    return ('{' + text + '}').where(width > 0, '')
+
+
+def synthetic_city(edges: int, seed: int = 0,
+                   bbox: Tuple[float, float, float, float] = BOUNDING_BOX) -> Dict[str, pd.DataFrame]:
+    """
+    Generate the source tables of a city road network with about the given number of edge rows.
+    The nodes form a jittered grid inside bbox, connected to their right and upper neighbors like OSMnx exports:
+    two-way roads have a row per direction (the second one 'reversed'), and a few roads have parallel edges.
+    :return: the tables by file name, in the schemas of the files in _references
+    """
+    rng = np.random.default_rng(seed)
+    side = max(int(np.ceil(np.sqrt(edges / EDGES_PER_CELL))), 2)
+    min_lat, max_lat, min_lon, max_lon = bbox
+    row, column = np.divmod(np.arange(side * side), side)
+    y = min_lat + (row + rng.uniform(-0.3, 0.3, len(row)) + 0.5) * (max_lat - min_lat) / side
+    x = min_lon + (column + rng.uniform(-0.3, 0.3, len(row)) + 0.5) * (max_lon - min_lon) / side
+    ids = 10_000_000 + rng.choice(side * side * 10, size=side * side, replace=False).astype(np.int64)
+
+    # Road segments to the right and upper neighbors
+    cells = np.arange(side * side)
+    right = cells[column < side - 1]
+    up = cells[row < side - 1]
+    a = np.concatenate([right, up])
+    b = np.concatenate([right + 1, up + side])
+    segments = len(a)
+    highway = rng.choice(HIGHWAYS, size=segments, p=HIGHWAY_WEIGHTS)
+    oneway = rng.random(segments) < ONEWAY_SHARE
+    lanes = rng.choice(LANES, size=segments)
+    maxspeed = rng.choice(MAXSPEEDS, size=segments)
+    names = pd.Series(np.where(np.arange(segments) < len(right), row[a], column[a] + side)).map(
+        lambda k: f"Road {k}").to_numpy(dtype=object)
+    bridge = np.where(rng.random(segments) < 0.01, 'yes', '')
+    ref = np.where(highway == 'motorway', 'I 695', '')
+    length = np.hypot((x[a] - x[b]) * 86_000, (y[a] - y[b]) * 111_000)
+
+    # One row per direction, the reverse direction of two-way roads marked as reversed
+    forward = np.arange(segments)
+    backward = np.flatnonzero(~oneway)
+    parallel = rng.choice(segments, size=int(segments * PARALLEL_SHARE), replace=False)
+    segment = np.concatenate([forward, backward, parallel])
+    is_reversed = np.concatenate([np.zeros(segments, bool), np.ones(len(backward), bool),
+                                  np.zeros(len(parallel), bool)])
+    key = np.concatenate([np.zeros(segments + len(backward), np.int64), np.ones(len(parallel), np.int64)])
+    start = np.where(is_reversed, b[segment], a[segment])
+    end = np.where(is_reversed, a[segment], b[segment])
+    middle_x = (x[start] + x[end]) / 2 + rng.normal(0, 1e-5, len(segment))
+    middle_y = (y[start] + y[end]) / 2 + rng.normal(0, 1e-5, len(segment))
+    geometry = ('LINESTRING (' + pd.Series(x[start]).astype(str) + ' ' + pd.Series(y[start]).astype(str) + ', ' +
+                pd.Series(middle_x).astype(str) + ' ' + pd.Series(middle_y).astype(str) + ', ' +
+                pd.Series(x[end]).astype(str) + ' ' + pd.Series(y[end]).astype(str) + ')')
+
+    table_edges = pd.DataFrame({
+        'u': ids[start], 'v': ids[end], 'key': key,
+        'osmid': 100_000_000 + segment, 'access': '', 'highway': highway[segment], 'lanes': lanes[segment],
+        'maxspeed': maxspeed[segment], 'name': names[segment], 'oneway': oneway[segment], 'ref': ref[segment],
+        'reversed': is_reversed, 'length': np.round(length[segment], 3), 'geometry': geometry,
+        'junction': '', 'bridge': bridge[segment], 'width': '', 'tunnel': '', 'service': '',
+    })
+
+    degree = np.bincount(np.concatenate([a, b]), minlength=side * side)
+    table_nodes = pd.DataFrame({
+        'osmid': ids, 'y': y, 'x': x,
+        'highway': np.where(rng.random(len(ids)) < 0.1, 'traffic_signals', ''), 'ref': '',
+        'street_count': degree, 'junction': '', 'railway': '', 'geometry': _wkt_points(x, y),
+    })
+
+    # Traffic stations, each recording one or two start nodes and one end node
+    stations = max(len(ids) // 200, 100)
+    width = rng.choice([0, 1, 2], size=stations, p=[0.1, 0.6, 0.3])
+    table_traffic = pd.DataFrame({
+        'GlobalID': [f"{{{i:08X}-0000-0000-0000-000000000000}}" for i in range(stations)],
+        'GIS Object ID': np.arange(stations),
+        'Station ID': [f"B{i:05d}" for i in range(stations)],
+        'node start': _node_set(rng.choice(ids, size=(stations, 2)), width),
+        'node(s) end': _node_set(rng.choice(ids, size=(stations, 1)), np.ones(stations, np.int64)),
+    })
+    base = rng.lognormal(9, 1, stations)
+    for prefix, factor in (('AADT', 1.0), ('AAWDT', 1.1)):
+        for year in TRAFFIC_YEARS:
+            table_traffic[f"{prefix} {year}"] = np.round(base * factor * rng.uniform(0.9, 1.1, stations))
+        table_traffic[f"{prefix} (Current)"] = np.round(base * factor)
+
+    table_routes = pd.DataFrame({
+        'Route_Numb': ROUTE_NAMES, 'Route_Name': [f"Route {name}" for name in ROUTE_NAMES],
+        'Route_Type': 'Local', 'Shape__Length': rng.uniform(0.05, 0.3, len(ROUTE_NAMES)),
+    })
+    stops = max(len(ids) // 50, 50)
+    riders_on = rng.integers(0, 500, stops)
+    riders_off = rng.integers(0, 500, stops)
+    served = rng.choice(list(ROUTE_NAMES) + ['CityLink BLUE', 'CityLink GREEN'], size=(stops, 2))
+    table_stops = pd.DataFrame({
+        'X': rng.uniform(min_lon, max_lon, stops), 'Y': rng.uniform(min_lat, max_lat, stops),
+        'stop_name': [f"Stop {i}" for i in range(stops)], 'Rider_On': riders_on, 'Rider_Off': riders_off,
+        'Rider_Total': riders_on + riders_off, 'Stop_Rider': riders_on + riders_off,
+        'Routes_Ser': pd.Series(served[:, 0]) + ',' + pd.Series(served[:, 1]), 'Mode': 'Bus',
+        'Shelter': np.where(rng.random(stops) < 0.3, 'Yes', 'No'), 'County': 'Baltimore City',
+        'stop_id': np.arange(stops),
+    })
+
+    return {
+        os.path.basename(NODES_FILE): table_nodes,
+        os.path.basename(EDGES_FILE): table_edges,
+        os.path.basename(TRAFFIC_DATA_FILE): table_traffic,
+        os.path.basename(ROUTES_FILE): table_routes,
+        os.path.basename(STOPS_FILE): table_stops,
+    }
+
+
+def write_synthetic_city(folder: str, edges: int, seed: int = 0,
+                         bbox: Optional[Tuple[float, float, float, float]] = BOUNDING_BOX) -> Dict[str, str]:
+    """
+    Write the synthetic source files into folder.
+    :return: the file paths, keyed 'nodes', 'edges', 'traffic', 'routes' and 'stops'
+    """
+    os.makedirs(folder, exist_ok=True)
+    tables = synthetic_city(edges, seed, bbox)
+    paths = {}
+    for name, file in zip(('nodes', 'edges', 'traffic', 'routes', 'stops'), tables):
+        paths[name] = os.path.join(folder, file)
+        tables[file].to_csv(paths[name], index=False)
+    return paths
@@ -1,23 +1,99 @@
 # ------------------ Helper Functions ------------------
-from typing import Optional, Callable, Union, List, Any, Dict
+import os
+from typing import Optional, Callable, Union, List, Any, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from pandas import DataFrame
 from geopandas import GeoDataFrame
 from tqdm import tqdm
 
+from data.instrument import count
+
 
 def read_geo(
         file_path: str, index_columns: Union[str, List[str]] = None,
         value_filter: Callable[[pd.DataFrame], bool] = None,
-        converter: Callable[[pd.DataFrame], Any] = None
-) -> GeoDataFrame:
+        converter: Callable[[pd.DataFrame], Any] = None,
+        columns: List[str] = None, chunksize: int = None, dtype: Dict[str, Any] = None
+) -> Union[GeoDataFrame, DataFrame]:
+    """
+    Read a csv file into a GeoDataFrame, with the geometry column built by converter,
+    or into a DataFrame keeping the columns as text when there is no converter.
+    :param columns: only read these columns (besides the index), missing ones are ignored
+    :param chunksize: stream the file in chunks of this many rows, filtering every chunk as it is read,
+                      so the memory scales with the kept rows instead of the file size
+    :param dtype: dtypes declared up front by column name, e.g. 'category' for enumerated tags,
+                  missing columns are ignored
+    """
     index_columns = index_columns if isinstance(index_columns, list) else [index_columns]
-    df = pd.read_csv(file_path, index_col=index_columns, low_memory=False)
-    if value_filter is not None:
-        df = df[value_filter(df)]
-    return gpd.GeoDataFrame(df, geometry=converter(df))
+    usecols = None
+    if columns is not None:
+        wanted = set(index_columns) | set(columns)
+        usecols = (lambda name: name in wanted)
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    if chunksize is None:
+        df = pd.read_csv(file_path, index_col=index_columns, usecols=usecols, dtype=dtype, low_memory=False)
+        count(f"{name}.rows_read", len(df))
+        if value_filter is not None:
+            df = df[value_filter(df)]
+    else:
+        chunks, rows = _read_chunks(file_path, index_columns, usecols, dtype, chunksize, value_filter)
+        count(f"{name}.rows_read", rows)
+        text = _mixed_text_columns(chunks)
+        if text:
+            # The dtypes are inferred per chunk, so a column with text in some chunks only (e.g. a number tag
+            # with a few list values) is read again as text, which is what a whole read infers for it
+            count(f"{name}.columns_reread", len(text))
+            chunks, _ = _read_chunks(file_path, index_columns, usecols, {**(dtype or {}), **dict.fromkeys(text, str)},
+                                     chunksize, value_filter)
+        df = _concat_chunks(chunks)
+    count(f"{name}.rows_kept", len(df))
+    return gpd.GeoDataFrame(df, geometry=converter(df)) if converter is not None else df
+
+
+def _read_chunks(file_path: str, index_columns: List[str], usecols, dtype: Optional[Dict[str, Any]], chunksize: int,
+                 value_filter: Optional[Callable[[pd.DataFrame], bool]]) -> Tuple[List[DataFrame], int]:
+    """The filtered chunks of the file and the number of rows read."""
+    chunks, rows = [], 0
+    for chunk in pd.read_csv(file_path, index_col=index_columns, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        rows += len(chunk)
+        chunks.append(chunk[value_filter(chunk)] if value_filter is not None else chunk)
+    return chunks, rows
+
+
+def _mixed_text_columns(chunks: List[DataFrame]) -> List[str]:
+    """The columns holding text in some chunks and only numbers, flags or missing values in others."""
+    if len(chunks) < 2:
+        return []
+    mixed = []
+    for column in chunks[0].columns:
+        text = {pd.api.types.infer_dtype(chunk[column], skipna=True) in ('string', 'mixed', 'mixed-integer')
+                for chunk in chunks}
+        if len(text) > 1:
+            mixed.append(column)
+    return mixed
+
+
+def _concat_chunks(chunks: List[DataFrame]) -> DataFrame:
+    """
+    Concatenate the chunks, keeping the categorical columns categorical
+    over the union of the categories of all chunks, sorted like the ones of a whole read.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+    for column in chunks[0].columns:
+        if all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks):
+            # a chunk without any value of the column has empty categories of object dtype
+            categories = [chunk[column].cat.categories for chunk in chunks if len(chunk[column].cat.categories)]
+            if not categories:
+                continue
+            union = categories[0].append(categories[1:]).unique().sort_values()
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(union)
+    return pd.concat(chunks)
 
 
 def load(
@@ -27,6 +103,7 @@ def load(
     table: Dict[Any, Any] = {}
     for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc=desc):
         table[idx] = converter(row)
+    count(f"load.{desc.strip('| ').lower()}", len(table))
     return table
 
 
@@ -42,3 +119,33 @@ def safe_float(value) -> Optional[float]:
         return float(value) if pd.notna(value) else None
     except ValueError:
         return None
+
+
+def csr_group(size: int, keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Group values by key into (pointer, values) arrays, so group k is values[ptr[k]:ptr[k + 1]]."""
+    ptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=ptr[1:])
+    return ptr, values[np.argsort(keys, kind='stable')]
+
+
+def bool_array(series: pd.Series, true_values=('TRUE', 'YES', '1', '-1')) -> np.ndarray:
+    """Convert a flag column (bool, 'TRUE'/'FALSE', 'yes'/'no', ...) into a bool array."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=bool)
+    return series.astype(str).str.strip().str.upper().isin(true_values).to_numpy()
+
+
+def number_array(series: pd.Series, default: float, dtype=np.float64) -> np.ndarray:
+    """Convert a numeric column into a typed array, taking the first number of list values like "['2', '3']"."""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any():
+        extracted = series.astype(str).str.extract(r'(-?\d+(?:\.\d+)?)', expand=False)
+        values = values.fillna(pd.to_numeric(extracted, errors='coerce'))
+    return values.fillna(default).to_numpy(dtype=dtype)
+
+
+def object_array(series: pd.Series) -> np.ndarray:
+    """Convert a column into an object array, with missing values as None."""
+    values = series.to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    return values
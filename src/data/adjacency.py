@@ -0,0 +1,91 @@
+from typing import Tuple
+
+import numpy as np
+
+from data import csr_group
+
+
+class Adjacency:
+    """
+    Compressed sparse row index of the network, built once from the edge arrays.
+
+    The edge rows are directed as in OSMnx exports: every row is one travelling direction ("arc") from u to v,
+    and a two-way road has a row per direction (the second one marked reversed), so every row yields exactly one arc.
+    All nodes and edges are given by their array positions.
+    """
+
+    def __init__(self, node_count: int, u: np.ndarray, v: np.ndarray):
+        valid = (u >= 0) & (v >= 0)
+
+        self._node_count = node_count
+        self.arc_edge = np.flatnonzero(valid)
+        self.arc_src = u[valid]
+        self.arc_dst = v[valid]
+
+        self._out_ptr, self._out_arcs = csr_group(node_count, self.arc_src, np.arange(len(self.arc_edge)))
+        self._in_ptr, self._in_arcs = csr_group(node_count, self.arc_dst, np.arange(len(self.arc_edge)))
+
+        # incident edges, recorded once at each end (self loops only once)
+        edge_ids = np.flatnonzero(valid)
+        loops = u[valid] == v[valid]
+        ends = np.concatenate([u[valid], v[valid][~loops]])
+        self._edge_ptr, self._edges = csr_group(node_count, ends, np.concatenate([edge_ids, edge_ids[~loops]]))
+
+        # distinct undirected neighbours
+        a = np.concatenate([u[valid], v[valid]])
+        b = np.concatenate([v[valid], u[valid]])
+        size = np.int64(max(node_count, 1))
+        pairs = np.unique(a[a != b] * size + b[a != b])
+        self._neighbor_ptr, self._neighbors = csr_group(node_count, pairs // size, pairs % size)
+
+    @property
+    def node_count(self) -> int:
+        return self._node_count
+
+    @property
+    def arc_count(self) -> int:
+        return len(self.arc_edge)
+
+    def out_arcs(self, node: int) -> np.ndarray:
+        """Arcs leaving the node, as positions into arc_src/arc_dst/arc_edge."""
+        return self._out_arcs[self._out_ptr[node]:self._out_ptr[node + 1]]
+
+    def in_arcs(self, node: int) -> np.ndarray:
+        """Arcs entering the node, as positions into arc_src/arc_dst/arc_edge."""
+        return self._in_arcs[self._in_ptr[node]:self._in_ptr[node + 1]]
+
+    def out_edges(self, node: int) -> np.ndarray:
+        """Edges that can be travelled away from the node."""
+        return self.arc_edge[self.out_arcs(node)]
+
+    def in_edges(self, node: int) -> np.ndarray:
+        """Edges that can be travelled towards the node."""
+        return self.arc_edge[self.in_arcs(node)]
+
+    def successors(self, node: int) -> np.ndarray:
+        """Nodes reachable from the node by a single arc."""
+        return self.arc_dst[self.out_arcs(node)]
+
+    def predecessors(self, node: int) -> np.ndarray:
+        """Nodes reaching the node by a single arc."""
+        return self.arc_src[self.in_arcs(node)]
+
+    def edges(self, node: int) -> np.ndarray:
+        """Edges incident to the node regardless of direction."""
+        return self._edges[self._edge_ptr[node]:self._edge_ptr[node + 1]]
+
+    def neighbors(self, node: int) -> np.ndarray:
+        """Distinct nodes sharing an edge with the node regardless of direction."""
+        return self._neighbors[self._neighbor_ptr[node]:self._neighbor_ptr[node + 1]]
+
+    def degree(self) -> np.ndarray:
+        """Number of incident edges of every node."""
+        return np.diff(self._edge_ptr)
+
+    def csr(self, direction: str = 'out') -> Tuple[np.ndarray, np.ndarray]:
+        """Raw (pointer, arcs) arrays of the 'out' or 'in' arcs, for vectorized traversals."""
+        if direction == 'out':
+            return self._out_ptr, self._out_arcs
+        if direction == 'in':
+            return self._in_ptr, self._in_arcs
+        raise ValueError("Invalid direction parameter")
@@ -0,0 +1,139 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Any, Dict
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame
+from pandas import DataFrame
+
+from _references import CACHE_DATA_FOLDER
+from data.instrument import count
+
+# Bump when the parsing of the source files or the arrays derived from them change, so old caches are dropped.
+CACHE_VERSION = 3
+# Keys kept per cache name, see cached()
+CACHE_ENTRIES = 4
+
+_DIGESTS_FILE = CACHE_DATA_FOLDER + 'digests.json'
+_digests_lock = threading.Lock()
+
+
+def _load_digests() -> dict:
+    try:
+        with open(_DIGESTS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a source file, memorized by (size, mtime) so large files are hashed only once."""
+    stat = os.stat(file_path)
+    path = os.path.abspath(file_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+
+    digests = _load_digests()
+    record = digests.get(path)
+    if record and record['stamp'] == stamp:
+        return record['sha256']
+
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+
+    os.makedirs(CACHE_DATA_FOLDER, exist_ok=True)
+    # reloaded, written aside and moved into place, as the source files may be hashed concurrently (see data.loader)
+    temporary = f"{_DIGESTS_FILE}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with _digests_lock:
+        digests = _load_digests()
+        digests[path] = {'stamp': stamp, 'sha256': sha.hexdigest()}
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(digests, f, indent=2)
+        os.replace(temporary, _DIGESTS_FILE)
+    return sha.hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    """Build a short stable key from source digests and loading parameters."""
+    payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def cached(name: str, key: str, suffix: str, builder: Callable[[], Any],
+           reader: Callable[[str], Any], writer: Callable[[Any, str], None]) -> Any:
+    """
+    Load an object from the cache file '<name>-<key><suffix>', or build and store it.
+    Up to CACHE_ENTRIES keys of every name are kept, so switching between parameter sets (bbox, compact mode,
+    network variant) does not rebuild; beyond that the least recently used ones are removed.
+    """
+    path = os.path.join(CACHE_DATA_FOLDER, f"{name}-{key}{suffix}")
+    if os.path.exists(path):
+        count('cache.hits')
+        obj = reader(path)
+        _touch(path)
+        return obj
+    count('cache.misses')
+
+    obj = builder()
+    try:
+        os.makedirs(CACHE_DATA_FOLDER, exist_ok=True)
+        writer(obj, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        _evict(name, suffix)
+    except ImportError as e:  # the storage backend is not available, keep working without cache
+        print(f"Cache disabled for {name}: {e}")
+    return obj
+
+
+def _touch(path: str):
+    """Mark a cache file as used, its modification time being the last use."""
+    try:
+        os.utime(path)
+    except OSError:  # removed meanwhile by another process
+        pass
+
+
+def _evict(name: str, suffix: str):
+    """Remove the least recently used caches of the name beyond CACHE_ENTRIES."""
+    entries = []
+    for entry in glob.glob(os.path.join(CACHE_DATA_FOLDER, f"{name}-*{suffix}")):
+        try:
+            entries.append((os.stat(entry).st_mtime_ns, entry))
+        except OSError:
+            pass
+    for _, stale in sorted(entries, reverse=True)[CACHE_ENTRIES:]:
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+
+
+def cached_geo(name: str, key: str, builder: Callable[[], GeoDataFrame]) -> GeoDataFrame:
+    """Load a GeoDataFrame from the GeoParquet cache, or build and store it."""
+    return cached(name, key, '.parquet', builder, gpd.read_parquet, (lambda df, path: df.to_parquet(path)))
+
+
+def cached_frame(name: str, key: str, builder: Callable[[], DataFrame]) -> DataFrame:
+    """Load a DataFrame from the Parquet cache, or build and store it."""
+    return cached(name, key, '.parquet', builder, pd.read_parquet, (lambda df, path: df.to_parquet(path)))
+
+
+def _write_arrays(arrays: Dict[str, np.ndarray], path: str):
+    with open(path, 'wb') as f:  # np.savez would append '.npz' to a plain path
+        np.savez(f, **arrays)
+
+
+def _read_arrays(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def cached_arrays(name: str, key: str, builder: Callable[[], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Load a dict of named NumPy arrays from an .npz cache, or build and store it."""
+    return cached(name, key, '.npz', builder, _read_arrays, _write_arrays)
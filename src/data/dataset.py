@@ -1,36 +1,294 @@
-import sys
+import math
+import re
+from collections.abc import Mapping
 from typing import Tuple
 
+import numpy as np
+
 from shapely.geometry.linestring import LineString
 from shapely.geometry.point import Point
 
 from _references import *
 from data import *
+from data.adjacency import Adjacency
+from data.cache import cache_key, cached_frame, cached_geo, file_digest
+from data.geometry import LineStore
+from data.instrument import count, deep_size, footprint, stage, timed
+from data.spatial import SpatialIndex
+
+
+# Columns read from the source files, besides the index columns
+NODE_COLUMNS = ['y', 'x', 'highway', 'ref', 'street_count', 'railway', 'geometry']
+EDGE_COLUMNS = ['osmid', 'access', 'highway', 'name', 'lanes', 'maxspeed', 'oneway', 'ref', 'reversed',
+                'length', 'geometry', 'junction', 'bridge', 'width', 'tunnel', 'service']
+
+# Dtypes declared up front in the compact mode, with categoricals for the enumerated OSM tags
+NODE_COMPACT_DTYPES = {
+    'osmid': np.int64, 'y': np.float64, 'x': np.float64, 'street_count': 'Int16',
+    'highway': 'category', 'ref': 'category', 'railway': 'category',
+}
+EDGE_COMPACT_DTYPES = {
+    'u': np.int64, 'v': np.int64, 'key': np.int16, 'length': np.float32,
+    'access': 'category', 'highway': 'category', 'name': 'category', 'lanes': 'category', 'maxspeed': 'category',
+    'oneway': 'category', 'ref': 'category', 'reversed': 'category', 'junction': 'category', 'bridge': 'category',
+    'width': 'category', 'tunnel': 'category', 'service': 'category',
+}
+# Flag columns stored as bool in the compact mode, with the values taken as true
+EDGE_COMPACT_FLAGS = {'oneway': ('TRUE', 'YES', '1', '-1'), 'reversed': ('TRUE', 'YES', '1', '-1'), 'bridge': ('YES',)}
+
+# Rows parsed at a time when streaming the source files
+READ_CHUNK_SIZE = 200_000
+
+MPH = 0.44704  # meters per second
+# Speeds (mph) assumed for edges without maxspeed, by highway type
+DEFAULT_SPEEDS = {
+    'motorway': 55, 'motorway_link': 35, 'trunk': 50, 'trunk_link': 30,
+    'primary': 40, 'primary_link': 30, 'secondary': 35, 'secondary_link': 25,
+    'tertiary': 30, 'tertiary_link': 25, 'residential': 25, 'unclassified': 25,
+    'living_street': 10, 'service': 15, 'road': 25, 'busway': 25,
+    'cycleway': 10, 'footway': 3, 'path': 3, 'pedestrian': 3, 'steps': 2, 'track': 10,
+}
+DEFAULT_SPEED = 25
+
+# Tags of the ways left out of the drive network, after the 'drive' filter of OSMnx
+DRIVE_EXCLUDED_HIGHWAYS = {
+    'abandoned', 'bridleway', 'bus_guideway', 'construction', 'corridor', 'cycleway', 'elevator', 'escalator',
+    'footway', 'no', 'path', 'pedestrian', 'planned', 'platform', 'proposed', 'raceway', 'razed', 'service', 'steps',
+    'track',
+}
+DRIVE_EXCLUDED_SERVICES = {'alley', 'driveway', 'emergency_access', 'parking', 'parking_aisle', 'private'}
+DRIVE_EXCLUDED_ACCESS = {'private'}
+
+
+def nodes_cache_key(nodes_file: str, bbox: Optional[Tuple[float, float, float, float]], compact: bool,
+                    variant: str = NETWORK_VARIANT) -> str:
+    """Cache key of the node table of the variant read from nodes_file with these parameters."""
+    return cache_key(file_digest(nodes_file), tuple(bbox) if bbox is not None else None, variant,
+                     NODE_COLUMNS, compact)
+
+
+def edges_cache_key(edges_file: str, nodes_key: str) -> str:
+    """Cache key of the edge table read from edges_file, for the node table of nodes_key."""
+    return cache_key(file_digest(edges_file), nodes_key, EDGE_COLUMNS)
+
+
+def read_node_table(nodes_file: str, bbox: Optional[Tuple[float, float, float, float]],
+                    chunksize: Optional[int] = READ_CHUNK_SIZE, compact: bool = False) -> GeoDataFrame:
+    """Read the nodes inside bbox (all nodes when None) from nodes_file."""
+    if bbox is None:
+        value_filter = None
+    else:
+        min_lat, max_lat, min_lon, max_lon = bbox
+        value_filter = (lambda data: (data['y'] >= min_lat) & (data['y'] <= max_lat) &
+                                     (data['x'] >= min_lon) & (data['x'] <= max_lon))
+    return read_geo(
+        nodes_file, 'osmid', value_filter,
+        converter=(lambda data: gpd.GeoSeries.from_wkt(data['geometry'])),
+        columns=NODE_COLUMNS, chunksize=chunksize, dtype=NODE_COMPACT_DTYPES if compact else None
+    )
+
+
+def read_edge_table(edges_file: str, node_index: pd.Index, chunksize: Optional[int] = READ_CHUNK_SIZE,
+                    compact: bool = False) -> DataFrame:
+    """
+    Read the edges between the nodes of node_index from edges_file.
+    The geometry column is kept as WKT text, which Dataset.load parses straight into its coordinate store.
+    """
+    edges = read_geo(
+        edges_file, ['u', 'v', 'key'],
+        (lambda data: (data.index.get_level_values(0).isin(node_index)) &
+                      (data.index.get_level_values(1).isin(node_index))),
+        columns=EDGE_COLUMNS, chunksize=chunksize, dtype=EDGE_COMPACT_DTYPES if compact else None
+    )
+    if compact:
+        for name, true_values in EDGE_COMPACT_FLAGS.items():
+            if name in edges.columns:
+                edges[name] = bool_array(edges[name], true_values)
+    return edges
 
 
 class Dataset:
 
-    def __init__(self):
-        self._table_nodes = read_geo(
-            NODES_FILE, 'osmid',
-            (lambda data: (data['y'] >= 39.18) & (data['y'] <= 39.33) &
-                          (data['x'] >= -76.71) & (data['x'] <= -76.45)),
-            converter=(lambda data: gpd.GeoSeries.from_wkt(data['geometry']))
-        )
-        self._table_edges = read_geo(
-            EDGES_FILE, ['u', 'v', 'key'],
-            (lambda data: (data.index.get_level_values(0).isin(self._table_nodes.index)) &
-                          (data.index.get_level_values(1).isin(self._table_nodes.index))),
-            converter=(lambda data: gpd.GeoSeries.from_wkt(data['geometry']))
-        )
+    def __init__(self, bbox: Optional[Tuple[float, float, float, float]] = BOUNDING_BOX,
+                 cache: bool = True, chunksize: Optional[int] = READ_CHUNK_SIZE,
+                 nodes_file: Optional[str] = None, edges_file: Optional[str] = None, compact: bool = False,
+                 variant: str = NETWORK_VARIANT):
+        """
+        :param bbox: (min_lat, max_lat, min_lon, max_lon) of the nodes to keep, None to keep all nodes.
+        :param cache: load the parsed tables from the binary cache in CACHE_DATA_FOLDER,
+                      which is rebuilt automatically once the source files change.
+        :param chunksize: rows parsed at a time when reading the source files, None to read them at once.
+        :param nodes_file: the node source file, in the schema of NODES_FILE, by default the one of the variant.
+        :param edges_file: the edge source file, in the schema of EDGES_FILE, by default the one of the variant.
+        :param compact: declare the column dtypes up front, keep the enumerated tags as categoricals and the flags
+                        as bools, and downcast the numeric arrays (see footprint() for the saving).
+        :param variant: the network variant, a key of NETWORK_VARIANTS. To compare the variants in one process,
+                        load 'all' and take the drive network from it with view('drive'), which shares the nodes.
+        """
+        self._setup(bbox, chunksize, nodes_file, edges_file, compact, variant)
+        nodes_key = nodes_cache_key(self._nodes_file, self._bbox, compact, variant)
+        edges_key = edges_cache_key(self._edges_file, nodes_key)
+        with stage('dataset.read_nodes'):
+            read_nodes = (lambda: read_node_table(self._nodes_file, self._bbox, chunksize, compact))
+            self._table_nodes = cached_geo(f"nodes_{variant}", nodes_key, read_nodes) if cache else read_nodes()
+        with stage('dataset.read_edges'):
+            read_edges = (lambda: read_edge_table(self._edges_file, self._table_nodes.index, chunksize, compact))
+            self._table_edges = cached_frame(f"edges_{variant}", edges_key, read_edges) if cache else read_edges()
+        self._fingerprint = edges_key
+
+    def _setup(self, bbox, chunksize, nodes_file, edges_file, compact, variant):
+        if variant not in NETWORK_VARIANTS:
+            raise ValueError(f"Unknown network variant {variant!r}, expected one of {sorted(NETWORK_VARIANTS)}")
+        self._bbox = tuple(bbox) if bbox is not None else None
+        self._chunksize = chunksize
+        self._nodes_file = nodes_file or NETWORK_VARIANTS[variant][0]
+        self._edges_file = edges_file or NETWORK_VARIANTS[variant][1]
+        self._compact = compact
+        self._variant = variant
+        self._views = {}
 
         self._traffic = None
+        self._edge_table = None
         self._nodes = None
         self._edges = None
-
+        self._adjacency = None
+        self._spatial = None
+        self._reverse = None
+
+    @classmethod
+    def from_tables(cls, table_nodes: GeoDataFrame, table_edges: DataFrame, fingerprint: str,
+                    bbox: Optional[Tuple[float, float, float, float]] = BOUNDING_BOX, compact: bool = False,
+                    nodes_file: Optional[str] = None, edges_file: Optional[str] = None,
+                    variant: str = NETWORK_VARIANT) -> 'Dataset':
+        """
+        Build a dataset from tables read elsewhere (see read_node_table and read_edge_table), e.g. by the loader.
+        :param fingerprint: the key of the edge table, see edges_cache_key; it keys the caches derived from it.
+        The other parameters describe how the tables were read.
+        """
+        dataset = cls.__new__(cls)
+        dataset._setup(bbox, READ_CHUNK_SIZE, nodes_file, edges_file, compact, variant)
+        dataset._table_nodes = table_nodes
+        dataset._table_edges = table_edges
+        dataset._fingerprint = fingerprint
+        return dataset
+
+    @timed('dataset.load')
     def load(self):
-        self._nodes = load("|  NODES", self._table_nodes, (lambda row: Node(self, row)))
-        self._edges = load("|  EDGES", self._table_edges, (lambda row: Edge(self, row)))
+        """Convert the tables into typed column arrays, which back the lightweight Node and Edge views."""
+        # free-text tags repeat a lot (street names, route refs), in the compact mode they are kept as categoricals
+        text = pd.Categorical if self._compact else object_array
+        nodes = self._table_nodes
+        self._nodes = {
+            'id': nodes.index.to_numpy(dtype=np.int64),
+            'x': nodes['x'].to_numpy(dtype=np.float64),
+            'y': nodes['y'].to_numpy(dtype=np.float64),
+            'street_count': number_array(_column(nodes, 'street_count'), 0, np.int16 if self._compact else np.int32),
+            'highway': pd.Categorical(_column(nodes, 'highway')),
+            'ref': text(_column(nodes, 'ref')),
+            'railway': pd.Categorical(_column(nodes, 'railway')),
+        }
+
+        edges = self._table_edges
+        u = edges.index.get_level_values(0).to_numpy(dtype=np.int64)
+        v = edges.index.get_level_values(1).to_numpy(dtype=np.int64)
+        u_index, v_index = nodes.index.get_indexer(u), nodes.index.get_indexer(v)
+        xy = np.column_stack([self._nodes['x'], self._nodes['y']])
+        self._edges = {
+            'u': u,
+            'v': v,
+            'key': edges.index.get_level_values(2).to_numpy(dtype=np.int64),
+            'u_index': u_index,
+            'v_index': v_index,
+            'osmid': object_array(_column(edges, 'osmid')),
+            'access': pd.Categorical(_column(edges, 'access')),
+            'highway': pd.Categorical(_column(edges, 'highway')),
+            'name': text(_column(edges, 'name')),
+            'lanes': number_array(_column(edges, 'lanes'), 1, np.int8 if self._compact else np.int16),
+            'maxspeed': object_array(_column(edges, 'maxspeed')),
+            'oneway': bool_array(_column(edges, 'oneway')),
+            'ref': text(_column(edges, 'ref')),
+            'reversed': bool_array(_column(edges, 'reversed')),
+            'bridge': bool_array(_column(edges, 'bridge'), ('YES',)),
+            'junction': pd.Categorical(_column(edges, 'junction')),
+            'width': text(_column(edges, 'width')),
+            'tunnel': pd.Categorical(_column(edges, 'tunnel')),
+            'service': pd.Categorical(_column(edges, 'service')),
+            'length': number_array(_column(edges, 'length'), 0, np.float32 if self._compact else np.float64),
+        }
+        # the WKT text is parsed straight into the coordinate store and dropped from the table, whose shapely
+        # geometries are only built when it is used (see table_edges)
+        geometry = LineStore.from_wkt(edges['geometry'].to_numpy(dtype=object))
+        self._edges['has_geometry'] = geometry.sizes >= 2
+        # edges without a geometry of their own are straight lines between their end nodes
+        self._edges['geometry'] = geometry.fill(xy[u_index], xy[v_index])
+        self._table_edges = edges.assign(geometry=None)
+        self._adjacency = Adjacency(self.node_count, self._edges['u_index'], self._edges['v_index'])
+        count('dataset.nodes', self.node_count)
+        count('dataset.edges', self.edge_count)
+        count('dataset.arcs', self._adjacency.arc_count)
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """The spatial index of nodes and edges, built on first use."""
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self._nodes['x'], self._nodes['y'], self.edge_geometry)
+        return self._spatial
+
+    def nearest_nodes(self, lon, lat) -> List['Node']:
+        """Snap every coordinate to its nearest node."""
+        index, _ = self.spatial.nearest_nodes(np.atleast_1d(lon), np.atleast_1d(lat))
+        return [Node(self, i) for i in index]
+
+    def nearest_edges(self, lon, lat) -> List['Edge']:
+        """Snap every coordinate to its nearest edge."""
+        index, _ = self.spatial.nearest_edges(np.atleast_1d(lon), np.atleast_1d(lat))
+        return [Edge(self, i) for i in index]
+
+    @property
+    def bbox(self) -> Optional[Tuple[float, float, float, float]]:
+        return self._bbox
+
+    @property
+    def variant(self) -> str:
+        return self._variant
+
+    def variant_mask(self, variant: str) -> np.ndarray:
+        """
+        The edges of this dataset that belong to the given variant, as a bool array aligned with Edge.index.
+        The drive network of an 'all' dataset keeps the edges whose ways all pass the drive filter
+        (DRIVE_EXCLUDED_HIGHWAYS, DRIVE_EXCLUDED_SERVICES and DRIVE_EXCLUDED_ACCESS).
+        """
+        if variant == self._variant:
+            return np.ones(self.edge_count, dtype=bool)
+        if variant == 'drive' and self._variant == 'all':
+            excluded = (_tag_matches(self._edges['highway'], DRIVE_EXCLUDED_HIGHWAYS) |
+                        _tag_matches(self._edges['service'], DRIVE_EXCLUDED_SERVICES) |
+                        _tag_matches(self._edges['access'], DRIVE_EXCLUDED_ACCESS))
+            return ~excluded & (np.asarray(self._edges['highway'].codes) >= 0)
+        raise ValueError(f"The {variant!r} network cannot be taken from the {self._variant!r} network")
+
+    def view(self, variant: str) -> 'Dataset':
+        """
+        The given variant of the network as a NetworkView of this loaded dataset, built once and kept,
+        e.g. dataset.view('drive') of an 'all' dataset. The dataset itself is returned for its own variant.
+        """
+        if variant == self._variant:
+            return self
+        if variant not in self._views:
+            if self._nodes is None:
+                raise ValueError("The dataset has to be loaded before taking a view of it")
+            self._views[variant] = NetworkView(self, variant, np.flatnonzero(self.variant_mask(variant)))
+        return self._views[variant]
+
+    @property
+    def fingerprint(self) -> str:
+        """Fingerprint of the loaded network, changes whenever the source files or filters change."""
+        return self._fingerprint
+
+    @property
+    def adjacency(self) -> Adjacency:
+        """The CSR adjacency index shared by graph builders, traversals and rendering."""
+        return self._adjacency
 
     @property
     def table_nodes(self) -> GeoDataFrame:
@@ -38,82 +296,332 @@ class Dataset:
 
     @property
     def table_edges(self) -> GeoDataFrame:
-        return self._table_edges
+        """
+        The edge table, whose geometry column is built on first use: from the WKT text before load,
+        from the coordinate store after it (None for the edges without a geometry of their own).
+        """
+        if self._edge_table is None:
+            edges = self._table_edges
+            if self._edges is None:
+                geometry = gpd.GeoSeries.from_wkt(edges['geometry'])
+            else:
+                lines = np.where(self._edges['has_geometry'], self.edge_geometry.to_shapely(), None)
+                geometry = gpd.GeoSeries(lines, index=edges.index)
+            self._edge_table = gpd.GeoDataFrame(edges, geometry=geometry)
+        return self._edge_table
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes['id'])
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges['u'])
+
+    def node_column(self, name: str) -> Union[np.ndarray, pd.Categorical]:
+        """Get a typed column array of all nodes, aligned with Node.index."""
+        return self._nodes[name]
+
+    def edge_column(self, name: str) -> Union[np.ndarray, pd.Categorical, LineStore]:
+        """Get a typed column array of all edges, aligned with Edge.index."""
+        return self._edges[name]
+
+    @property
+    def edge_geometry(self) -> LineStore:
+        """The geometries of all edges as a flat coordinate buffer with offsets, aligned with Edge.index."""
+        return self._edges['geometry']
+
+    def reverse_edges(self) -> np.ndarray:
+        """
+        Position of the row for the opposite direction of the same road, -1 for one-way roads.
+        Two-way roads are exported as a row per direction; the rows are paired by their swapped end nodes and osmid.
+        """
+        if self._reverse is None:
+            two_way = np.flatnonzero(~np.asarray(self._edges['oneway'], dtype=bool))
+            rows = pd.DataFrame({
+                'a': self._edges['u_index'][two_way], 'b': self._edges['v_index'][two_way],
+                'osmid': pd.Series(self._edges['osmid'][two_way], dtype=object).astype(str), 'position': two_way,
+            })
+            # parallel roads between the same nodes are paired in order
+            rows['rank'] = rows.groupby(['a', 'b', 'osmid']).cumcount()
+            opposite = rows.rename(columns={'a': 'b', 'b': 'a', 'position': 'reverse'})
+            pairs = rows.merge(opposite, on=['a', 'b', 'osmid', 'rank'], how='inner')
+            pairs = pairs[pairs['position'] != pairs['reverse']]
+            reverse = np.full(self.edge_count, -1, dtype=np.int64)
+            reverse[pairs['position'].to_numpy()] = pairs['reverse'].to_numpy()
+            self._reverse = reverse
+        return self._reverse
+
+    def node_indexer(self, keys) -> np.ndarray:
+        """Map node ids to their array positions, -1 for unknown ids."""
+        return self._table_nodes.index.get_indexer(keys)
+
+    def edge_speeds(self) -> np.ndarray:
+        """Speed of every edge in m/s, from maxspeed (mph) or else the default speed of its highway type."""
+        highway = pd.Series(np.asarray(self._edges['highway'], dtype=object)).astype(str).str.extract(
+            r'([a-z_]+)', expand=False)
+        defaults = highway.map(DEFAULT_SPEEDS).fillna(DEFAULT_SPEED).to_numpy(dtype=np.float64)
+        speeds = number_array(pd.Series(self._edges['maxspeed']), np.nan)
+        return np.where(np.isnan(speeds) | (speeds <= 0), defaults, speeds) * MPH
+
+    def edge_travel_times(self) -> np.ndarray:
+        """Free-flow travel time of every edge in seconds."""
+        return self._edges['length'] / self.edge_speeds()
 
     @property
     def nodes(self) -> List['Node']:
-        return list(self._nodes.values())
+        return [Node(self, i) for i in range(self.node_count)]
 
     def node(self, key: int) -> Optional['Node']:
-        return self._nodes.get(key)
+        try:
+            return Node(self, self._table_nodes.index.get_loc(key))
+        except KeyError:
+            return None
 
     @property
     def edges(self) -> List['Edge']:
-        return list(self._edges.values())
+        return [Edge(self, i) for i in range(self.edge_count)]
+
+    def edge(self, key: Tuple[int, int, int]) -> Optional['Edge']:
+        try:
+            return Edge(self, self._table_edges.index.get_loc(key))
+        except KeyError:
+            return None
+
+    @property
+    def compact(self) -> bool:
+        return self._compact
+
+    def footprint(self) -> pd.Series:
+        """Bytes of every column of the tables and the column arrays, see compare_footprint()."""
+        return footprint({'table_nodes': self._table_nodes, 'table_edges': self._table_edges,
+                          'nodes': self._nodes or {}, 'edges': self._edges or {}})
+
+    def memory_usage(self) -> int:
+        """Bytes held by the tables, the column arrays and the adjacency index, counted deeply."""
+        return deep_size([self._table_nodes, self._table_edges, self._edge_table, self._nodes, self._edges,
+                          self._adjacency])
+
+
+class NetworkView(Dataset):
+    """
+    A variant of a loaded dataset (e.g. the drive network of the 'all' network) as a filtered view of it:
+    the node table and node arrays are the parent's, so node positions line up across the variants,
+    and an edge column is only taken from the parent's arrays once it is used.
+    Nodes outside the variant keep their positions, without edges (see node_mask).
+    """
+
+    def __init__(self, parent: Dataset, variant: str, edge_positions: np.ndarray):
+        """
+        :param parent: the loaded dataset
+        :param edge_positions: sorted positions of the edges of the variant in the parent
+        """
+        self._setup(parent.bbox, parent._chunksize, parent._nodes_file, parent._edges_file, parent.compact, variant)
+        self._parent = parent
+        self._edge_positions = edge_positions
+        self._table_nodes = parent.table_nodes
+        self._table_edges = None  # taken from the parent's table on first use
+        self._fingerprint = cache_key(parent.fingerprint, variant)
+        self._nodes = parent._nodes
+        self._edges = _TakenColumns(parent._edges, edge_positions)
+        self._adjacency = Adjacency(self.node_count, self._edges['u_index'], self._edges['v_index'])
+
+    def load(self):
+        """Nothing to load, the columns come from the parent."""
+
+    @property
+    def parent(self) -> Dataset:
+        return self._parent
+
+    @property
+    def edge_positions(self) -> np.ndarray:
+        """Position in the parent of every edge of the view."""
+        return self._edge_positions
+
+    @property
+    def node_mask(self) -> np.ndarray:
+        """The nodes with at least one edge in the view."""
+        mask = np.zeros(self.node_count, dtype=bool)
+        for ends in (self._edges['u_index'], self._edges['v_index']):
+            mask[ends[ends >= 0]] = True
+        return mask
+
+    @property
+    def table_edges(self) -> GeoDataFrame:
+        if self._table_edges is None:
+            self._table_edges = self._parent.table_edges.iloc[self._edge_positions]
+        return self._table_edges
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_positions)
 
     def edge(self, key: Tuple[int, int, int]) -> Optional['Edge']:
-        return self._edges.get(key)
+        try:
+            position = self._parent._table_edges.index.get_loc(key)
+        except KeyError:
+            return None
+        index = int(np.searchsorted(self._edge_positions, position))
+        if index < len(self._edge_positions) and self._edge_positions[index] == position:
+            return Edge(self, index)
+        return None
+
+    def footprint(self) -> pd.Series:
+        """Bytes of the edge columns taken so far, the node columns being the parent's."""
+        return footprint({'edges': {'positions': self._edge_positions, **self._edges.taken}})
+
+    def memory_usage(self) -> int:
+        """Bytes held by the view on top of its parent."""
+        return deep_size([self._edge_positions, self._edges.taken, self._table_edges, self._adjacency])
+
+
+class _TakenColumns(Mapping):
+    """The columns of a subset of rows, each taken from the full column on first access."""
+
+    def __init__(self, columns: Dict[str, Any], positions: np.ndarray):
+        self._columns = columns
+        self._positions = positions
+        self.taken = {}
+
+    def __getitem__(self, name: str):
+        if name not in self.taken:
+            column = self._columns[name]
+            self.taken[name] = column.take(self._positions) if isinstance(column, LineStore) \
+                else column[self._positions]
+        return self.taken[name]
 
-    def memory_usage(self):
-        return sum([sys.getsizeof(obj) for obj in [self._bus_routes, self._bus_stops, self._nodes, self._edges]])
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+def _tag_matches(column: pd.Categorical, values) -> np.ndarray:
+    """Rows whose tag, or any value of a list tag like "['service', 'residential']", is one of values."""
+    tokens = pd.Series(np.asarray(column.categories, dtype=object)).astype(str).str.findall(r'[a-z_]+')
+    matches = tokens.map(lambda names: any(name in values for name in names)).to_numpy(dtype=bool)
+    return np.append(matches, False)[column.codes]  # code -1 (missing) picks the appended False
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _value(column: Union[np.ndarray, pd.Categorical], index: int, default=None):
+    value = column[index]
+    return default if value is None or (isinstance(value, float) and math.isnan(value)) else value
 
 
 class Node:
     """Represents a geographic node in the transportation network."""
+    __slots__ = ('_parent', '_index')
 
-    def __init__(self, parent: Dataset, data: pd.DataFrame):
+    def __init__(self, parent: Dataset, index: int):
         self._parent = parent
-        self._data = data
+        self._index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Node) and other._parent is self._parent and other._index == self._index
+
+    def __hash__(self) -> int:
+        return hash(self._index)
+
+    def __repr__(self) -> str:
+        return f"Node({self.id})"
+
+    def _get(self, name: str, default=None):
+        return _value(self._parent.node_column(name), self._index, default)
+
+    @property
+    def index(self) -> int:
+        """Position of the node in the column arrays of the dataset."""
+        return self._index
 
     @property
     def id(self) -> int:
         """Get the unique OpenStreetMap ID."""
-        return self._data.name
+        return int(self._parent.node_column('id')[self._index])
 
     @property
     def type(self) -> Optional[str]:
         """Indicates the type of road or path."""
-        return self._data.get('highway', None)
+        return self._get('highway')
 
     @property
     def ref(self) -> Optional[str]:
         """A reference code for the road, path, or other infrastructure."""
-        return self._data.get('ref', None)
+        return self._get('ref')
 
     @property
     def street_count(self) -> Optional[int]:
         """The number of streets (or ways) connected to a particular node. It can indicate intersections or endpoints."""
-        return self._data.get('street_count', None)
+        return int(self._parent.node_column('street_count')[self._index])
 
     @property
     def railway(self) -> Optional[str]:
         """Specifies if the node or way is part of a railway."""
-        return self._data.get('railway', None)
+        return self._get('railway')
 
     @property
     def edges(self) -> List['Edge']:
         """Get all edges connected to this node."""
-        return [edge for edge in self._parent.edges if edge.node_u == self or edge.node_v == self]
+        return [Edge(self._parent, i) for i in self._parent.adjacency.edges(self._index)]
+
+    @property
+    def out_edges(self) -> List['Edge']:
+        """Get all edges that can be travelled away from this node."""
+        return [Edge(self._parent, i) for i in self._parent.adjacency.out_edges(self._index)]
+
+    @property
+    def in_edges(self) -> List['Edge']:
+        """Get all edges that can be travelled towards this node."""
+        return [Edge(self._parent, i) for i in self._parent.adjacency.in_edges(self._index)]
+
+    @property
+    def neighbors(self) -> List['Node']:
+        """Get all nodes sharing an edge with this node."""
+        return [Node(self._parent, i) for i in self._parent.adjacency.neighbors(self._index)]
 
     @property
     def point(self) -> Point:
-        return Point(self._data['x'], self._data['y'])
+        return Point(self._parent.node_column('x')[self._index], self._parent.node_column('y')[self._index])
 
 
 class Edge:
     """Represents a road segment with traffic analytics."""
+    __slots__ = ('_parent', '_index')
 
-    def __init__(self, parent: Dataset, frame: pd.DataFrame):
+    def __init__(self, parent: Dataset, index: int):
         self._parent = parent
-        self._data = frame
+        self._index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Edge) and other._parent is self._parent and other._index == self._index
+
+    def __hash__(self) -> int:
+        return hash(self._index)
+
+    def __repr__(self) -> str:
+        return f"Edge({self.u}, {self.v}, {self.key})"
+
+    def _get(self, name: str, default=None):
+        return _value(self._parent.edge_column(name), self._index, default)
+
+    @property
+    def index(self) -> int:
+        """Position of the edge in the column arrays of the dataset."""
+        return self._index
 
     @property
     def u(self) -> int:
-        return self._data.name[0]
+        return int(self._parent.edge_column('u')[self._index])
 
     @property
     def v(self) -> int:
-        return self._data.name[1]
+        return int(self._parent.edge_column('v')[self._index])
 
     @property
     def node_u(self) -> Node:
@@ -125,79 +633,82 @@ class Edge:
 
     @property
     def key(self) -> int:
-        return self._data.name[2]
+        return int(self._parent.edge_column('key')[self._index])
 
     @property
     def osm_id(self) -> List[int]:
         # a single int or json int array
-        if isinstance(self._data['osmid'], int):
-            return [self._data['osmid']]
-        return self._data['osmid']
+        value = self._get('osmid')
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [int(n) for n in re.findall(r'\d+', value)]
+        return [int(value)]
 
     @property
     def access(self) -> str:
-        return self._data.get('access', '')
+        return self._get('access', '')
 
     @property
     def highway(self) -> str:
-        return self._data.get('highway', '')
+        return self._get('highway', '')
 
     @property
     def name(self) -> str:
-        return self._data['name']
+        return self._get('name')
 
     @property
     def lanes(self) -> int:
-        return self._data.get('lanes', 1)
+        return int(self._parent.edge_column('lanes')[self._index])
 
     @property
     def speed_limit(self) -> Optional[str]:
-        return self._data.get('maxspeed', None)
+        return self._get('maxspeed')
 
     @property
     def oneway(self) -> bool:
         """Indicates whether the road is one-way (yes or no).
          It may also include specific flow directions like -1 for reversed direction."""
-        return self._data['oneway'] == 'TRUE'
+        return bool(self._parent.edge_column('oneway')[self._index])
 
     @property
     def ref(self) -> Optional[str]:
-        return self._data.get('ref', None)
+        return self._get('ref')
 
     @property
     def reversed(self) -> bool:
-        return self._data['reversed'] == 'TRUE'
+        return bool(self._parent.edge_column('reversed')[self._index])
 
     @property
     def bridge(self) -> bool:
         """Indicates whether the segment is a bridge (yes or no).
          It may also include additional details about the bridge."""
-        return self._data['bridge'] == 'yes'
+        return bool(self._parent.edge_column('bridge')[self._index])
 
     @property
     def junction(self) -> Optional[str]:
         """Provides details about the type of junction."""
-        return self._data.get('junction', None)
+        return self._get('junction')
 
     @property
     def width(self) -> Optional[str]:
         """The width of the road or pathway in meters."""
-        return self._data.get('width', None)
+        return self._get('width')
 
     @property
     def tunnel(self) -> Optional[str]:
-        return self._data.get('tunnel', None)
+        return self._get('tunnel')
 
     @property
     def service(self) -> Optional[str]:
         """Describes the type of service associated with the road."""
-        return self._data.get('service', None)
+        return self._get('service')
 
     @property
     def length(self) -> float:
-        return self._data.get('length', 0)
+        return float(self._parent.edge_column('length')[self._index])
 
     @property
     def geometry(self) -> LineString:
-        """Get WKT representation of the edge geometry."""
-        return self._data['geometry']
+        """Get the edge geometry, materialized from the coordinate store of the dataset."""
+        return self._parent.edge_geometry.geometry(self._index)
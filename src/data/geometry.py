@@ -0,0 +1,237 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry.linestring import LineString
+
+EARTH_RADIUS = 6371008.8  # meters
+
+# Every byte that cannot be part of a number, mapped to a space when reading WKT coordinates
+_WKT_SEPARATORS = bytes(c if chr(c) in '0123456789.-+eE' else ord(' ') for c in range(256))
+
+
+def haversine(lon0, lat0, lon1, lat1) -> np.ndarray:
+    """Great-circle distance in meters between arrays of points given in degrees."""
+    lon0, lat0, lon1, lat1 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lon0, lat0, lon1, lat1))
+    a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class LineStore:
+    """
+    Line geometries kept GeoArrow-style: one flat (n, 2) buffer of (lon, lat) coordinates
+    and offsets, so line i is coordinates[offsets[i]:offsets[i + 1]].
+    All operations work on the whole buffer at once; shapely objects are only created on request.
+    """
+
+    def __init__(self, coordinates: np.ndarray, offsets: np.ndarray):
+        self.coordinates = np.ascontiguousarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @staticmethod
+    def from_shapely(geometries, start: Optional[np.ndarray] = None,
+                     end: Optional[np.ndarray] = None) -> 'LineStore':
+        """
+        Flatten an array of LineStrings, with the coordinates read in one vectorized call.
+        :param start: (n, 2) coordinates used with end as a straight line where a geometry is missing or degenerate
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        coordinates, owner = shapely.get_coordinates(geometries, return_index=True)
+        return LineStore._from_owners(coordinates, owner, len(geometries), start, end)
+
+    @staticmethod
+    def from_wkt(texts, start: Optional[np.ndarray] = None, end: Optional[np.ndarray] = None) -> 'LineStore':
+        """
+        Parse WKT LineStrings straight into a store, without creating a shapely object per line:
+        the texts are joined into one buffer, the coordinates of every line are counted from its commas
+        and all numbers are read in one pass. Missing texts (None, NaN) and LINESTRING EMPTY give empty lines.
+        :param start: (n, 2) coordinates used with end as a straight line where a geometry is missing or degenerate
+        """
+        strings = [text if isinstance(text, str) else '' for text in texts]
+        buffer = '\n'.join(strings).upper().encode('ascii')
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        breaks = np.flatnonzero(data == ord('\n'))
+        commas = np.bincount(np.searchsorted(breaks, np.flatnonzero(data == ord(','))), minlength=len(strings))
+        digits = np.bincount(np.searchsorted(breaks, np.flatnonzero((data >= ord('0')) & (data <= ord('9')))),
+                             minlength=len(strings))
+        sizes = np.where(digits > 0, commas + 1, 0)
+
+        numbers = buffer.replace(b'LINESTRING', b' ').replace(b'EMPTY', b' ').translate(_WKT_SEPARATORS)
+        values = np.fromstring(numbers, sep=' ') if sizes.any() else np.zeros(0)
+        if len(values) != 2 * sizes.sum():
+            raise ValueError("Only two-dimensional LINESTRING texts are supported")
+        owner = np.repeat(np.arange(len(strings)), sizes)
+        return LineStore._from_owners(values.reshape(-1, 2), owner, len(strings), start, end)
+
+    @staticmethod
+    def _from_owners(coordinates: np.ndarray, owner: np.ndarray, count: int, start: Optional[np.ndarray],
+                     end: Optional[np.ndarray]) -> 'LineStore':
+        """A store of count lines from their coordinates and the (sorted) line of every coordinate."""
+        sizes = np.bincount(owner, minlength=count)
+        if start is not None and end is not None:
+            missing = sizes < 2
+            if missing.any():
+                kept = ~missing[owner]
+                filled = np.column_stack([start[missing], end[missing]]).reshape(-1, 2)
+                coordinates = np.concatenate([coordinates[kept], filled])
+                owner = np.concatenate([owner[kept], np.repeat(np.flatnonzero(missing), 2)])
+                order = np.argsort(owner, kind='stable')
+                coordinates, owner = coordinates[order], owner[order]
+                sizes = np.bincount(owner, minlength=count)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return LineStore(coordinates, offsets)
+
+    def fill(self, start: np.ndarray, end: np.ndarray) -> 'LineStore':
+        """The store with every line of fewer than two coordinates replaced by the straight line from start to end."""
+        return LineStore._from_owners(self.coordinates, self.line_index(), len(self), start, end)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """Number of coordinates of every line."""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        return self.coordinates.nbytes + self.offsets.nbytes
+
+    def line_index(self) -> np.ndarray:
+        """The line of every coordinate."""
+        return np.repeat(np.arange(len(self)), self.sizes)
+
+    def geometry(self, index: int) -> Optional[LineString]:
+        """Materialize a single line, None when it has fewer than two coordinates."""
+        coordinates = self.coordinates[self.offsets[index]:self.offsets[index + 1]]
+        return LineString(coordinates) if len(coordinates) >= 2 else None
+
+    def to_shapely(self, coordinates: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Materialize all lines as an array of LineStrings (None where fewer than two coordinates).
+        :param coordinates: replacement coordinates aligned with the buffer, e.g. projected ones
+        """
+        coordinates = self.coordinates if coordinates is None else coordinates
+        result = np.full(len(self), None, dtype=object)
+        valid = self.sizes >= 2
+        if valid.any():
+            line = self.line_index()
+            keep = valid[line]
+            rank = np.cumsum(valid) - 1  # shapely expects consecutive line indices
+            result[valid] = shapely.linestrings(coordinates[keep], indices=rank[line[keep]])
+        return result
+
+    def take(self, indices: np.ndarray) -> 'LineStore':
+        """A store of the given lines, in the given order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        sizes = self.sizes[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        positions = np.repeat(self.offsets[indices] - offsets[:-1], sizes) + np.arange(offsets[-1])
+        return LineStore(self.coordinates[positions], offsets)
+
+    def segments(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Split all lines into their straight segments.
+        :return: (x0, y0, x1, y1, line), line being the position of the line every segment belongs to
+        """
+        line = self.line_index()
+        inner = line[1:] == line[:-1]  # consecutive coordinates of the same line form a segment
+        x, y = self.coordinates[:, 0], self.coordinates[:, 1]
+        return x[:-1][inner], y[:-1][inner], x[1:][inner], y[1:][inner], line[1:][inner]
+
+    def bounds(self) -> np.ndarray:
+        """(n, 4) array of (min_lon, min_lat, max_lon, max_lat) per line, NaN for empty lines."""
+        result = np.full((len(self), 4), np.nan)
+        filled = self.sizes > 0
+        if filled.any():
+            starts = self.offsets[:-1][filled]
+            result[filled, :2] = np.minimum.reduceat(self.coordinates, starts, axis=0)
+            result[filled, 2:] = np.maximum.reduceat(self.coordinates, starts, axis=0)
+        return result
+
+    def lengths(self) -> np.ndarray:
+        """Haversine length of every line in meters."""
+        x0, y0, x1, y1, line = self.segments()
+        return np.bincount(line, weights=haversine(x0, y0, x1, y1), minlength=len(self))
+
+    def midpoints(self) -> np.ndarray:
+        """(n, 2) coordinates of the point halfway along every line (by haversine length), NaN for empty lines."""
+        x0, y0, x1, y1, line = self.segments()
+        length = haversine(x0, y0, x1, y1)
+        result = np.full((len(self), 2), np.nan)
+        single = self.sizes == 1
+        result[single] = self.coordinates[self.offsets[:-1][single]]
+        if not len(line):
+            return result
+
+        # cumulative length along all segments; the half point of line k falls into the first of its segments
+        # whose cumulative end reaches the length before line k plus half of its length
+        cumulative = np.cumsum(length)
+        totals = np.bincount(line, weights=length, minlength=len(self))
+        before = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+        lines = np.unique(line)
+        first_segment = np.searchsorted(line, lines)
+        last_segment = np.searchsorted(line, lines, side='right') - 1
+        target = before[lines] + totals[lines] / 2
+        segment = np.clip(np.searchsorted(cumulative, target), first_segment, last_segment)
+        start = cumulative[segment] - length[segment]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(length[segment] > 0, (target - start) / length[segment], 0.5)
+        t = np.clip(t, 0, 1)
+        result[lines, 0] = x0[segment] + (x1[segment] - x0[segment]) * t
+        result[lines, 1] = y0[segment] + (y1[segment] - y0[segment]) * t
+        return result
+
+    def simplify(self, tolerance: float) -> 'LineStore':
+        """
+        Douglas-Peucker simplification with the tolerance in meters, run for all lines at once:
+        every round handles the open ranges of all lines together, keeping the farthest interior point
+        of every range beyond the tolerance and splitting the range there. End points are always kept.
+        """
+        coordinates = self.coordinates
+        # local equirectangular projection, precise enough for the perpendicular distances of short lines
+        lat0 = np.radians(np.nanmean(coordinates[:, 1])) if len(coordinates) else 0.0
+        x = np.radians(coordinates[:, 0]) * np.cos(lat0) * EARTH_RADIUS
+        y = np.radians(coordinates[:, 1]) * EARTH_RADIUS
+
+        keep = np.zeros(len(coordinates), dtype=bool)
+        filled = self.sizes > 0
+        keep[self.offsets[:-1][filled]] = True
+        keep[self.offsets[1:][filled] - 1] = True
+
+        start, end = self.offsets[:-1][self.sizes > 2], self.offsets[1:][self.sizes > 2] - 1
+        while len(start):
+            interior = end - start - 1
+            owner = np.repeat(np.arange(len(start)), interior)
+            point = np.repeat(start + 1 - np.concatenate([[0], np.cumsum(interior)[:-1]]), interior) + \
+                np.arange(interior.sum())
+            ax, ay = x[start][owner], y[start][owner]
+            dx, dy = x[end][owner] - ax, y[end][owner] - ay
+            px, py = x[point] - ax, y[point] - ay
+            # distance to the segment (not the infinite line), as GEOS does
+            squared = dx * dx + dy * dy
+            with np.errstate(invalid='ignore', divide='ignore'):
+                t = np.clip(np.where(squared > 0, (px * dx + py * dy) / squared, 0), 0, 1)
+            distance = np.hypot(px - t * dx, py - t * dy)
+
+            group_start = np.concatenate([[0], np.cumsum(interior)[:-1]])
+            farthest = np.maximum.reduceat(distance, group_start)
+            is_max = distance == farthest[owner]
+            # first interior point reaching the maximum of its range
+            candidates = np.flatnonzero(is_max)
+            _, first = np.unique(owner[candidates], return_index=True)
+            split_point = point[candidates[first]]
+
+            split = farthest > tolerance
+            keep[split_point[split]] = True
+            start = np.concatenate([start[split], split_point[split]])
+            end = np.concatenate([split_point[split], end[split]])
+            open_range = end - start > 1
+            start, end = start[open_range], end[open_range]
+
+        sizes = np.bincount(self.line_index()[keep], minlength=len(self))
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return LineStore(coordinates[keep], offsets)
@@ -0,0 +1,246 @@
+"""
+Stage timers, memory accounting and counters of a pipeline run.
+
+Instrumentation is off unless enable() is called or the PIPELINE_INSTRUMENT environment variable is set;
+while off, stage() returns a shared no-op context, timed() calls straight through and count() returns at once.
+"""
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_enabled = os.environ.get('PIPELINE_INSTRUMENT', '') not in ('', '0')
+_trace_memory = False
+_lock = threading.Lock()
+_local = threading.local()
+_stages: Dict[str, Dict[str, Any]] = {}
+_counters: Dict[str, float] = {}
+_started = time.time()
+_NO_STAGE = nullcontext()
+
+
+def enable(memory: bool = False):
+    """
+    Start recording stages and counters.
+    :param memory: also trace Python allocations with tracemalloc, for the allocation peak of every stage;
+                   this slows allocation-heavy code down noticeably, unlike the RSS accounting
+    """
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Drop everything recorded so far."""
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _started = time.time()
+
+
+def rss() -> Optional[int]:
+    """Resident set size of the process in bytes, None where it cannot be read."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of the process so far in bytes, None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Bytes held by an object and everything it references, counting NumPy buffers, pandas columns
+    (object values included) and containers; shared objects are counted once.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(deep_size(value, seen) for value in obj.ravel())
+        return size
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True, index=False))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, pd.Categorical):
+        return int(obj.nbytes) + deep_size(obj.categories, seen)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_size(value, seen) for value in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sys.getsizeof(obj) + deep_size(vars(obj), seen)
+    if hasattr(obj, 'nbytes'):  # geometry and extension arrays
+        try:
+            return int(obj.nbytes)
+        except TypeError:
+            pass
+    return sys.getsizeof(obj)
+
+
+def _stack() -> List[Dict[str, Any]]:
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def _record(name: str) -> Iterator[Dict[str, Any]]:
+    stack = _stack()
+    path = '/'.join([frame['path'] for frame in stack[-1:]] + [name])
+    frame = {'path': path, 'traced_peak': 0, 'traced_start': 0}
+    if _trace_memory:
+        frame['traced_start'] = tracemalloc.get_traced_memory()[0]
+        # fold the running peak into the enclosing stage before it is reset for this one
+        if stack:
+            stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    stack.append(frame)
+    rss_before = rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield frame
+    finally:
+        frame['seconds'] = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        stack.pop()
+        if _trace_memory:
+            frame['traced_peak'] = max(frame['traced_peak'], tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], frame['traced_peak'])
+        rss_after = rss()
+        with _lock:
+            record = _stages.setdefault(path, {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0})
+            record['calls'] += 1
+            record['seconds'] += frame['seconds']
+            record['cpu_seconds'] += cpu
+            record['rss_before'] = rss_before
+            record['rss_after'] = rss_after
+            record['rss_delta'] = rss_after - rss_before if rss_before is not None and rss_after is not None \
+                else None
+            record['peak_rss'] = peak_rss()
+            if _trace_memory:
+                # peak of the traced allocations above those alive when the stage started
+                peak = frame['traced_peak'] - frame['traced_start']
+                record['traced_peak'] = max(record.get('traced_peak', 0), peak)
+
+
+def stage(name: str):
+    """
+    Time a stage of the pipeline: with stage('dataset.load') as frame: ...
+    Stages nest into paths like 'metrics/pagerank' (per thread); repeated stages add up their calls and seconds.
+    The frame holds the 'seconds' of this call once the block exits, and is None while instrumentation is off.
+    """
+    if not _enabled:
+        return _NO_STAGE
+    return _record(name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator form of stage(), named after the function by default."""
+
+    def decorator(function: Callable) -> Callable:
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _record(label):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1):
+    """Add to a named counter, e.g. count('edges.rows_read', len(chunk))."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def report() -> Dict[str, Any]:
+    """The machine-readable record of the run: stages by path in the order they first finished, and counters."""
+    with _lock:
+        return {
+            'started': _started,
+            'finished': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'memory_traced': _trace_memory,
+            'peak_rss': peak_rss(),
+            'stages': {path: dict(record) for path, record in _stages.items()},
+            'counters': dict(_counters),
+        }
+
+
+def write_report(path: str = '../target/run_report.json') -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report(), f, indent=2, default=str)
+    return path
+
+
+def footprint(parts: Dict[str, Any]) -> pd.Series:
+    """Deep bytes of every column (and the index) of the given tables or dicts of column arrays, by (part, column)."""
+    sizes = {}
+    for part, obj in parts.items():
+        if isinstance(obj, pd.DataFrame):
+            sizes[(part, 'index')] = deep_size(obj.index)
+        for column, values in obj.items():
+            sizes[(part, str(column))] = deep_size(values)
+    return pd.Series(sizes, name='bytes', dtype=np.int64).rename_axis(['part', 'column'])
+
+
+def compare_footprint(before: pd.Series, after: pd.Series) -> pd.DataFrame:
+    """Put two footprints side by side with their ratio (after / before), totals in the last row."""
+    table = pd.DataFrame({'before': before, 'after': after})
+    table.loc[('total', ''), :] = table.sum()
+    table['ratio'] = table['after'] / table['before']
+    return table
@@ -0,0 +1,139 @@
+"""
+Concurrent loading of the source tables at startup.
+
+The tables are read on a pool as a small dependency graph: the edges are filtered by the node index, so their
+read starts once the nodes are read, while the traffic, stop and route tables are read alongside. Every set is
+built as soon as its tables are in, so a cold start takes about as long as the slowest chain
+(nodes, edges, dataset) instead of the sum of all reads.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from _references import (BOUNDING_BOX, NETWORK_VARIANT, NETWORK_VARIANTS, ROUTES_FILE, STOPS_FILE,
+                         TRAFFIC_DATA_FILE)
+from data.cache import cached_frame, cached_geo
+from data.dataset import (READ_CHUNK_SIZE, Dataset, edges_cache_key, nodes_cache_key, read_edge_table,
+                          read_node_table)
+from data.instrument import stage
+from data.traffic import TrafficSet, _load_traffic_data
+from data.transit import TransitSet, read_route_table, read_stop_table
+
+
+@dataclass
+class LoadedSets:
+    dataset: Dataset
+    traffic: TrafficSet
+    transit: TransitSet
+    # wall seconds of every task (the table reads and the set builds) and of the whole load under 'total'
+    timings: Dict[str, float]
+
+
+class _Task(NamedTuple):
+    requires: Tuple[str, ...]
+    function: Callable
+    # the positional arguments of function, from the results of the required tasks
+    arguments: Callable[[Dict[str, Any]], tuple]
+    # 'read' tasks run on the read pool (threads or processes), 'build' tasks on threads of this process
+    pool: str
+
+
+def _timed_call(name: str, function: Callable, *args) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    with stage(f"loader.{name}"):
+        result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _read_nodes(nodes_file: str, bbox, chunksize: Optional[int], compact: bool, cache: bool, variant: str):
+    key = nodes_cache_key(nodes_file, bbox, compact, variant)
+    read = (lambda: read_node_table(nodes_file, bbox, chunksize, compact))
+    return cached_geo(f"nodes_{variant}", key, read) if cache else read(), key
+
+
+def _read_edges(edges_file: str, node_index, nodes_key: str, chunksize: Optional[int], compact: bool, cache: bool,
+                variant: str):
+    key = edges_cache_key(edges_file, nodes_key)
+    read = (lambda: read_edge_table(edges_file, node_index, chunksize, compact))
+    return cached_frame(f"edges_{variant}", key, read) if cache else read(), key
+
+
+def _build_dataset(nodes, edges, bbox, compact: bool, nodes_file: str, edges_file: str, variant: str) -> Dataset:
+    (table_nodes, _), (table_edges, edges_key) = nodes, edges
+    dataset = Dataset.from_tables(table_nodes, table_edges, edges_key, bbox, compact, nodes_file, edges_file, variant)
+    dataset.load()
+    return dataset
+
+
+def _build_transit(table_bus_stops, table_bus_routes) -> TransitSet:
+    transit = TransitSet.from_tables(table_bus_stops, table_bus_routes)
+    transit.load()
+    return transit
+
+
+def _run(tasks: Dict[str, _Task], pools: Dict[str, Executor]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Run the tasks on their pools, each one as soon as the tasks it requires are done."""
+    results, timings = {}, {}
+    remaining = dict(tasks)
+    running = {}
+    try:
+        while remaining or running:
+            for name in [name for name, task in remaining.items() if all(r in results for r in task.requires)]:
+                task = remaining.pop(name)
+                future = pools[task.pool].submit(_timed_call, name, task.function, *task.arguments(results))
+                running[future] = name
+            if not running:
+                raise ValueError(f"Unresolvable task dependencies: {sorted(remaining)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timings[name] = future.result()
+    finally:
+        for future in running:
+            future.cancel()
+    return results, timings
+
+
+def load_sets(bbox: Optional[Tuple[float, float, float, float]] = BOUNDING_BOX, cache: bool = True,
+              chunksize: Optional[int] = READ_CHUNK_SIZE, compact: bool = False,
+              nodes_file: Optional[str] = None, edges_file: Optional[str] = None,
+              traffic_file: str = TRAFFIC_DATA_FILE, stops_file: str = STOPS_FILE, routes_file: str = ROUTES_FILE,
+              workers: Optional[int] = None, processes: bool = False, variant: str = NETWORK_VARIANT) -> LoadedSets:
+    """
+    Read all source tables concurrently and build the loaded Dataset, TrafficSet and TransitSet,
+    equal to Dataset(...).load(), TrafficSet(...) and TransitSet(...).load() with the same parameters.
+    :param workers: size of the read pool, one worker per table by default
+    :param processes: read the tables in worker processes rather than threads, which parallelizes the CSV parsing
+                      at the cost of sending the tables back; the reads are then missing from the instrument report
+    :param variant: the network variant, which picks the default node and edge files
+    """
+    bbox = tuple(bbox) if bbox is not None else None
+    nodes_file = nodes_file or NETWORK_VARIANTS[variant][0]
+    edges_file = edges_file or NETWORK_VARIANTS[variant][1]
+    tasks = {
+        'nodes': _Task((), _read_nodes, (lambda r: (nodes_file, bbox, chunksize, compact, cache, variant)),
+                       'read'),
+        'edges': _Task(('nodes',), _read_edges,
+                       (lambda r: (edges_file, r['nodes'][0].index, r['nodes'][1], chunksize, compact, cache,
+                                   variant)),
+                       'read'),
+        'traffic_table': _Task((), _load_traffic_data, (lambda r: (traffic_file,)), 'read'),
+        'stops': _Task((), read_stop_table, (lambda r: (stops_file, compact)), 'read'),
+        'routes': _Task((), read_route_table, (lambda r: (routes_file, compact)), 'read'),
+        'dataset': _Task(('nodes', 'edges'), _build_dataset,
+                         (lambda r: (r['nodes'], r['edges'], bbox, compact, nodes_file, edges_file, variant)),
+                         'build'),
+        'traffic': _Task(('traffic_table',), TrafficSet.from_table, (lambda r: (r['traffic_table'],)), 'build'),
+        'transit': _Task(('stops', 'routes'), _build_transit, (lambda r: (r['stops'], r['routes'])), 'build'),
+    }
+    reads = sum(task.pool == 'read' for task in tasks.values())
+    builds = len(tasks) - reads
+
+    start = time.perf_counter()
+    with stage('loader.total'), \
+            (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers or reads) as reader, \
+            ThreadPoolExecutor(max_workers=builds) as builder:
+        results, timings = _run(tasks, {'read': reader, 'build': builder})
+    timings['total'] = time.perf_counter() - start
+    return LoadedSets(results['dataset'], results['traffic'], results['transit'], timings)
@@ -0,0 +1,58 @@
+from typing import Tuple, List
+
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+
+from data.geometry import EARTH_RADIUS, LineStore
+
+
+class SpatialIndex:
+    """
+    Nearest-neighbour index over the nodes (KD-tree) and edge geometries (STR-tree) of a dataset.
+    Coordinates are projected onto a local equirectangular plane, so all distances are in meters.
+    All queries take arrays of longitudes and latitudes and answer for every point at once.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, edge_lines: LineStore = None):
+        self._lat0 = np.radians(np.mean(y)) if len(y) else 0.0
+        self._node_tree = cKDTree(self.project(x, y))
+        self._edge_lines = edge_lines
+        self._edge_tree = None
+
+    def project(self, lon, lat) -> np.ndarray:
+        """Project longitudes and latitudes (degrees) to local planar coordinates in meters."""
+        lon = np.radians(np.asarray(lon, dtype=np.float64))
+        lat = np.radians(np.asarray(lat, dtype=np.float64))
+        return np.column_stack([lon * np.cos(self._lat0) * EARTH_RADIUS, lat * EARTH_RADIUS])
+
+    def nearest_nodes(self, lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the position of the nearest node of every point, and the distance to it in meters."""
+        distance, index = self._node_tree.query(self.project(lon, lat))
+        return index, distance
+
+    def nodes_within(self, lon, lat, radius: float) -> List[np.ndarray]:
+        """Get the positions of all nodes within radius (meters) of every point."""
+        return [np.asarray(found, dtype=np.int64)
+                for found in self._node_tree.query_ball_point(self.project(lon, lat), radius)]
+
+    @property
+    def edge_tree(self) -> shapely.STRtree:
+        if self._edge_tree is None:
+            if self._edge_lines is None:
+                raise ValueError("No edge geometries are indexed")
+            # the projected lines are built straight from the coordinate buffer
+            coordinates = self._edge_lines.coordinates
+            projected = self._edge_lines.to_shapely(self.project(coordinates[:, 0], coordinates[:, 1]))
+            self._edge_tree = shapely.STRtree(projected)
+        return self._edge_tree
+
+    def nearest_edges(self, lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the position of the nearest edge of every point, and the distance to it in meters."""
+        points = shapely.points(self.project(lon, lat))
+        (source, target), distance = self.edge_tree.query_nearest(points, all_matches=False, return_distance=True)
+        index = np.full(len(points), -1, dtype=np.int64)
+        distances = np.full(len(points), np.inf)
+        index[source] = target
+        distances[source] = distance
+        return index, distances
@@ -2,10 +2,12 @@ import math
 from collections import defaultdict
 from typing import List, Union, Dict, Callable
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 from _references import TRAFFIC_DATA_FILE
+from data.instrument import count, stage
 
 
 class TrafficData:
@@ -69,19 +71,47 @@ class TrafficData:
         ]
 
 
-def _load_traffic_data() -> pd.DataFrame:
+def _load_traffic_data(file_path: str = TRAFFIC_DATA_FILE) -> pd.DataFrame:
     """加载并预处理数据"""
-    df = pd.read_csv(TRAFFIC_DATA_FILE, index_col='GlobalID', low_memory=False)
+    df = pd.read_csv(file_path, index_col='GlobalID', low_memory=False)
     df['node start'] = df['node start'].fillna('{}')
     df['node(s) end'] = df['node(s) end'].fillna('{}')
     return df
 
 
+TRAFFIC_METRICS = ('AADT', 'AAWDT')
+TRAFFIC_YEARS: List[Union[int, str]] = [*range(2014, 2023), 'current']
+
+
+def _column_name(metric: str, year: Union[int, str]) -> str:
+    return f"{metric} (Current)" if year == 'current' else f"{metric} {year}"
+
+
 class TrafficSet:
-    def __init__(self):
-        self.data = _load_traffic_data()
+    def __init__(self, file_path: str = TRAFFIC_DATA_FILE):
+        """
+        :param file_path: 流量数据文件，格式与 TRAFFIC_DATA_FILE 相同
+        """
+        with stage('traffic.init'):
+            self._setup(_load_traffic_data(file_path))
+
+    @classmethod
+    def from_table(cls, data: pd.DataFrame) -> 'TrafficSet':
+        """
+        由已读取的流量表构建（如数据加载器并发读取的表）
+        :param data: _load_traffic_data 的结果
+        """
+        traffic = cls.__new__(cls)
+        with stage('traffic.init'):
+            traffic._setup(data)
+        return traffic
+
+    def _setup(self, data: pd.DataFrame):
+        self.data = data
         self._data = [TrafficData(row) for _, row in
                       tqdm(self.data.iterrows(), total=self.data.shape[0], desc="|TRAFFIC")]
+        count('traffic.records', len(self._data))
+        self._node_matrix = None
 
     @property
     def records(self) -> List[TrafficData]:
@@ -95,6 +125,46 @@ class TrafficSet:
             return TrafficData(matches.iloc[0])
         return None
 
+    def record_nodes(self) -> pd.Series:
+        """解析所有记录的相关节点（一次性向量化处理），返回 {记录行号: node_id} 的展开序列"""
+        nodes = self.data['node start'].str.strip('{}') + ',' + self.data['node(s) end'].str.strip('{}')
+        nodes = nodes.str.split(',')
+        exploded = pd.Series(nodes.explode().str.strip().to_numpy(),
+                             index=np.repeat(np.arange(len(nodes)), nodes.str.len().to_numpy()))
+        exploded = exploded[exploded.str.isdigit().fillna(False).astype(bool)]
+        return exploded.astype(np.int64)
+
+    def node_traffic_matrix(self) -> pd.DataFrame:
+        """
+        构建节点 × (指标, 年份) 流量矩阵，仅需一次分组求和
+        :return: 以 node_id 为索引、(AADT/AAWDT, 2014..2022/'current') 为列的矩阵，无数据处为 NaN
+        """
+        if self._node_matrix is None:
+            columns = pd.MultiIndex.from_product([TRAFFIC_METRICS, TRAFFIC_YEARS], names=['metric', 'year'])
+            values = np.column_stack([
+                pd.to_numeric(self.data[_column_name(metric, year)], errors='coerce').to_numpy(dtype=np.float64)
+                if _column_name(metric, year) in self.data.columns else np.full(len(self.data), np.nan)
+                for metric, year in columns
+            ])
+            # 流量为 0 的记录不参与分配
+            values[values == 0] = np.nan
+
+            nodes = self.record_nodes()
+            matrix = pd.DataFrame(values[nodes.index.to_numpy()], index=nodes.to_numpy(), columns=columns)
+            self._node_matrix = matrix.groupby(level=0).sum(min_count=1).rename_axis('node')
+        return self._node_matrix
+
+    def node_traffic(self, metric: str = 'AADT', year: Union[int, str] = 'current') -> Dict[int, float]:
+        """
+        从流量矩阵中切片得到节点流量对照字典
+        :param metric: 'AADT' 或 'AAWDT'
+        :param year: 2014~2022 或 'current'
+        :return: {node_id: aggregated_traffic}
+        """
+        if metric not in TRAFFIC_METRICS or year not in TRAFFIC_YEARS:
+            raise ValueError("Invalid metric or year parameter")
+        return self.node_traffic_matrix()[(metric, year)].dropna().to_dict()
+
     def build_node_traffic_dict(
             self, traffic_extractor: Callable[[TrafficData], float]
     ) -> Dict[int, float]:
@@ -2,6 +2,8 @@ from shapely.geometry.point import Point
 
 from _references import STOPS_FILE, ROUTES_FILE
 from data import *
+from data.dataset import Dataset, Node
+from data.instrument import footprint, timed
 
 BUS_ROUTE_TYPE_MAPPER = {
     'BR': 'CityLink BROWN', 'BL': 'CityLink BLUE', 'GL': 'CityLink GOLD',
@@ -10,22 +12,103 @@ BUS_ROUTE_TYPE_MAPPER = {
     'YW': 'CityLink YELLOW', 'NV': 'CityLink NAVY'
 }
 
+# Dtypes declared up front in the compact mode
+STOP_COMPACT_DTYPES = {
+    'X': np.float64, 'Y': np.float64, 'Rider_On': np.float32, 'Rider_Off': np.float32, 'Rider_Total': np.float32,
+    'Stop_Rider': np.float32, 'Mode': 'category', 'Shelter': 'category', 'County': 'category',
+}
+ROUTE_COMPACT_DTYPES = {'Route_Numb': str, 'Route_Type': 'category', 'Shape__Length': np.float32}
+
+
+def read_stop_table(stops_file: str = STOPS_FILE, compact: bool = False) -> GeoDataFrame:
+    return read_geo(
+        stops_file, 'stop_id',
+        converter=(lambda data: [Point(xy) for xy in zip(data['X'], data['Y'])]),
+        dtype=STOP_COMPACT_DTYPES if compact else None
+    )
+
+
+def read_route_table(routes_file: str = ROUTES_FILE, compact: bool = False) -> pd.DataFrame:
+    return pd.read_csv(routes_file, index_col='Route_Numb', low_memory=False,
+                       dtype=ROUTE_COMPACT_DTYPES if compact else None)
+
 
 class TransitSet:
 
-    def __init__(self):
-        self._table_bus_stops = read_geo(
-            STOPS_FILE, 'stop_id',
-            converter=(lambda data: [Point(xy) for xy in zip(data['X'], data['Y'])])
-        )
-        self._table_bus_routes = pd.read_csv(ROUTES_FILE, index_col='Route_Numb', low_memory=False)
+    def __init__(self, stops_file: str = STOPS_FILE, routes_file: str = ROUTES_FILE, compact: bool = False):
+        """
+        :param stops_file: the bus stop source file, in the schema of STOPS_FILE.
+        :param routes_file: the bus route source file, in the schema of ROUTES_FILE.
+        :param compact: declare the column dtypes up front, with categoricals for the enumerated columns.
+        """
+        self._setup(read_stop_table(stops_file, compact), read_route_table(routes_file, compact))
+
+    @classmethod
+    def from_tables(cls, table_bus_stops: GeoDataFrame, table_bus_routes: pd.DataFrame) -> 'TransitSet':
+        """Build a transit set from tables read elsewhere (see read_stop_table and read_route_table)."""
+        transit = cls.__new__(cls)
+        transit._setup(table_bus_stops, table_bus_routes)
+        return transit
+
+    def _setup(self, table_bus_stops: GeoDataFrame, table_bus_routes: pd.DataFrame):
+        self._table_bus_stops = table_bus_stops
+        self._table_bus_routes = table_bus_routes
 
         self._bus_routes = None
         self._bus_stops = None
 
+        # bipartite route <-> stop index (CSR), by row positions in the tables
+        self._route_list, self._stop_list = None, None
+        self._route_positions, self._stop_positions = None, None
+        self._route_ptr, self._route_stops = None, None
+        self._stop_ptr, self._stop_routes = None, None
+
+    @timed('transit.load')
     def load(self):
         self._bus_routes = load("| ROUTES", self._table_bus_routes, (lambda row: BusRoute(self, row)))
         self._bus_stops = load("|  STOPS", self._table_bus_stops, (lambda row: BusStop(self, row)))
+        self._build_route_index()
+
+    def _build_route_index(self):
+        """Build the bipartite route <-> stop index once, with BUS_ROUTE_TYPE_MAPPER applied up front."""
+        route_keys = self._table_bus_routes.index
+        self._route_list = list(self._bus_routes.values())
+        self._stop_list = list(self._bus_stops.values())
+        self._route_positions = {key: i for i, key in enumerate(route_keys)}
+        self._stop_positions = {key: i for i, key in enumerate(self._table_bus_stops.index)}
+
+        names = {}
+        for i, key in enumerate(route_keys):
+            names[str(key)] = i
+            names[BUS_ROUTE_TYPE_MAPPER.get(str(key), str(key))] = i
+
+        served = self._table_bus_stops['Routes_Ser'].fillna('').astype(str).str.split(',')
+        pairs = pd.DataFrame({
+            'route': served.explode().str.strip().map(names).to_numpy(),
+            'stop': np.repeat(np.arange(len(served)), served.str.len().to_numpy()),
+        }).dropna().drop_duplicates().sort_values(['route', 'stop'])
+        route = pairs['route'].to_numpy(dtype=np.int64)
+        stop = pairs['stop'].to_numpy(dtype=np.int64)
+
+        # the pairs are sorted by route then stop, so both groupings keep the order of the tables
+        self._route_ptr, self._route_stops = csr_group(len(route_keys), route, stop)
+        self._stop_ptr, self._stop_routes = csr_group(len(self._table_bus_stops), stop, route)
+
+    def snap(self, dataset: Dataset):
+        """
+        Snap all stops to their nearest network node in one query.
+        The node ids and distances (meters) are kept in the 'node' and 'node_distance' columns.
+        """
+        index, distance = dataset.spatial.nearest_nodes(self._table_bus_stops['X'], self._table_bus_stops['Y'])
+        self._table_bus_stops['node'] = dataset.node_column('id')[index]
+        self._table_bus_stops['node_distance'] = distance
+        if self._bus_stops is not None:
+            for stop, i in zip(self._bus_stops.values(), index):
+                stop._node = Node(dataset, i)
+
+    def footprint(self) -> pd.Series:
+        """Bytes of every column of the tables, see compare_footprint()."""
+        return footprint({'table_bus_stops': self._table_bus_stops, 'table_bus_routes': self._table_bus_routes})
 
     @property
     def table_bus_routes(self) -> pd.DataFrame:
@@ -48,6 +131,32 @@ class TransitSet:
     def bus_stop(self, key: int) -> Optional['BusStop']:
         return self._bus_stops.get(key)
 
+    def stops_of(self, route: 'BusRoute') -> List['BusStop']:
+        """Get all stops served by the route."""
+        i = self._route_positions[route.key]
+        return [self._stop_list[j] for j in self._route_stops[self._route_ptr[i]:self._route_ptr[i + 1]]]
+
+    def routes_of(self, stop: 'BusStop') -> List['BusRoute']:
+        """Get all routes passing through the stop."""
+        i = self._stop_positions[stop.id]
+        return [self._route_list[j] for j in self._stop_routes[self._stop_ptr[i]:self._stop_ptr[i + 1]]]
+
+    @property
+    def route_stop_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The route <-> stop index as (route positions, stop positions) arrays,
+        positions being the rows of table_bus_routes and table_bus_stops.
+        """
+        route = np.repeat(np.arange(len(self._route_ptr) - 1), np.diff(self._route_ptr))
+        return route, self._route_stops
+
+    def route_ridership(self, column: str = 'Rider_Total') -> pd.Series:
+        """Sum a ridership column of the stops over every route serving them."""
+        riders = pd.to_numeric(self._table_bus_stops[column], errors='coerce').fillna(0).to_numpy()
+        route, stop = self.route_stop_pairs
+        totals = np.bincount(route, weights=riders[stop], minlength=len(self._table_bus_routes))
+        return pd.Series(totals, index=self._table_bus_routes.index, name=column)
+
 
 class BusRoute:
     """Represents a bus route with flexible initialization and full data access."""
@@ -80,8 +189,8 @@ class BusRoute:
     @property
     def stops(self) -> List['BusStop']:
         """Get all stops served by this route (lazy-loaded)."""
-        if not hasattr(self, '_stops'):
-            self._stops = [s for s in self._parent.bus_stops if s.serving(self)]
+        if self._stops is None:
+            self._stops = self._parent.stops_of(self)
         return self._stops
 
 
@@ -96,12 +205,17 @@ class BusStop:
 
     @property
     def id(self) -> int:
-        return int(self._data['stop_id'])
+        return int(self._data.name)
 
     @property
     def name(self) -> str:
         return self._data['stop_name']
 
+    @property
+    def node(self) -> Optional[Node]:
+        """Get the nearest network node, available once the set is snapped to a dataset."""
+        return self._node
+
     @property
     def mode(self) -> str:
         return self._data['Mode']
@@ -111,13 +225,13 @@ class BusStop:
         return self._data['Routes_Ser'].split(',')
 
     def serving(self, route: BusRoute) -> bool:
-        return route.key in self.routes_served or BUS_ROUTE_TYPE_MAPPER.get(route.key, route.key) in self.routes_served
+        return route in self.routes
 
     @property
     def routes(self) -> List[BusRoute]:
         """Get all routes passing through this stop."""
-        if not hasattr(self, '_routes'):
-            self._routes = [route for route in self._parent.bus_routes() if self.serving(route)]
+        if self._routes is None:
+            self._routes = self._parent.routes_of(self)
         return self._routes
 
     @property
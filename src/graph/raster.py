@@ -0,0 +1,185 @@
+import math
+import os
+from typing import Optional, Tuple, List
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from data.dataset import Dataset
+from data.geometry import LineStore
+
+TILE_SIZE = 256
+# 每批最多生成的采样点数，控制光栅化的峰值内存
+SAMPLE_BUDGET = 1 << 22
+
+
+def mercator(lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+    """经纬度转换为 Web Mercator 世界坐标（[0, 1] 区间，y 轴向下），与瓦片坐标系一致"""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878))
+    return (lon + 180.0) / 360.0, (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+
+
+def edge_segments(dataset: Dataset) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    将所有边的几何拆分为线段，坐标为 Web Mercator 世界坐标
+    :return: (x0, y0, x1, y1, edge)，edge 为线段所属边在数据集中的位置
+    """
+    lines = dataset.edge_geometry
+    x, y = mercator(lines.coordinates[:, 0], lines.coordinates[:, 1])
+    return LineStore(np.column_stack([x, y]), lines.offsets).segments()
+
+
+def node_to_edge_values(dataset: Dataset, node_values: np.ndarray) -> np.ndarray:
+    """将节点数值映射到边上：取两个端点中的较大值（忽略 NaN）"""
+    u = dataset.edge_column('u_index')
+    v = dataset.edge_column('v_index')
+    return np.fmax(node_values[u], node_values[v])
+
+
+class Canvas:
+    """像素网格：把世界坐标范围 (x_min, y_min, x_max, y_max) 映射到 width × height 像素"""
+
+    def __init__(self, width: int, height: int, bounds: Tuple[float, float, float, float]):
+        self.width = width
+        self.height = height
+        self.bounds = bounds
+        self.values = np.full(height * width, np.nan)
+        self.counts = np.zeros(height * width, dtype=np.int32)
+
+    @staticmethod
+    def fit(dataset: Dataset, width: int) -> 'Canvas':
+        """以数据集节点范围创建画布，高度按 Mercator 纵横比计算"""
+        x, y = mercator(dataset.node_column('x'), dataset.node_column('y'))
+        bounds = (x.min(), y.min(), x.max(), y.max())
+        height = max(1, int(round(width * (bounds[3] - bounds[1]) / max(bounds[2] - bounds[0], 1e-12))))
+        return Canvas(width, height, bounds)
+
+    def _pixels(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        x_min, y_min, x_max, y_max = self.bounds
+        return ((x - x_min) / (x_max - x_min) * self.width,
+                (y - y_min) / (y_max - y_min) * self.height)
+
+    def _accumulate(self, px: np.ndarray, py: np.ndarray, values: np.ndarray):
+        # 范围是闭区间：恰好落在右、下边界上的点（如 fit 得到的最远节点）归入最后一列、一行
+        inside = (px >= 0) & (px <= self.width) & (py >= 0) & (py <= self.height)
+        px = np.minimum(px[inside].astype(np.int64), self.width - 1)
+        py = np.minimum(py[inside].astype(np.int64), self.height - 1)
+        flat = py * self.width + px
+        self.counts += np.bincount(flat, minlength=len(self.counts)).astype(np.int32)
+        values = values[inside]
+        valid = ~np.isnan(values)
+        np.fmax.at(self.values, flat[valid], values[valid])
+
+    def points(self, x: np.ndarray, y: np.ndarray, values: Optional[np.ndarray] = None):
+        """聚合点：每个像素保留最大值，并记录点数"""
+        values = np.ones(len(x)) if values is None else np.asarray(values, dtype=np.float64)
+        px, py = self._pixels(x, y)
+        self._accumulate(px, py, values)
+
+    def lines(self, x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray,
+              values: Optional[np.ndarray] = None):
+        """
+        聚合线段：沿每条线段按像素步长采样（DDA），分批处理以限制内存
+        每个像素保留经过线段的最大值，并记录采样次数
+        """
+        values = np.ones(len(x0)) if values is None else np.asarray(values, dtype=np.float64)
+        px0, py0 = self._pixels(x0, y0)
+        px1, py1 = self._pixels(x1, y1)
+        steps = np.ceil(np.maximum(np.abs(px1 - px0), np.abs(py1 - py0))).astype(np.int64) + 1
+
+        # 按采样点预算切分批次
+        cumulative = np.cumsum(steps)
+        start = 0
+        while start < len(steps):
+            done = cumulative[start - 1] if start else 0
+            stop = max(int(np.searchsorted(cumulative, done + SAMPLE_BUDGET, side='right')), start + 1)
+            n = steps[start:stop]
+            segment = np.repeat(np.arange(start, stop), n)
+            offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            t = offset / np.maximum(np.repeat(n, n) - 1, 1)
+            px = px0[segment] + (px1[segment] - px0[segment]) * t
+            py = py0[segment] + (py1[segment] - py0[segment]) * t
+            self._accumulate(px, py, values[segment])
+            start = stop
+
+    def image(self, cmap: str = 'RdYlGn_r', vmin: Optional[float] = None, vmax: Optional[float] = None,
+              scale: str = 'sqrt') -> np.ndarray:
+        """着色为 RGBA 图像（uint8），无数据像素透明；scale 为 'linear'、'sqrt' 或 'log'"""
+        return shade(self.values.reshape(self.height, self.width), cmap, vmin, vmax, scale)
+
+
+def shade(grid: np.ndarray, cmap: str = 'RdYlGn_r', vmin: Optional[float] = None, vmax: Optional[float] = None,
+          scale: str = 'sqrt') -> np.ndarray:
+    transform = {'linear': (lambda a: a), 'sqrt': np.sqrt, 'log': np.log1p}[scale]
+    valid = ~np.isnan(grid)
+    if vmin is None:
+        vmin = float(np.nanmin(grid)) if valid.any() else 0.0
+    if vmax is None:
+        vmax = float(np.nanmax(grid)) if valid.any() else 1.0
+    # 先平移到从 0 开始再缩放，负值也可使用 sqrt / log
+    shifted = np.clip(np.where(valid, grid, vmin), vmin, vmax) - vmin
+    normalized = transform(shifted) / max(float(transform(vmax - vmin)), 1e-12)
+
+    table = (plt.get_cmap(cmap)(np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+    rgba = table[np.clip((normalized * 255).astype(np.int64), 0, 255)]
+    rgba[~valid] = 0
+    return rgba
+
+
+def render_network_png(dataset: Dataset, path: str, edge_values: Optional[np.ndarray] = None,
+                       node_values: Optional[np.ndarray] = None, width: int = 4096, cmap: str = 'RdYlGn_r',
+                       scale: str = 'sqrt') -> str:
+    """
+    将全市路网光栅化为 PNG
+    :param edge_values: 每条边的数值（与 Dataset.edge_column 对齐），默认为 1
+    :param node_values: 每个节点的数值（与 Dataset.node_column 对齐），未给出 edge_values 时映射到边上
+    """
+    if edge_values is None and node_values is not None:
+        edge_values = node_to_edge_values(dataset, np.asarray(node_values, dtype=np.float64))
+    x0, y0, x1, y1, edge = edge_segments(dataset)
+    canvas = Canvas.fit(dataset, width)
+    canvas.lines(x0, y0, x1, y1, None if edge_values is None else np.asarray(edge_values, dtype=np.float64)[edge])
+    plt.imsave(path, canvas.image(cmap, scale=scale))
+    return path
+
+
+def render_tiles(dataset: Dataset, folder: str, zooms=range(10, 17), edge_values: Optional[np.ndarray] = None,
+                 node_values: Optional[np.ndarray] = None, cmap: str = 'RdYlGn_r', scale: str = 'sqrt') -> List[str]:
+    """
+    生成 {z}/{x}/{y}.png 瓦片金字塔（XYZ / Web Mercator），可直接作为 folium.TileLayer 的 URL 模板
+    每次只光栅化一行瓦片，内存与缩放级别无关；颜色范围在所有瓦片间统一
+    """
+    if edge_values is None and node_values is not None:
+        edge_values = node_to_edge_values(dataset, np.asarray(node_values, dtype=np.float64))
+    x0, y0, x1, y1, edge = edge_segments(dataset)
+    values = None if edge_values is None else np.asarray(edge_values, dtype=np.float64)[edge]
+    vmin, vmax = (0.0, 1.0) if values is None else (np.nanmin(values), np.nanmax(values))
+    top, bottom = np.minimum(y0, y1), np.maximum(y0, y1)
+    left, right = np.minimum(x0, x1), np.maximum(x0, x1)
+
+    saved = []
+    for z in zooms:
+        n = 2 ** z
+        tx0, tx1 = int(left.min() * n), min(int(right.max() * n), n - 1)
+        ty0, ty1 = int(top.min() * n), min(int(bottom.max() * n), n - 1)
+        for ty in range(ty0, ty1 + 1):
+            # 当前瓦片行覆盖的世界坐标范围，仅处理与之相交的线段
+            row_top, row_bottom = ty / n, (ty + 1) / n
+            selected = (bottom >= row_top) & (top <= row_bottom)
+            if not selected.any():
+                continue
+            canvas = Canvas(TILE_SIZE * (tx1 - tx0 + 1), TILE_SIZE,
+                            (tx0 / n, row_top, (tx1 + 1) / n, row_bottom))
+            canvas.lines(x0[selected], y0[selected], x1[selected], y1[selected],
+                         None if values is None else values[selected])
+            image = canvas.image(cmap, vmin, vmax, scale)
+            for tx in range(tx0, tx1 + 1):
+                tile = image[:, (tx - tx0) * TILE_SIZE:(tx - tx0 + 1) * TILE_SIZE]
+                if not tile[..., 3].any():
+                    continue
+                path = os.path.join(folder, str(z), str(tx), f"{ty}.png")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                plt.imsave(path, tile)
+                saved.append(path)
+    return saved
@@ -1,26 +1,39 @@
+import functools
+import itertools
+import json
 import math
-from cmath import isnan
-from typing import Callable
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple, Union, Optional
 
 import folium
 import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from matplotlib.cm import ScalarMappable
 
 from data.dataset import Dataset
 from data.traffic import TrafficSet, TrafficData
-from model.metrics import topsis_evaluate, load_metrics
+from model.metrics import topsis_top_k, load_metrics
 
 
 def colormap(val: float, min_num: float, max_num: float) -> str:
-    normalized_val = (math.sqrt(val) - math.sqrt(min_num)) / (math.sqrt(max_num) - math.sqrt(min_num))
-    normalized_val = max(0, min(1, normalized_val))  # 限制在 [0, 1] 范围内
-    cmap = plt.get_cmap("RdYlGn")  # 'RdYlGn' 是红黄绿的渐变色
-    norm = mcolors.Normalize(vmin=0, vmax=1)  # 归一化到 [0, 1]
-    sm = ScalarMappable(cmap=cmap, norm=norm)  # 生成颜色映射
-    color = sm.to_rgba(1 - normalized_val)  # 转换为RGBA格式
-    return mcolors.rgb2hex(color)  # 转换为十六进制颜色代码
+    return str(colormap_array(np.array([val], dtype=np.float64), min_num, max_num)[0])
+
+
+@functools.lru_cache(maxsize=None)
+def _color_table(name: str = "RdYlGn") -> np.ndarray:
+    cmap = plt.get_cmap(name)
+    return np.array([mcolors.rgb2hex(cmap(i)) for i in range(cmap.N)])
+
+
+def colormap_array(values: np.ndarray, min_num: float, max_num: float) -> np.ndarray:
+    """colormap 的向量化版本：一次性对预先计算的查找表取色，结果与 colormap 逐个计算一致"""
+    table = _color_table()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = (np.sqrt(values) - math.sqrt(min_num)) / (math.sqrt(max_num) - math.sqrt(min_num))
+    normalized = np.clip(np.nan_to_num(normalized, nan=1.0), 0, 1)  # 限制在 [0, 1] 范围内
+    return table[np.minimum(((1 - normalized) * len(table)).astype(int), len(table) - 1)]
 
 
 def draw_network(dataset: Dataset):
@@ -33,30 +46,25 @@ def draw_network(dataset: Dataset):
 
 def draw_important(dataset: Dataset):
     metrics = load_metrics('../data/processed/metrics.csv')
-    scores = topsis_evaluate(metrics, {
+    top = topsis_top_k(metrics, {
         "degree_centrality": 0.3,
         "betweenness_centrality": 0.3,
         "closeness_centrality": 0.2,
         "eigenvector_centrality": 0.1,
         "pagerank": 0.1
-    })
-    scores_df = pd.DataFrame(scores.items(), columns=['node', 'score'])
-    scores_df = scores_df.sort_values('score', ascending=False)
-    _draw_important_nodes(dataset, scores_df, 50).save('../target/important_nodes.html')
+    }, 50)
+    _draw_important_nodes(dataset, top, 50).save('../target/important_nodes.html')
 
 
 def _draw_important_nodes(dataset: Dataset, df: pd.DataFrame, limit: int) -> folium.Map:
-    # 将重要性数据转换为 GeoDataFrame
-    df = dataset.table_nodes.merge(df, left_on='osmid', right_on='node')
-
-    # 按照 score 降序排序
-    df = df.sort_values('score', ascending=False)
-
-    # 取出前 limit 个节点
+    # df 已按 score 降序排列（topsis_top_k 的结果），取出前 limit 个节点，通过节点索引取其经纬度
     df = df.head(limit)
+    index = dataset.node_indexer(df['node'].to_numpy())
+    known = index >= 0
+    df = df[known].assign(y=dataset.node_column('y')[index[known]], x=dataset.node_column('x')[index[known]])
 
-    # 创建地图，以df中所有节点的平均经纬度为中心，经纬度从geometry列中获取
-    m = folium.Map(location=[df.geometry.y.mean(), df.geometry.x.mean()], zoom_start=15)
+    # 创建地图，以df中所有节点的平均经纬度为中心
+    m = folium.Map(location=[df['y'].mean(), df['x'].mean()], zoom_start=15)
 
     color_map = ['lightgreen', 'green', 'darkgreen', 'lightblue', 'darkblue']
 
@@ -74,7 +82,7 @@ def _draw_important_nodes(dataset: Dataset, df: pd.DataFrame, limit: int) -> fol
     # 添加节点到地图中，每个节点都标记其名称和分数，颜色根据分数的高低而变化
     for index, row in df.iterrows():
         folium.Marker(
-            location=[row.geometry.y, row.geometry.x],
+            location=[row['y'], row['x']],
             popup=f"{row['score']:.4f}",
             icon=folium.Icon(color=color(row['score']), icon='info-sign')
         ).add_to(m)
@@ -84,45 +92,150 @@ def _draw_important_nodes(dataset: Dataset, df: pd.DataFrame, limit: int) -> fol
 
 def draw_traffic_map(dataset: Dataset, traffic: TrafficSet,
                      traffic_extractor: Callable[[TrafficData], float]):
-    node_traffics = traffic.build_node_traffic_dict(traffic_extractor)
-    print(f"Traffic data loaded for {len(node_traffics)} nodes.")
+    return draw_node_traffic_map(dataset, traffic.build_node_traffic_dict(traffic_extractor))
+
 
-    # 将 node_traffics 转换成为 Node: float, 以便于后续的评估
-    # 若 dataset.node(k) 不存在，则忽略
-    node_traffics = {dataset.node(k): v for k, v in node_traffics.items() if dataset.node(k) and not isnan(v)}
+def draw_node_traffic_map(dataset: Dataset, node_traffics: Dict[int, float], geojson: bool = False):
+    print(f"Traffic data loaded for {len(node_traffics)} nodes.")
 
+    # 若 dataset 中不存在该节点或流量无效，则忽略
+    ids = np.array(list(node_traffics.keys()), dtype=np.int64)
+    values = np.array(list(node_traffics.values()), dtype=np.float64)
+    index = dataset.node_indexer(ids)
+    keep = (index >= 0) & ~np.isnan(values)
+
+    return _traffic_map(
+        _map_center(dataset), ids[keep],
+        dataset.node_column('y')[index[keep]], dataset.node_column('x')[index[keep]], values[keep], geojson
+    )
+
+
+def render_traffic_maps(dataset: Dataset, traffic: TrafficSet, jobs: List[Tuple[str, Union[int, str]]],
+                        folder: str = '../target', processes: Optional[int] = None,
+                        geojson: bool = False, separate_data: bool = False) -> List[str]:
+    """
+    批量渲染流量地图
+    节点坐标与流量矩阵只在主进程中解析一次，各任务仅携带所需的数组，渲染分发到进程池。
+    输出与逐个调用 draw_node_traffic_map 完全一致（逐字节）。
+    :param jobs: [(metric, year), ...]，例如 ('AADT', 2014) 或 ('AAWDT', 'current')
+    :param processes: 进程数，默认为 CPU 核数；为 1 时在当前进程中串行渲染
+    :param geojson: 以单个 GeoJSON 图层渲染所有节点，而非逐个添加 Circle
+    :param separate_data: 配合 geojson 使用，将数据写入 HTML 旁的 .geojson 文件
+    :return: 生成的文件路径
+    """
+    matrix = traffic.node_traffic_matrix()
+    index = dataset.node_indexer(matrix.index)
+    known = index >= 0
+    ids = matrix.index.to_numpy()[known]
+    lats = dataset.node_column('y')[index[known]]
+    lons = dataset.node_column('x')[index[known]]
+    center = _map_center(dataset)
+    os.makedirs(folder, exist_ok=True)
+
+    tasks = []
+    for metric, year in jobs:
+        values = matrix[(metric, year)].to_numpy()[known]
+        keep = ~np.isnan(values)
+        path = os.path.join(folder, f"traffic_{metric.lower()}_{year}.html")
+        data_file = os.path.splitext(path)[0] + '.geojson' if geojson and separate_data else None
+        tasks.append((path, center, ids[keep], lats[keep], lons[keep], values[keep], geojson, data_file))
+
+    if processes == 1:
+        return [_render_traffic_job(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_render_traffic_job, tasks))
+
+
+def _render_traffic_job(task: Tuple) -> str:
+    path, center, ids, lats, lons, values, geojson, data_file = task
+    _traffic_map(center, ids, lats, lons, values, geojson, data_file).save(path)
+    return path
+
+
+def _map_center(dataset: Dataset) -> List[float]:
+    # 以nodes的第一个点为中心
+    return [float(dataset.node_column('y')[0]), float(dataset.node_column('x')[0])]
+
+
+def _stable_ids(element, counter=None):
+    """按遍历顺序重新分配元素 id（默认为随机 uuid），使同样的地图总是生成同样的 HTML"""
+    counter = counter if counter is not None else itertools.count()
+    element._id = f"{next(counter):032x}"
+    for child in element._children.values():
+        _stable_ids(child, counter)
+
+
+def _traffic_map(center: List[float], ids: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+                 values: np.ndarray, geojson: bool = False, data_file: Optional[str] = None) -> folium.Map:
     # 如果有节点没有流量数据，则返回空地图
-    if len(node_traffics) == 0:
+    if len(values) == 0:
         print("No traffic data available.")
-        return folium.Map(location=[dataset.nodes[0].point.y, dataset.nodes[0].point.x], zoom_start=12)
+        m = folium.Map(location=center, zoom_start=12)
+        _stable_ids(m.get_root())
+        return m
 
-    # 初始化地图（以nodes的第一个点为中心）
-    first_node = dataset.nodes[0].point
-    m = folium.Map(location=[first_node.y, first_node.x], zoom_start=12)
+    m = folium.Map(location=center, zoom_start=12)
 
     # 获取所有边的流量值并生成颜色映射
-    traffic_values = list(node_traffics.values())
-    min_traffic = min(traffic_values)
-    max_traffic = max(traffic_values)  # 使用平方根函数来让颜色变化先快后慢
+    min_traffic = float(values.min())
+    max_traffic = float(values.max())  # 使用平方根函数来让颜色变化先快后慢
+
+    print(f"Traffic range: {min_traffic} - {max_traffic}")
+
+    if geojson:
+        _traffic_layer(ids, lats, lons, values, min_traffic, max_traffic, data_file).add_to(m)
+        _stable_ids(m.get_root())
+        return m
 
     # 生成颜色映射（绿->黄->红；渐变）
     def _color(val: float):
         return colormap(val, min_traffic, max_traffic)
 
-    print(f"Traffic range: {min_traffic} - {max_traffic}")
-
     # 添加所有边到地图
-    for node, traffic in node_traffics.items():
+    for node_id, lat, lon, traffic in zip(ids, lats, lons, values):
         folium.Circle(
-            location=[node.point.y, node.point.x],
+            location=[float(lat), float(lon)],
             radius=100,  # 流量越大圆越大
             color=_color(traffic),
             opacity=(0.8 if traffic > 0 else 0.3),
             fill=True,
             tooltip=f"""
-            {node.id}<br>
+            {node_id}<br>
             {traffic:.0f}<br>
             """
         ).add_to(m)
 
+    _stable_ids(m.get_root())
     return m
+
+
+def _traffic_layer(ids: np.ndarray, lats: np.ndarray, lons: np.ndarray, values: np.ndarray,
+                   min_traffic: float, max_traffic: float, data_file: Optional[str] = None) -> folium.GeoJson:
+    """
+    将所有节点写成单个 GeoJSON 图层，颜色一次性向量化计算，样式随要素属性下发
+    :param data_file: 若指定，则数据写入该文件，HTML 中仅引用其文件名（需与 HTML 位于同一目录）
+    """
+    colors = colormap_array(values, min_traffic, max_traffic)
+    opacities = np.where(values > 0, 0.8, 0.3)
+    features = [
+        {
+            'type': 'Feature', 'id': node_id,
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'id': node_id, 'traffic': round(traffic), 'style': {'color': color, 'opacity': opacity}}
+        }
+        for node_id, lat, lon, traffic, color, opacity in zip(
+            ids.tolist(), lats.tolist(), lons.tolist(), values.tolist(), colors.tolist(), opacities.tolist()
+        )
+    ]
+    collection = {'type': 'FeatureCollection', 'features': features}
+
+    marker = folium.Circle(radius=100, fill=True)  # 流量越大圆越大
+    tooltip = folium.GeoJsonTooltip(fields=['id', 'traffic'], labels=False)
+    if data_file is None:
+        return folium.GeoJson(collection, marker=marker, tooltip=tooltip)
+
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(collection, f, separators=(',', ':'))
+    layer = folium.GeoJson(data_file, embed=False, marker=marker, tooltip=tooltip)
+    layer.embed_link = os.path.basename(data_file)
+    return layer
@@ -1,44 +1,45 @@
-import datetime
+import time
 from time import sleep
 
-from data.traffic import TrafficSet
-from graph.road_network import draw_traffic_map
+from data import instrument
+from data.instrument import stage
+from data.loader import load_sets
+from graph.road_network import render_traffic_maps
 from model.metrics import *
 
 
 def cal_metrics():
     print("Calculating metrics...")
-    start_time = datetime.datetime.now()
-    calculate_metrics(dataset).to_csv('../target/metrics.csv')
-    print(f"Metrics calculated in {(datetime.datetime.now() - start_time).seconds} seconds")
+    start = time.perf_counter()
+    with stage('metrics'):
+        save_metrics(calculate_metrics(dataset), '../target/metrics.csv')
+    print(f"Metrics calculated in {time.perf_counter() - start:.3f} seconds")
 
 
 if __name__ == '__main__':
+    instrument.enable()
+
     print("-----------------------------------------------")
-    print("Initializing dataset...")
-    dataset = Dataset()
     print("Loading dataset...")
-    start_time = datetime.datetime.now()
-    dataset.load()
-    print(f"Dataset loaded in {(datetime.datetime.now() - start_time).seconds} seconds")
+    # 各数据表并发读取，启动耗时取决于最慢的一条读取链（节点 → 边 → 数据集）
+    sets = load_sets()
+    dataset, traffic = sets.dataset, sets.traffic
+    for name, seconds in sets.timings.items():
+        print(f"  {name:<14}{seconds:8.3f} s")
+    print(f"Dataset loaded in {sets.timings['total']:.3f} seconds")
     print("-----------------------------------------------")
     sleep(1)
 
     # 创建评价模型并执行分析
-    traffic = TrafficSet()
-
-    for i in range(2014, 2022):
-        print(f"Processing traffic data for year {i}...")
-        draw_traffic_map(dataset, traffic, (lambda d: d.aadt(i))).save(f"../target/traffic_aadt_{i}.html")
 
-    for i in range(2014, 2022):
-        print(f"Processing traffic data for year {i}...")
-        draw_traffic_map(dataset, traffic, (lambda d: d.aawdt(i))).save(f"../target/traffic_aawdt_{i}.html")
-
-    draw_traffic_map(dataset, traffic, (lambda d: d.aadt(i))).save(f"../target/traffic_aadt_current.html")
-    draw_traffic_map(dataset, traffic, (lambda d: d.aawdt(i))).save(f"../target/traffic_aawdt_current.html")
+    jobs = [(metric, year) for metric in ('AADT', 'AAWDT') for year in [*range(2014, 2022), 'current']]
+    with stage('traffic_maps'):
+        for path in render_traffic_maps(dataset, traffic, jobs, '../target', geojson=True):
+            print(f"Traffic map saved to {path}")
 
     # 生成报告
 
     # cal_metrics()
     # draw_important()
+
+    print(f"Run report saved to {instrument.write_report('../target/run_report.json')}")
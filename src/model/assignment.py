@@ -0,0 +1,171 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from data.dataset import Dataset
+from data.traffic import TrafficSet
+from model.scenario import SOURCE_BATCH, forest_accumulate
+
+# 每车道小时通行能力（veh/h），按道路等级
+LANE_CAPACITY = {
+    'motorway': 2000, 'motorway_link': 1500, 'trunk': 1800, 'trunk_link': 1400,
+    'primary': 1200, 'primary_link': 1000, 'secondary': 1000, 'secondary_link': 900,
+    'tertiary': 900, 'tertiary_link': 800, 'residential': 600, 'unclassified': 600,
+}
+DEFAULT_LANE_CAPACITY = 600
+# 高峰小时流量约占日流量的 10%，日通行能力按小时通行能力的 10 倍计
+DAILY_FACTOR = 10
+
+
+class TrafficAssignment:
+    """
+    静态交通分配（用户均衡），Frank-Wolfe 算法，路段费用为 BPR 函数 t = t0 * (1 + alpha * (x / c) ^ beta)
+    路段即 Adjacency 中的每个通行方向（arc），与 Dataset 的边一一对应（双向道路的两个方向各有一行）；
+    自由流时间来自 length 与 maxspeed，通行能力来自各自所在行的 lanes
+    需求与流量均以日交通量（veh/day）计，可直接与 AADT 对照
+    """
+
+    def __init__(self, dataset: Dataset, alpha: float = 0.15, beta: float = 4.0):
+        self._dataset = dataset
+        self.alpha = alpha
+        self.beta = beta
+
+        adjacency = dataset.adjacency
+        self.src = adjacency.arc_src
+        self.dst = adjacency.arc_dst
+        self.free_flow_time = np.maximum(dataset.edge_travel_times()[adjacency.arc_edge], 1e-3)
+        self.capacity = self._capacities()[adjacency.arc_edge]
+
+    def _capacities(self) -> np.ndarray:
+        """每条边（即一个方向）的日通行能力：OSM 的 lanes 为整条道路的车道数，双向道路每个方向各占一半"""
+        dataset = self._dataset
+        highway = pd.Series(np.asarray(dataset.edge_column('highway'), dtype=object)).astype(str).str.extract(
+            r'([a-z_]+)', expand=False)
+        per_lane = highway.map(LANE_CAPACITY).fillna(DEFAULT_LANE_CAPACITY).to_numpy(dtype=np.float64)
+        lanes = np.asarray(dataset.edge_column('lanes'), dtype=np.float64)
+        lanes = np.where(dataset.edge_column('oneway'), lanes, lanes / 2)
+        return np.maximum(lanes, 1) * per_lane * DAILY_FACTOR
+
+    def link_costs(self, flows: np.ndarray) -> np.ndarray:
+        """BPR 路段行驶时间（秒）"""
+        return self.free_flow_time * (1 + self.alpha * (flows / self.capacity) ** self.beta)
+
+    def _objective_slope(self, flows: np.ndarray, direction: np.ndarray, step: float) -> float:
+        return float(np.dot(self.link_costs(flows + step * direction), direction))
+
+    def all_or_nothing(self, costs: np.ndarray, origins: np.ndarray, destinations: np.ndarray,
+                       demand: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        全有全无加载：每个起点沿最短路树把需求一次性加载到路段上
+        同一批起点的最短路树由 forest_accumulate 逐层累加得到进入每个节点的流量，再映射到对应的路段
+        :return: (路段流量, 无法到达的需求量)
+        """
+        n = self._dataset.node_count
+        # 平行路段只取费用最小的一条
+        order = np.lexsort((costs, self.dst, self.src))
+        keys = self.src[order] * np.int64(n) + self.dst[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        pair_keys, pair_links = keys[first], order[first]
+        matrix = sparse.csr_matrix((costs[pair_links], (self.src[pair_links], self.dst[pair_links])), shape=(n, n))
+
+        flows = np.zeros(len(costs))
+        unassigned = 0.0
+        for start in range(0, len(origins), SOURCE_BATCH):
+            rows = slice(start, start + SOURCE_BATCH)
+            _, predecessors = csgraph.dijkstra(matrix, directed=True, indices=origins[rows],
+                                               return_predecessors=True)
+            values = np.zeros(predecessors.shape)
+            np.add.at(values, (np.arange(len(predecessors))[:, None], destinations[None, :]), demand[rows])
+            unassigned += values[predecessors < 0].sum() - values[np.arange(len(predecessors)), origins[rows]].sum()
+
+            loads = forest_accumulate(predecessors, values)
+            batch, node = np.nonzero(loads)
+            links = pair_links[np.searchsorted(pair_keys, predecessors[batch, node] * np.int64(n) + node)]
+            flows += np.bincount(links, weights=loads[batch, node], minlength=len(flows))
+        return flows, unassigned
+
+    def assign(self, origins, destinations, demand: np.ndarray, max_iterations: int = 50,
+               gap: float = 1e-4) -> Dict:
+        """
+        Frank-Wolfe 用户均衡分配
+        :param origins: 起点的节点位置
+        :param destinations: 终点的节点位置
+        :param demand: (起点数, 终点数) 的日需求矩阵
+        :param gap: 相对间隙收敛阈值 (sum(t·x) - sum(t·y)) / sum(t·x)
+        :return: {'flows': 路段流量, 'costs': 路段行驶时间, 'gap': 相对间隙, 'iterations': 迭代次数, 'unassigned': 无法到达的需求}
+        """
+        origins = np.asarray(origins, dtype=np.int64)
+        destinations = np.asarray(destinations, dtype=np.int64)
+        demand = np.asarray(demand, dtype=np.float64)
+
+        flows, unassigned = self.all_or_nothing(self.free_flow_time, origins, destinations, demand)
+        relative_gap = np.inf
+        iteration = 0
+        for iteration in range(1, max_iterations + 1):
+            costs = self.link_costs(flows)
+            target, _ = self.all_or_nothing(costs, origins, destinations, demand)
+            total = float(np.dot(costs, flows))
+            relative_gap = (total - float(np.dot(costs, target))) / total if total > 0 else 0.0
+            if relative_gap < gap:
+                break
+
+            # 二分法线搜索：目标函数沿方向 d 的导数 sum(t(x + λd)·d) 单调递增
+            direction = target - flows
+            low, high = 0.0, 1.0
+            if self._objective_slope(flows, direction, high) <= 0:
+                low = high
+            else:
+                for _ in range(30):
+                    middle = (low + high) / 2
+                    if self._objective_slope(flows, direction, middle) > 0:
+                        high = middle
+                    else:
+                        low = middle
+            flows = flows + low * direction
+
+        return {'flows': flows, 'costs': self.link_costs(flows), 'gap': relative_gap,
+                'iterations': iteration, 'unassigned': unassigned}
+
+    def edge_flows(self, flows: np.ndarray) -> np.ndarray:
+        """将路段流量对应到 Dataset 的每条边（每条边即一个方向，平行路段各自计数）"""
+        return np.bincount(self._dataset.adjacency.arc_edge, weights=flows, minlength=self._dataset.edge_count)
+
+    def node_volumes(self, flows: np.ndarray) -> np.ndarray:
+        """每个节点的通过量：流入与流出中的较大者（起点只有流出，终点只有流入）"""
+        n = self._dataset.node_count
+        return np.maximum(np.bincount(self.dst, weights=flows, minlength=n),
+                          np.bincount(self.src, weights=flows, minlength=n))
+
+    def calibrate(self, traffic: TrafficSet, origins, destinations, demand: np.ndarray, metric: str = 'AADT',
+                  year='current', rounds: int = 3, **options) -> Dict:
+        """
+        以 TrafficSet 的观测流量标定需求规模：每轮分配后按最小二乘求缩放系数
+        theta = sum(m·o) / sum(m²)（m 为观测节点的模型通过量，o 为观测值），缩放需求后重新分配
+        :return: assign 的结果，另含 'scale'（累计缩放系数）、'r2' 与 'rmse'（观测节点上的拟合优度）
+        """
+        observed = pd.Series(traffic.node_traffic(metric, year))
+        index = self._dataset.node_indexer(observed.index)
+        known = index >= 0
+        index, observed = index[known], observed.to_numpy()[known]
+
+        demand = np.asarray(demand, dtype=np.float64)
+        scale = 1.0
+        result = self.assign(origins, destinations, demand, **options)
+        for _ in range(rounds):
+            modelled = self.node_volumes(result['flows'])[index]
+            theta = float(np.dot(modelled, observed) / np.dot(modelled, modelled)) if modelled.any() else 1.0
+            if abs(theta - 1) < 1e-3:
+                break
+            scale *= theta
+            result = self.assign(origins, destinations, demand * scale, **options)
+
+        modelled = self.node_volumes(result['flows'])[index]
+        residual = observed - modelled
+        variance = float(((observed - observed.mean()) ** 2).sum()) if len(observed) else 0.0
+        result.update(scale=scale, r2=1 - float((residual ** 2).sum()) / variance if variance > 0 else np.nan,
+                      rmse=float(np.sqrt((residual ** 2).mean())) if len(residual) else np.nan)
+        return result
@@ -0,0 +1,167 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csgraph
+
+from data.dataset import Dataset
+from model.metrics import graph_arrays
+from model.scenario import Scenario, base_matrix, forest_accumulate, scenario_arrays, scenario_matrix
+
+SCENARIO_COLUMNS = ('scenario', 'removed', 'added', 'aspl', 'aspl_change', 'connectivity_loss',
+                    'travel_time_change', 'top_betweenness_change')
+
+
+class SharedArrays:
+    """
+    一组具名 NumPy 数组，只复制一次到共享内存中；工作进程通过 spec 直接映射，不再复制
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[name] = (block.name, array.dtype.str, array.shape)
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def attach_arrays(spec: Dict[str, Tuple[str, str, tuple]]) -> Tuple[List[shared_memory.SharedMemory],
+                                                                     Dict[str, np.ndarray]]:
+    """
+    在工作进程中映射共享数组；返回的内存块须保持引用，直到不再使用这些数组
+    工作进程与主进程共用同一个资源跟踪器，共享内存由主进程的 SharedArrays.close 释放
+    """
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, shape) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+# 工作进程中的共享状态，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(spec: Dict[str, Tuple[str, str, tuple]], node_count: int, weight: Optional[str], directed: bool):
+    blocks, arrays = attach_arrays(spec)
+    _worker.update(blocks=blocks, arrays=arrays, node_count=node_count, weight=weight, directed=directed)
+
+
+def _evaluate_scenario(task: Tuple[int, Scenario]) -> Tuple[int, dict]:
+    position, scenario = task
+    arrays = _worker['arrays']
+    directed = _worker['directed']
+    matrix = scenario_matrix(arrays, _worker['node_count'], scenario, _worker['weight'], directed)
+    dist, predecessors = csgraph.dijkstra(matrix, directed=directed, indices=arrays['sources'],
+                                          return_predecessors=True)
+    return position, _scenario_row(scenario, arrays['sources'], arrays['base_dist'], dist,
+                                   arrays['top'], arrays['base_top'], forest_accumulate(predecessors))
+
+
+def _scenario_row(scenario: Scenario, sources: np.ndarray, base_dist: np.ndarray, dist: np.ndarray,
+                  top: np.ndarray, base_top: np.ndarray, dependency: np.ndarray) -> dict:
+    """由采样源点的距离与最短路树汇总一行结果"""
+    pairs = np.ones(dist.shape, dtype=bool)
+    pairs[np.arange(len(sources)), sources] = False  # 不计源点到自身
+    before = np.isfinite(base_dist) & pairs
+    after = np.isfinite(dist) & pairs
+    both = before & after
+    aspl = float(dist[after].mean()) if after.any() else np.nan
+    base_aspl = float(base_dist[before].mean()) if before.any() else np.nan
+    top_total = dependency[:, top].sum()
+    return {
+        'scenario': scenario.name,
+        'removed': len(scenario.removed),
+        'added': len(scenario.added),
+        'aspl': aspl,
+        'aspl_change': aspl - base_aspl,
+        'connectivity_loss': float((before & ~after).sum() / max(before.sum(), 1)),
+        'travel_time_change': float((dist[both] - base_dist[both]).mean()) if both.any() else np.nan,
+        'top_betweenness_change': float(top_total / base_top.sum() - 1) if base_top.sum() > 0 else np.nan
+    }
+
+
+def run_scenarios(dataset: Dataset, scenarios: List[Scenario], weight: Optional[str] = 'travel_time',
+                  directed: bool = False, sources: int = 256, top: int = 100, processes: Optional[int] = None,
+                  output: Optional[str] = None, seed: int = 0) -> pd.DataFrame:
+    """
+    批量评估路网变更方案
+    基准路网的权重矩阵（CSR）、采样源点及其基准距离只计算一次并放入共享内存，各工作进程直接映射而不复制；
+    每个方案在共享矩阵上应用变更（见 scenario_matrix）、从同一批采样源点计算最短路树，并汇总为一行：
+    - aspl / aspl_change：采样点对的平均最短路长度及其变化（边权单位，travel_time 时为秒）
+    - connectivity_loss：基准路网中连通、变更后不再连通的采样点对比例
+    - travel_time_change：前后均连通的采样点对的平均最短路变化
+    - top_betweenness_change：基准介数（采样估计）最高的 top 个节点的介数总和的相对变化
+    :param sources: 采样源点数（所有方案共用，结果可比）
+    :param processes: 进程数，默认为 CPU 核数；为 1 时在当前进程中串行计算
+    :param output: CSV 路径，每完成一个方案就追加一行
+    :return: 按方案顺序排列的结果表
+    """
+    n = dataset.node_count
+    graph = graph_arrays(dataset, weight)
+    arrays = scenario_arrays(n, graph['src'], graph['dst'], graph.get('weight', np.ones(len(graph['src']))),
+                             dataset.adjacency.arc_edge, directed)
+    del graph
+
+    rng = np.random.default_rng(seed)
+    arrays['sources'] = np.sort(rng.choice(n, size=min(sources, n), replace=False))
+    base_dist, predecessors = csgraph.dijkstra(base_matrix(arrays, n), directed=directed, indices=arrays['sources'],
+                                               return_predecessors=True)
+    base_dependency = forest_accumulate(predecessors)
+    betweenness = base_dependency.sum(axis=0)
+    arrays['top'] = np.argsort(-betweenness, kind='stable')[:top]
+    arrays['base_top'] = base_dependency[:, arrays['top']]
+    arrays['base_dist'] = base_dist
+    del base_dependency, predecessors
+
+    tasks = list(enumerate(scenarios))
+    if processes == 1:
+        _worker.update(arrays=arrays, node_count=n, weight=weight, directed=directed)
+        try:
+            return _collect(map(_evaluate_scenario, tasks), len(tasks), output)
+        finally:
+            _worker.clear()
+
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(shared.spec, n, weight, directed)) as executor:
+        futures = [executor.submit(_evaluate_scenario, task) for task in tasks]
+        return _collect((future.result() for future in as_completed(futures)), len(tasks), output)
+
+
+def _collect(results: Iterable[Tuple[int, dict]], count: int, output: Optional[str]) -> pd.DataFrame:
+    """按完成顺序接收结果并逐行写入 CSV，最后按方案顺序返回"""
+    rows: List[Optional[dict]] = [None] * count
+    if output is None:
+        for position, row in results:
+            rows[position] = row
+        return pd.DataFrame(rows, columns=list(SCENARIO_COLUMNS))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SCENARIO_COLUMNS)
+        writer.writeheader()
+        for position, row in results:
+            rows[position] = row
+            writer.writerow(row)
+            f.flush()
+    return pd.DataFrame(rows, columns=list(SCENARIO_COLUMNS))
@@ -1,50 +1,142 @@
-from typing import Dict
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import networkit as nk
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
+from scipy import stats
 
+from data.cache import cache_key, cached_arrays
 from data.dataset import Dataset
-
-
-def _build_networkit_graph(dataset: Dataset) -> nk.Graph:
-    g = nk.Graph(len(dataset.nodes), directed=False)
-    node_mapping = {node.id: i for i, node in enumerate(dataset.nodes)}
-
-    for edge in tqdm(dataset.edges, desc="BUILDING"):
-        u = node_mapping[edge.u]
-        v = node_mapping[edge.v]
-        if edge.oneway:
-            if edge.reversed:
-                g.addEdge(v, u)  # 从v到u
-            else:
-                g.addEdge(u, v)  # 从u到v
-        else:  # 双向边
-            g.addEdge(u, v)
-            g.addEdge(v, u)
-    return g
+from data.instrument import count, stage, timed
+
+APPROXIMATION_MODES = ('exact', 'approx')
+# 计算量为 O(V·E) 级别的度量，默认分得全部线程
+HEAVY_METRICS = ('betweenness_centrality', 'closeness_centrality')
+# TOPSIS 权重扫描中每块 (权重向量数 × 节点数) 矩阵的元素上限
+SWEEP_CHUNK_ELEMENTS = 1 << 22
+
+
+def graph_arrays(dataset: Dataset, weight: Optional[str]) -> Dict[str, np.ndarray]:
+    """边数组：起点、终点（节点位置）以及可选的边权"""
+    adjacency = dataset.adjacency
+    arrays = {'src': adjacency.arc_src, 'dst': adjacency.arc_dst}
+    if weight is not None:
+        weights = dataset.edge_column('length') if weight == 'length' else dataset.edge_travel_times()
+        arrays['weight'] = np.asarray(weights, dtype=np.float64)[adjacency.arc_edge]
+    return arrays
+
+
+@timed('metrics.build_graph')
+def _build_networkit_graph(dataset: Dataset, weight: Optional[str] = None, directed: bool = False,
+                           cache: bool = True) -> nk.Graph:
+    """
+    直接基于 Dataset 的邻接数组向量化构建 networkit 图
+    节点编号即节点在 Dataset 列数组中的位置；每条边即一个通行方向（双向道路的两个方向各有一行），对应一条边
+    边数组按数据集指纹缓存到磁盘（NetworkitBinary 格式会丢弃平行边，故缓存数组后批量导入）
+    :param weight: 边权，None 为无权图，'length' 为长度（米），'travel_time' 为自由流行驶时间（秒）
+    :param directed: 是否构建有向图
+    """
+    if weight not in (None, 'length', 'travel_time'):
+        raise ValueError("Invalid weight parameter")
+
+    if cache:
+        arrays = cached_arrays(f"graph_{dataset.variant}_{weight or 'unweighted'}", cache_key(dataset.fingerprint),
+                               (lambda: graph_arrays(dataset, weight)))
+    else:
+        arrays = graph_arrays(dataset, weight)
+
+    graph = nk.Graph(dataset.node_count, weighted=weight is not None, directed=directed)
+    if weight is None:
+        graph.addEdges((arrays['src'], arrays['dst']))
+    else:
+        graph.addEdges((arrays['weight'], (arrays['src'], arrays['dst'])))
+    count('graph.edges', graph.numberOfEdges())
+    return graph
+
+
+def _node_ids(dataset: Dataset) -> List[int]:
+    return dataset.node_column('id').tolist()
 
 
 def _calculate_degree_centrality(dataset: Dataset, graph: nk.Graph) -> Dict[int, float]:
     print("Calculating degree centrality...")
     deg_centrality = nk.centrality.DegreeCentrality(graph)
     deg_centrality.run()
-    return {node.id: deg_centrality.score(i) for i, node in enumerate(dataset.nodes)}
-
-
-def _calculate_betweenness_centrality(dataset: Dataset, graph: nk.Graph) -> Dict[int, float]:
-    print("Calculating betweenness centrality...")
-    bet_centrality = nk.centrality.Betweenness(graph, normalized=True)
-    bet_centrality.run()
-    return {node.id: bet_centrality.score(i) for i, node in enumerate(dataset.nodes)}
-
-
-def _calculate_closeness_centrality(dataset: Dataset, graph: nk.Graph) -> Dict[int, float]:
-    print("Calculating closeness centrality...")
-    closeness_centrality = nk.centrality.Closeness(graph, True, True)
-    closeness_centrality.run()
-    return {node.id: closeness_centrality.score(i) for i, node in enumerate(dataset.nodes)}
+    return dict(zip(_node_ids(dataset), deg_centrality.scores()))
+
+
+def _calculate_betweenness_centrality(dataset: Dataset, graph: nk.Graph, mode: str = 'exact',
+                                      epsilon: float = 0.01, delta: float = 0.1) -> Tuple[Dict[int, float], dict]:
+    print(f"Calculating betweenness centrality ({mode})...")
+    info = {'mode': mode}
+    if mode == 'exact':
+        bet_centrality = nk.centrality.Betweenness(graph, normalized=True)
+        bet_centrality.run()
+    elif mode == 'approx':
+        # 有权、无权图均适用：以至少 1 - delta 的概率，所有节点的误差不超过 epsilon
+        # （networkit 的 KADABRA 只支持无权图，且在等长最短路很多的路网上不均匀地采样路径，误差界不成立，故不使用）
+        bet_centrality = nk.centrality.ApproxBetweenness(graph, epsilon=epsilon, delta=delta)
+        bet_centrality.run()
+        info.update(epsilon=epsilon, delta=delta, samples=bet_centrality.numberOfSamples())
+    else:
+        raise ValueError("Invalid mode parameter")
+    return dict(zip(_node_ids(dataset), bet_centrality.scores())), info
+
+
+def _closeness_samples(size: int, epsilon: float, delta: float) -> int:
+    """Hoeffding 界：以 1 - delta 的概率使所有节点的平均距离误差不超过 epsilon 倍直径"""
+    return int(min(size, math.ceil(math.log(2 * size / delta) / (2 * epsilon ** 2))))
+
+
+def _compact(graph: nk.Graph, nodes: np.ndarray) -> nk.Graph:
+    """取节点子图并重新连续编号，新编号与 nodes 中的顺序一致（nodes 须升序）"""
+    sub = nk.graphtools.subgraphFromNodes(graph, nodes.tolist())
+    return nk.graphtools.getCompactedGraph(sub, dict(zip(nodes.tolist(), range(len(nodes)))))
+
+
+def _calculate_closeness_centrality(dataset: Dataset, graph: nk.Graph, mode: str = 'exact', epsilon: float = 0.01,
+                                    delta: float = 0.1, sample_epsilon: float = 0.05) -> Tuple[Dict[int, float], dict]:
+    print(f"Calculating closeness centrality ({mode})...")
+    info = {'mode': mode}
+    if mode == 'exact':
+        closeness_centrality = nk.centrality.Closeness(graph, True, True)
+        closeness_centrality.run()
+        return dict(zip(_node_ids(dataset), closeness_centrality.scores())), info
+
+    # ApproxCloseness 只适用于连通无向图：在最大连通分量上采样估计，其余的小分量精确计算
+    if graph.isDirected():
+        raise ValueError("Approximate closeness requires an undirected graph")
+    components = nk.components.ConnectedComponents(graph)
+    components.run()
+    partition = np.asarray(components.getPartition().getVector())
+    sizes = np.bincount(partition)
+    main = np.flatnonzero(partition == np.argmax(sizes))
+    rest = np.flatnonzero(partition != np.argmax(sizes))
+    n = graph.numberOfNodes()
+    scores = np.zeros(n)
+
+    # 与精确模式的广义（generalized）归一化保持一致：标准贴近度再乘以 (分量大小 - 1) / (n - 1)
+    # 采样数由 sample_epsilon 决定；ApproxCloseness 自身的 epsilon 参数较大时会对远离采样点的节点改用粗略的枢轴估计
+    samples = _closeness_samples(len(main), sample_epsilon, delta)
+    approx = nk.centrality.ApproxCloseness(_compact(graph, main), samples, epsilon, True)
+    approx.run()
+    scores[main] = np.asarray(approx.scores()) * (len(main) - 1) / max(n - 1, 1)
+    errors = np.sqrt(np.asarray(approx.getSquareErrorEstimates()))
+    errors = errors[np.isfinite(errors)]  # 被采样的节点为精确值，没有误差估计
+
+    if len(rest):
+        exact = nk.centrality.Closeness(_compact(graph, rest), True, True)
+        exact.run()
+        scores[rest] = np.asarray(exact.scores()) * (len(rest) - 1) / max(n - 1, 1)
+
+    info.update(epsilon=epsilon, sample_epsilon=sample_epsilon, delta=delta, samples=samples, component_size=len(main),
+                farness_error_mean=float(errors.mean()) if len(errors) else 0.0,
+                farness_error_max=float(errors.max()) if len(errors) else 0.0)
+    return dict(zip(_node_ids(dataset), scores.tolist())), info
 
 
 def _calculate_eigenvector_centrality(dataset: Dataset, graph: nk.Graph) -> Dict[int, float]:
@@ -52,47 +144,165 @@ def _calculate_eigenvector_centrality(dataset: Dataset, graph: nk.Graph) -> Dict
     try:
         eigen_centrality = nk.centrality.EigenvectorCentrality(graph)
         eigen_centrality.run()
-        return {node.id: eigen_centrality.score(i) for i, node in enumerate(dataset.nodes)}
+        return dict(zip(_node_ids(dataset), eigen_centrality.scores()))
     except Exception as e:
         print(f"Error: {e}")
         return {}
 
 
-def _calculate_pagerank(dataset: Dataset, graph: nk.Graph) -> Dict[int, float]:
+def _calculate_pagerank(dataset: Dataset, graph: nk.Graph, damp: float = 0.85) -> Dict[int, float]:
     print("Calculating PageRank...")
-    pagerank = nk.centrality.PageRank(graph, damp=0.85)
+    pagerank = nk.centrality.PageRank(graph, damp=damp)
     pagerank.run()
-    return {node.id: pagerank.score(i) for i, node in enumerate(dataset.nodes)}
-
+    return dict(zip(_node_ids(dataset), pagerank.scores()))
+
+
+def _metric_tasks(mode: str, epsilon: float, delta: float, closeness_epsilon: float) -> Dict[str, Tuple[Callable, dict]]:
+    """各度量的计算函数及其参数，参数参与缓存键（精确模式不使用误差参数，因此不计入）"""
+    if mode == 'exact':
+        betweenness, closeness = {'mode': mode}, {'mode': mode}
+    else:
+        betweenness = {'mode': mode, 'epsilon': epsilon, 'delta': delta}
+        closeness = {'mode': 'approx', 'epsilon': epsilon, 'delta': delta, 'sample_epsilon': closeness_epsilon}
+    return {
+        'degree_centrality': (_calculate_degree_centrality, {}),
+        'betweenness_centrality': (_calculate_betweenness_centrality, betweenness),
+        'closeness_centrality': (_calculate_closeness_centrality, closeness),
+        'eigenvector_centrality': (_calculate_eigenvector_centrality, {}),
+        'pagerank': (_calculate_pagerank, {'damp': 0.85})
+    }
 
-def calculate_metrics(dataset: Dataset) -> pd.DataFrame:
-    graph = _build_networkit_graph(dataset)
 
-    metrics = {
-        'degree_centrality': _calculate_degree_centrality(dataset, graph),
-        'betweenness_centrality': _calculate_betweenness_centrality(dataset, graph),
-        'closeness_centrality': _calculate_closeness_centrality(dataset, graph),
-        'eigenvector_centrality': _calculate_eigenvector_centrality(dataset, graph),
-        'pagerank': _calculate_pagerank(dataset, graph)
+def _thread_budget(total: int, names: List[str]) -> Dict[str, int]:
+    """默认线程分配：介数与贴近度平分全部线程，其余度量各用一个线程"""
+    heavy = [name for name in names if name in HEAVY_METRICS]
+    share = max(1, total // max(len(heavy), 1))
+    return {name: share if name in HEAVY_METRICS else 1 for name in names}
+
+
+def _compute_metric(dataset: Dataset, graph: nk.Graph, graph_key: str, name: str, function: Callable,
+                    params: dict, threads: int, cache: bool) -> Tuple[np.ndarray, dict]:
+    """计算单个度量；成功的结果按 (图指纹, 度量, 参数) 缓存，中断后重跑时直接读取"""
+
+    def build() -> Dict[str, np.ndarray]:
+        nk.setNumberOfThreads(threads)  # OpenMP 线程数按调用线程分别设置
+        with stage(f"metrics.{name}"):
+            result = function(dataset, graph, **params)
+        scores, info = result if isinstance(result, tuple) else (result, {})
+        if not scores:
+            raise RuntimeError(f"{name} produced no scores")
+        return {'scores': np.fromiter(scores.values(), dtype=np.float64, count=len(scores)),
+                'info': np.array(json.dumps(info))}
+
+    if cache:
+        # 各网络变体、精确与近似结果分别保留，切换时不互相覆盖
+        label = '_'.join([dataset.variant, name, graph_key] + ([params['mode']] if 'mode' in params else []))
+        arrays = cached_arrays(f"metric_{label}", cache_key(dataset.fingerprint, name, params), build)
+    else:
+        arrays = build()
+    return arrays['scores'], json.loads(str(arrays['info']))
+
+
+@timed('metrics.calculate')
+def calculate_metrics(dataset: Dataset, weight: Optional[str] = None, mode: str = 'exact',
+                      epsilon: float = 0.01, delta: float = 0.1, closeness_epsilon: float = 0.05,
+                      threads: Optional[int] = None, metric_threads: Optional[Dict[str, int]] = None,
+                      metrics: Optional[List[str]] = None, cache: bool = True, concurrent: bool = True) -> pd.DataFrame:
+    """
+    计算节点度量，运行参数与近似误差记录在结果的 attrs['run'] 中（由 save_metrics 写出）
+    每个度量的结果单独缓存，修改某个度量的参数后重跑只需重新计算该度量；计算失败的度量不缓存，结果为 NaN
+    :param mode: 'exact' 精确计算；'approx' 介数使用 ApproxBetweenness，贴近度使用 ApproxCloseness
+    :param epsilon: 介数中心性的加性误差上界，同时作为 ApproxCloseness 的误差参数
+    :param delta: 误差上界不成立的概率
+    :param closeness_epsilon: 决定贴近度采样数的误差（相对直径）
+    :param threads: networkit 可用的总线程数，默认为全部核心
+    :param metric_threads: 各度量的线程数，默认由介数与贴近度平分总线程数，其余度量各一个线程
+    :param metrics: 需要计算的度量，默认为全部
+    :param concurrent: 各度量在独立线程中并发计算（networkit 计算时释放 GIL）
+    """
+    if mode not in APPROXIMATION_MODES:
+        raise ValueError("Invalid mode parameter")
+    tasks = _metric_tasks(mode, epsilon, delta, closeness_epsilon)
+    names = list(tasks) if metrics is None else list(metrics)
+    if any(name not in tasks for name in names):
+        raise ValueError("Invalid metrics parameter")
+    budget = _thread_budget(threads or nk.getMaxNumberOfThreads(), names)
+    budget.update(metric_threads or {})
+
+    graph = _build_networkit_graph(dataset, weight)
+    graph_key = f"{weight or 'unweighted'}"
+
+    def run(name: str) -> Tuple[np.ndarray, dict]:
+        function, params = tasks[name]
+        return _compute_metric(dataset, graph, graph_key, name, function, params, budget[name], cache)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(names) if concurrent else 1) as executor:
+        futures = {name: executor.submit(run, name) for name in names}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error: {name}: {e}")
+                results[name] = (np.full(dataset.node_count, np.nan), {'error': str(e)})
+
+    metrics_df = pd.DataFrame({name: scores for name, (scores, _) in results.items()},
+                              index=pd.Index(_node_ids(dataset), name='node'))
+    metrics_df.attrs['run'] = {
+        'mode': mode,
+        'weight': weight,
+        'threads': budget,
+        'fingerprint': dataset.fingerprint,
+        **{name: info for name, (_, info) in results.items() if info}
     }
 
-    # Convert metrics(type: [{id:float},.....]) to DataFrame, unique node_id as index, and each metric as a column
-    metrics_df = pd.DataFrame(metrics)
-    metrics_df['node'] = metrics_df.index
-    metrics_df.set_index('node', inplace=True)
-
     return metrics_df
 
 
+def _run_file(metrics_path: str) -> str:
+    return os.path.splitext(metrics_path)[0] + '.json'
+
+
+def save_metrics(metrics: pd.DataFrame, metrics_path: str):
+    """保存节点度量，并在同目录写出记录计算模式与误差的 JSON 文件（如 metrics.csv -> metrics.json）"""
+    metrics.to_csv(metrics_path)
+    with open(_run_file(metrics_path), 'w', encoding='utf-8') as f:
+        json.dump(metrics.attrs.get('run', {}), f, indent=2)
+
+
 def load_metrics(metrics_path: str) -> pd.DataFrame:
     """加载节点度量数据"""
-    return pd.read_csv(metrics_path, index_col='node', low_memory=False)
+    metrics = pd.read_csv(metrics_path, index_col='node', low_memory=False)
+    if os.path.exists(_run_file(metrics_path)):
+        with open(_run_file(metrics_path), 'r', encoding='utf-8') as f:
+            metrics.attrs['run'] = json.load(f)
+    return metrics
+
+
+def compare_metrics(exact: pd.DataFrame, approx: pd.DataFrame, weights: Dict[str, float] = None) -> Dict[str, float]:
+    """
+    比较近似结果与精确结果：TOPSIS 排名的 Spearman / Kendall 秩相关系数，以及各度量的最大绝对误差
+    """
+    nodes = exact.index.intersection(approx.index)
+    a = topsis_evaluate(exact.loc[nodes], weights, as_array=True)
+    b = topsis_evaluate(approx.loc[nodes], weights, as_array=True)
+
+    report = {
+        'spearman': float(stats.spearmanr(a, b).statistic),
+        'kendall': float(stats.kendalltau(a, b).statistic)
+    }
+    for column in exact.columns.intersection(approx.columns):
+        report[f"{column}_max_error"] = float(np.nanmax(np.abs(exact.loc[nodes, column] - approx.loc[nodes, column])))
+    return report
 
 
 def topsis_evaluate(
-        metrics: pd.DataFrame, weights: Dict[str, float] = None
-) -> Dict[int, float]:
-    """基于余弦相似性TOPSIS法的节点综合评估"""
+        metrics: pd.DataFrame, weights: Dict[str, float] = None, as_array: bool = False
+) -> Union[Dict[int, float], np.ndarray]:
+    """
+    基于余弦相似性TOPSIS法的节点综合评估
+    :param as_array: 返回与 metrics 行顺序对齐的得分数组，而不是 {node_id: score} 字典
+    """
     node = metrics.index
     # 提取指标列（排除node列）
     metric_columns = [col for col in metrics.columns if col != "node"]
@@ -133,5 +343,118 @@ def topsis_evaluate(
     # 计算贴近度
     closeness = neg_distance / (pos_distance + neg_distance + epsilon)
 
+    if as_array:
+        return closeness
     # 构建结果字典 {node_id: topsis_score}
     return dict(zip(node, closeness))
+
+
+def topsis_top_k(metrics: pd.DataFrame, weights: Dict[str, float] = None, k: int = 50) -> pd.DataFrame:
+    """
+    TOPSIS 得分最高的 k 个节点：argpartition 选出前 k 个后只对这 k 个排序，不对全部节点排序
+    :return: 列为 node、score，按 score 降序排列
+    """
+    scores = topsis_evaluate(metrics, weights, as_array=True)
+    k = min(k, len(scores))
+    if k <= 0:
+        return pd.DataFrame({'node': metrics.index[:0], 'score': scores[:0]})
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return pd.DataFrame({'node': metrics.index[top], 'score': scores[top]})
+
+
+def _topsis_matrix(metrics: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
+    """指标列与按列 L2 范数规范化后的指标矩阵"""
+    metric_columns = [col for col in metrics.columns if col != "node"]
+    data = metrics[metric_columns].to_numpy(dtype=np.float64)
+    return metric_columns, data / np.linalg.norm(data, axis=0, keepdims=True)
+
+
+def topsis_batch(norm_data: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    对一组权重向量同时计算余弦 TOPSIS 贴近度，与逐个调用 topsis_evaluate 的结果一致
+    权重非负时，加权后的正/负理想解为 w * 列最大值 / w * 列最小值，因此所有点积都可由规范化矩阵与 w² 的乘积得到，
+    不必为每个权重向量构造加权矩阵
+    :param norm_data: (节点数, 指标数) 的规范化指标矩阵
+    :param weights: (权重向量数, 指标数) 的非负权重矩阵
+    :return: (权重向量数, 节点数) 的贴近度矩阵
+    """
+    squared = weights ** 2
+    column_max = norm_data.max(axis=0)
+    column_min = norm_data.min(axis=0)
+
+    pos_dot = np.einsum('nm,km->kn', norm_data, squared * column_max)
+    neg_dot = np.einsum('nm,km->kn', norm_data, squared * column_min)
+    data_norms = np.sqrt(np.einsum('nm,km->kn', norm_data ** 2, squared))
+    pos_ideal_norm = np.linalg.norm(weights * column_max, axis=1)[:, None]
+    neg_ideal_norm = np.linalg.norm(weights * column_min, axis=1)[:, None]
+
+    epsilon = 1e-10
+    pos_distance = 1 - pos_dot / (data_norms * pos_ideal_norm + epsilon)
+    neg_distance = 1 - neg_dot / (data_norms * neg_ideal_norm + epsilon)
+    return neg_distance / (pos_distance + neg_distance + epsilon)
+
+
+def dirichlet_weights(base: Dict[str, float], count: int, concentration: float = 50.0,
+                      seed: int = 0) -> pd.DataFrame:
+    """
+    在给定权重（如 AHP 得到的权重）附近按 Dirichlet 分布随机生成权重向量，用于敏感性分析
+    :param concentration: 集中度，越大越接近 base
+    """
+    columns = list(base)
+    alpha = np.array([base[col] for col in columns], dtype=np.float64)
+    alpha = alpha / alpha.sum() * concentration
+    return pd.DataFrame(np.random.default_rng(seed).dirichlet(alpha, size=count), columns=columns)
+
+
+def topsis_sweep(metrics: pd.DataFrame, weights: Union[pd.DataFrame, np.ndarray], top: int = 50,
+                 chunk_size: Optional[int] = None) -> pd.DataFrame:
+    """
+    权重敏感性分析：对每个权重向量计算 TOPSIS 排名，统计各节点排名的稳定性
+    权重向量按块批量计算，每块的中间矩阵不超过 SWEEP_CHUNK_ELEMENTS 个元素
+    :param weights: (权重向量数, 指标数) 的权重矩阵；为 DataFrame 时按列名对应指标，否则按 metrics 的列顺序
+    :param top: 统计进入前 top 名的频率
+    :param chunk_size: 每块的权重向量数，默认按节点数确定
+    :return: 以节点为索引的表：mean_rank / rank_std / best_rank / worst_rank（名次从 1 开始），
+             top_frequency（进入前 top 名的权重向量比例），按 mean_rank 升序排列
+    """
+    metric_columns, norm_data = _topsis_matrix(metrics)
+    if isinstance(weights, pd.DataFrame):
+        weights = weights[metric_columns].to_numpy(dtype=np.float64)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if weights.shape[1] != len(metric_columns):
+        raise ValueError("Weights do not match the metric columns")
+    if (weights < 0).any():
+        raise ValueError("Weights must be non-negative")
+
+    n = len(norm_data)
+    top = min(top, n)
+    chunk_size = chunk_size or max(1, SWEEP_CHUNK_ELEMENTS // max(n, 1))
+    rank_sum = np.zeros(n)
+    rank_square_sum = np.zeros(n)
+    best = np.full(n, n, dtype=np.int64)
+    worst = np.zeros(n, dtype=np.int64)
+    top_count = np.zeros(n, dtype=np.int64)
+    positions = np.arange(1, n + 1)
+
+    for start in range(0, len(weights), chunk_size):
+        scores = topsis_batch(norm_data, weights[start:start + chunk_size])
+        rows = np.arange(len(scores))[:, None]
+        ranks = np.empty(scores.shape, dtype=np.int64)
+        ranks[rows, np.argsort(-scores, axis=1, kind='stable')] = positions
+        rank_sum += ranks.sum(axis=0)
+        rank_square_sum += (ranks.astype(np.float64) ** 2).sum(axis=0)
+        best = np.minimum(best, ranks.min(axis=0))
+        worst = np.maximum(worst, ranks.max(axis=0))
+        top_count += (ranks <= top).sum(axis=0)
+
+    count = len(weights)
+    mean_rank = rank_sum / count
+    result = pd.DataFrame({
+        'mean_rank': mean_rank,
+        'rank_std': np.sqrt(np.maximum(rank_square_sum / count - mean_rank ** 2, 0)),
+        'best_rank': best,
+        'worst_rank': worst,
+        'top_frequency': top_count / count
+    }, index=metrics.index)
+    return result.sort_values('mean_rank', kind='stable')
@@ -0,0 +1,242 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from data.cache import cache_key, cached_arrays
+from data.dataset import Dataset
+from model.batch import SharedArrays, attach_arrays
+from model.scenario import SOURCE_BATCH, affected_sources, weight_matrix
+
+
+def contract_chains(node_count: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray,
+                    keep: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    提取核心图：先剪除死胡同形成的树，再收缩度为 2 的链（只有两个不同邻居、且不在 keep 中的节点被移除，
+    链两端的核心节点之间以一条边相连，边权为沿链的权重之和）；核心节点之间的最短路距离保持不变
+    沿链的累加用指针跳跃完成，每轮一次向量化操作，轮数为链长的对数
+    :param keep: 必须保留的节点位置（查询的起终点）
+    :return: (核心节点位置, 核心边起点, 核心边终点, 核心边权)，边的端点为核心节点的新编号
+    """
+    # 每对 (src, dst) 只保留最小权重，并去掉自环
+    matrix = weight_matrix(node_count, src, dst, weights, directed=True).tocoo()
+    src, dst, weights = matrix.row.astype(np.int64), matrix.col.astype(np.int64), matrix.data
+    loops = src == dst
+    src, dst, weights = src[~loops], dst[~loops], weights[~loops]
+    if not len(src):
+        core = np.arange(node_count)
+        return core, src, dst, weights
+
+    keep_mask = np.zeros(node_count, dtype=bool)
+    if keep is not None:
+        keep_mask[np.asarray(keep, dtype=np.int64)] = True
+
+    # 反复剪除不在 keep 中的叶子节点（死胡同及其所在的树），其他节点间的最短路不会经过它们
+    pairs = np.unique(np.concatenate([src * node_count + dst, dst * node_count + src]))
+    alive = np.ones(node_count, dtype=bool)
+    while True:
+        pairs = pairs[alive[pairs // node_count] & alive[pairs % node_count]]
+        neighbor_count = np.bincount(pairs // node_count, minlength=node_count)
+        leaves = alive & (neighbor_count <= 1) & ~keep_mask
+        if not leaves.any():
+            break
+        alive &= ~leaves
+    live = alive[src] & alive[dst]
+    src, dst, weights = src[live], dst[live], weights[live]
+    if not len(src):
+        core = np.flatnonzero(alive)
+        return core, src, dst, weights
+
+    # 只有两个不同邻居（不分方向）的节点可以收缩
+    removable = (neighbor_count == 2) & ~keep_mask
+
+    # 对进入可移除节点 y 的边 x -> y，下一条边为 y -> z（z 为 y 的另一个邻居）；不存在时该链为死路
+    arc_of = pd.Series(np.arange(len(src)), index=src * node_count + dst)
+    owner = pairs // node_count
+    first = pairs[np.minimum(np.searchsorted(owner, np.arange(node_count)), len(pairs) - 1)] % node_count
+    last = pairs[np.maximum(np.searchsorted(owner, np.arange(node_count), side='right') - 1, 0)] % node_count
+    into = removable[dst]
+    other = np.where(first[dst] == src, last[dst], first[dst])
+    following = arc_of.reindex(dst * node_count + other).to_numpy()
+    # -1 表示链在此结束，-2 表示死路
+    pointer = np.where(into, np.where(np.isnan(following), -2, following), -1).astype(np.int64)
+
+    total = weights.astype(np.float64).copy()
+    end = np.arange(len(src))
+    for _ in range(int(np.ceil(np.log2(max(len(src), 2)))) + 1):
+        active = np.flatnonzero(pointer >= 0)
+        if not len(active):
+            break
+        target = pointer[active]
+        total[active] = total[active] + total[target]
+        end[active] = end[target]
+        pointer[active] = pointer[target]
+    # 仍未结束的为全部由可移除节点组成的环，与死路一起丢弃
+
+    core = np.flatnonzero(alive & ~removable)
+    position = np.full(node_count, -1, dtype=np.int64)
+    position[core] = np.arange(len(core))
+    selected = ~removable[src] & (pointer == -1)
+    return core, position[src[selected]], position[dst[end[selected]]], total[selected]
+
+
+def _distances(matrix: sparse.csr_matrix, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    return csgraph.dijkstra(matrix, directed=True, indices=rows)[:, columns]
+
+
+# 工作进程中的核心图，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(spec: Dict[str, Tuple[str, str, tuple]], shape: Tuple[int, int]):
+    blocks, arrays = attach_arrays(spec)
+    matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    _worker.update(blocks=blocks, matrix=matrix, columns=arrays['columns'])
+
+
+def _query_batch(rows: np.ndarray) -> np.ndarray:
+    return _distances(_worker['matrix'], rows, _worker['columns'])
+
+
+class Router:
+    """
+    基于 Dataset 路网的最短路引擎，默认以自由流行驶时间（秒）为边权，遵守单行道方向
+    预处理时收缩度为 2 的链得到核心图，起终点之间的 OD 矩阵在核心图上用 scipy 的多源 Dijkstra 计算；
+    结果按路网版本（数据集指纹与边权）缓存，边权少量变化后只重新计算受影响的起点
+    """
+
+    def __init__(self, dataset: Dataset, weights: Optional[np.ndarray] = None, directed: bool = True,
+                 terminals: Optional[Iterable[int]] = None, cache: bool = True):
+        """
+        :param weights: 每条边（与 Dataset.edge_column 对齐）的权重，默认为 edge_travel_times()
+        :param terminals: 预先保留为核心节点的节点位置，例如公交站点或交通小区的中心节点
+        """
+        self._dataset = dataset
+        self._weights = dataset.edge_travel_times() if weights is None else np.asarray(weights, dtype=np.float64)
+        self._directed = directed
+        self._cache = cache
+        self._terminals = np.unique(np.asarray([] if terminals is None else list(terminals), dtype=np.int64))
+        self._results: Dict[Tuple[bytes, bytes], np.ndarray] = {}
+        self._build()
+
+    def _build(self):
+        adjacency = self._dataset.adjacency
+        src, dst = adjacency.arc_src, adjacency.arc_dst
+        weights = self._weights[adjacency.arc_edge]
+        if not self._directed:
+            src, dst, weights = np.concatenate([src, dst]), np.concatenate([dst, src]), np.concatenate([weights] * 2)
+        self._core, core_src, core_dst, core_weights = contract_chains(
+            self._dataset.node_count, src, dst, weights, self._terminals)
+        self._position = np.full(self._dataset.node_count, -1, dtype=np.int64)
+        self._position[self._core] = np.arange(len(self._core))
+        self._matrix = weight_matrix(len(self._core), core_src, core_dst, core_weights, directed=True)
+
+    @property
+    def version(self) -> str:
+        """路网版本：数据集指纹、边权与方向"""
+        digest = hashlib.sha256(np.ascontiguousarray(self._weights).tobytes()).hexdigest()
+        return cache_key(self._dataset.fingerprint, digest, self._directed)
+
+    @property
+    def core_size(self) -> int:
+        return len(self._core)
+
+    def _ensure_terminals(self, nodes: np.ndarray):
+        missing = nodes[self._position[nodes] < 0]
+        if len(missing):
+            self._terminals = np.union1d(self._terminals, missing)
+            self._results.clear()
+            self._build()
+
+    def od_matrix(self, origins: Iterable[int], destinations: Iterable[int],
+                  processes: Optional[int] = 1) -> np.ndarray:
+        """
+        起点到终点的最短路距离矩阵（不可达为 inf）
+        :param origins: 起点的节点位置
+        :param destinations: 终点的节点位置
+        :param processes: 进程数，为 None 时使用全部核心；核心图放入共享内存，按起点分批分发
+        """
+        origins = np.asarray(list(origins), dtype=np.int64)
+        destinations = np.asarray(list(destinations), dtype=np.int64)
+        self._ensure_terminals(np.concatenate([origins, destinations]))
+
+        key = (origins.tobytes(), destinations.tobytes())
+        if key not in self._results:
+            if self._cache:
+                # 同一组起终点按路网版本缓存，只保留最近使用的 CACHE_ENTRIES 个版本
+                query = hashlib.sha256(key[0] + b'|' + key[1]).hexdigest()[:16]
+                self._results[key] = cached_arrays(
+                    f"od_{query}", self.version,
+                    (lambda: {'dist': self._query(origins, destinations, processes)}))['dist']
+            else:
+                self._results[key] = self._query(origins, destinations, processes)
+        return self._results[key]
+
+    def _query(self, origins: np.ndarray, destinations: np.ndarray, processes: Optional[int] = 1) -> np.ndarray:
+        rows = self._position[origins]
+        columns = self._position[destinations]
+        batches = [rows[start:start + SOURCE_BATCH] for start in range(0, len(rows), SOURCE_BATCH)]
+        if processes == 1 or len(batches) <= 1:
+            return np.concatenate([_distances(self._matrix, batch, columns) for batch in batches] or
+                                  [np.empty((0, len(columns)))])
+
+        matrix = self._matrix
+        arrays = {'indptr': matrix.indptr, 'indices': matrix.indices, 'data': matrix.data, 'columns': columns}
+        with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker, initargs=(shared.spec, matrix.shape)) as executor:
+            return np.concatenate(list(executor.map(_query_batch, batches)))
+
+    def travel_times(self, origins: Iterable[int], destinations: Iterable[int]) -> pd.DataFrame:
+        """以节点 id 指定起终点，返回以起点 id 为索引、终点 id 为列的距离表"""
+        origins = np.asarray(list(origins))
+        destinations = np.asarray(list(destinations))
+        origin_index = self._dataset.node_indexer(origins)
+        destination_index = self._dataset.node_indexer(destinations)
+        if (origin_index < 0).any() or (destination_index < 0).any():
+            raise KeyError("Unknown node id in origins or destinations")
+        return pd.DataFrame(self.od_matrix(origin_index, destination_index),
+                            index=pd.Index(origins, name='origin'), columns=pd.Index(destinations, name='destination'))
+
+    def reweight(self, edges: Iterable[int], weights: Iterable[float],
+                 both_directions: Optional[bool] = None) -> 'Router':
+        """
+        修改部分边的权重，返回新的 Router；已计算的 OD 矩阵随之迁移，只重新计算最短路可能变化的起点
+        :param edges: 边在 Dataset 中的位置，每条边即一个通行方向
+        :param weights: 新的权重，inf 表示道路封闭
+        :param both_directions: 同时修改双向道路另一个方向的行（见 Dataset.reverse_edges）；
+                                默认只在无向时修改，因为无向图中另一个方向的行仍会使道路保持通行
+        """
+        edges = np.asarray(list(edges), dtype=np.int64)
+        weights = np.broadcast_to(np.asarray(list(weights), dtype=np.float64), edges.shape)
+        if both_directions is None:
+            both_directions = not self._directed
+        if both_directions:
+            reverse = self._dataset.reverse_edges()[edges]
+            paired = reverse >= 0
+            edges, weights = np.concatenate([edges, reverse[paired]]), np.concatenate([weights, weights[paired]])
+        updated = self._weights.copy()
+        updated[edges] = weights
+        router = Router.__new__(Router)
+        router._dataset = self._dataset
+        router._weights = updated
+        router._directed = self._directed
+        router._cache = self._cache
+        router._terminals = self._terminals
+        router._results = {}
+        router._build()
+
+        # 核心节点只取决于拓扑与 terminals（权重为 inf 的封闭道路仍计入拓扑），编号与原 Router 一致
+        changed = affected_sources(self._matrix, router._matrix, directed=True)
+        for key, dist in self._results.items():
+            origins = np.frombuffer(key[0], dtype=np.int64)
+            destinations = np.frombuffer(key[1], dtype=np.int64)
+            stale = np.flatnonzero(np.isin(self._position[origins], changed))
+            dist = dist.copy()
+            if len(stale):
+                dist[stale] = router._query(origins[stale], destinations)
+            router._results[key] = dist
+        return router
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+# the paths in _references are relative to src, like when running main.py
+os.chdir(SRC)
+
+
+@pytest.fixture(scope='session')
+def city(tmp_path_factory):
+    """Source files of a small synthetic city."""
+    from benchmark.synthetic import write_synthetic_city
+    return write_synthetic_city(str(tmp_path_factory.mktemp('city')), 3000, seed=1)
+
+
+@pytest.fixture(scope='session')
+def dataset(city):
+    """The loaded dataset of the synthetic city, shared by the tests that do not modify it."""
+    from data.dataset import Dataset
+    dataset = Dataset(bbox=None, cache=False, nodes_file=city['nodes'], edges_file=city['edges'])
+    dataset.load()
+    return dataset
@@ -0,0 +1,61 @@
+import networkit as nk
+import numpy as np
+
+from data.adjacency import Adjacency
+
+
+def _baseline_graph(dataset):
+    """The graph of the original builder, which added both directions of every two-way row."""
+    graph = nk.Graph(dataset.node_count, directed=False)
+    mapping = {node.id: i for i, node in enumerate(dataset.nodes)}
+    for edge in dataset.edges:
+        u, v = mapping[edge.u], mapping[edge.v]
+        if edge.oneway:
+            graph.addEdge(*((v, u) if edge.reversed else (u, v)))
+        else:
+            graph.addEdge(u, v)
+            graph.addEdge(v, u)
+    return graph
+
+
+def test_two_way_road_yields_one_arc_per_row():
+    # a two-way road 0 - 1 exported as two rows, the second one reversed, and a one-way road 1 -> 2
+    u = np.array([0, 1, 1])
+    v = np.array([1, 0, 2])
+    adjacency = Adjacency(3, u, v)
+
+    assert adjacency.arc_count == 3
+    assert adjacency.out_edges(0).tolist() == [0]
+    assert adjacency.in_edges(0).tolist() == [1]
+    assert sorted(adjacency.out_edges(1).tolist()) == [1, 2]
+    assert adjacency.in_edges(2).tolist() == [2]
+    assert adjacency.out_edges(2).tolist() == []
+    assert sorted(adjacency.neighbors(1).tolist()) == [0, 2]
+    assert adjacency.degree().tolist() == [2, 3, 1]
+
+
+def test_rows_with_unknown_nodes_are_skipped():
+    adjacency = Adjacency(2, np.array([0, -1]), np.array([1, 0]))
+    assert adjacency.arc_edge.tolist() == [0]
+
+
+def test_dataset_arcs_match_rows(dataset):
+    adjacency = dataset.adjacency
+    assert adjacency.arc_count == dataset.edge_count
+    assert np.array_equal(adjacency.arc_src, dataset.edge_column('u_index'))
+    assert np.array_equal(adjacency.arc_dst, dataset.edge_column('v_index'))
+
+
+def test_arc_count_against_baseline_graph(dataset):
+    oneway = dataset.edge_column('oneway')
+    one_way_rows, two_way_rows = int(oneway.sum()), int((~oneway).sum())
+    adjacency = dataset.adjacency
+    assert two_way_rows > 0
+    assert adjacency.arc_count == one_way_rows + two_way_rows
+
+    # a two-way road has a row per direction, so the baseline counted each of its directions twice
+    baseline = _baseline_graph(dataset)
+    assert baseline.numberOfEdges() == adjacency.arc_count + two_way_rows
+    baseline_pairs = {frozenset(pair) for pair in baseline.iterEdges()}
+    pairs = {frozenset(pair) for pair in zip(adjacency.arc_src.tolist(), adjacency.arc_dst.tolist())}
+    assert pairs == baseline_pairs
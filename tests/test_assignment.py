@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from scipy.sparse import csgraph
+
+from model.assignment import TrafficAssignment
+from model.scenario import weight_matrix
+
+
+@pytest.fixture(scope='module')
+def assignment(dataset):
+    return TrafficAssignment(dataset)
+
+
+@pytest.fixture(scope='module')
+def demand(dataset):
+    rng = np.random.default_rng(0)
+    origins = rng.choice(dataset.node_count, 8, replace=False)
+    destinations = rng.choice(dataset.node_count, 10, replace=False)
+    return origins, destinations, rng.uniform(2000, 8000, (len(origins), len(destinations)))
+
+
+def _beckmann(assignment, flows):
+    """The user equilibrium objective, the sum of the integrals of the link costs."""
+    a, b = assignment.alpha, assignment.beta
+    return float((assignment.free_flow_time * (flows + a * flows ** (b + 1) /
+                                               ((b + 1) * assignment.capacity ** b))).sum())
+
+
+def test_one_link_per_edge_row(dataset, assignment):
+    assert len(assignment.src) == dataset.edge_count
+    reverse = dataset.reverse_edges()
+    paired = np.flatnonzero(reverse >= 0)
+    # each direction of a two-way road is its own link with its own row's capacity
+    np.testing.assert_allclose(assignment.capacity[paired], assignment._capacities()[paired])
+    assert not np.any((assignment.src[paired] == assignment.src[reverse[paired]]) &
+                      (assignment.dst[paired] == assignment.dst[reverse[paired]]))
+
+
+def test_all_or_nothing_loads_shortest_paths(dataset, assignment, demand):
+    origins, destinations, volumes = demand
+    flows, unassigned = assignment.all_or_nothing(assignment.free_flow_time, origins, destinations, volumes)
+    matrix = weight_matrix(dataset.node_count, assignment.src, assignment.dst, assignment.free_flow_time,
+                           directed=True)
+    dist = csgraph.dijkstra(matrix, directed=True, indices=origins)[:, destinations]
+    reached = np.isfinite(dist)
+    assert unassigned == pytest.approx(volumes[~reached].sum())
+    assert float(np.dot(flows, assignment.free_flow_time)) == pytest.approx(
+        float((dist[reached] * volumes[reached]).sum()), rel=1e-9)
+
+
+def test_frank_wolfe_converges(assignment, demand):
+    origins, destinations, volumes = demand
+    results = [assignment.assign(origins, destinations, volumes, max_iterations=iterations, gap=1e-6)
+               for iterations in (5, 20, 100)]
+    gaps = [result['gap'] for result in results]
+    assert gaps[0] > gaps[1] > gaps[2]
+    assert gaps[2] < 0.02
+
+    initial, _ = assignment.all_or_nothing(assignment.free_flow_time, origins, destinations, volumes)
+    objectives = [_beckmann(assignment, flows) for flows in [initial] + [result['flows'] for result in results]]
+    assert objectives == sorted(objectives, reverse=True)
+
+
+def test_flows_are_conserved(dataset, assignment, demand):
+    origins, destinations, volumes = demand
+    result = assignment.assign(origins, destinations, volumes, max_iterations=10)
+    assert result['unassigned'] == 0
+    n = dataset.node_count
+    net = (np.bincount(assignment.src, weights=result['flows'], minlength=n) -
+           np.bincount(assignment.dst, weights=result['flows'], minlength=n))
+    expected = np.zeros(n)
+    np.add.at(expected, origins, volumes.sum(axis=1))
+    np.add.at(expected, destinations, -volumes.sum(axis=0))
+    np.testing.assert_allclose(net, expected, atol=1e-6 * volumes.sum())
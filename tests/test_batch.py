@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import csgraph
+
+from model.batch import SCENARIO_COLUMNS, run_scenarios
+from model.metrics import graph_arrays
+from model.scenario import Scenario, weight_matrix
+
+
+def _two_way_key(dataset, position=0):
+    edge = np.flatnonzero(dataset.reverse_edges() >= 0)[position]
+    return tuple(dataset.table_edges.index[edge])
+
+
+@pytest.fixture(scope='module')
+def scenarios(dataset):
+    nodes = dataset.node_column('id')
+    return [
+        Scenario('nothing'),
+        Scenario('closures').remove(dataset, [_two_way_key(dataset, i) for i in range(0, 200, 10)]),
+        Scenario('shortcut').add(dataset, int(nodes[0]), int(nodes[-1])),
+    ]
+
+
+def test_serial_matches_processes(dataset, scenarios, tmp_path):
+    serial = run_scenarios(dataset, scenarios, sources=32, processes=1)
+    output = tmp_path / 'scenarios.csv'
+    parallel = run_scenarios(dataset, scenarios, sources=32, processes=2, output=str(output))
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert list(serial.columns) == list(SCENARIO_COLUMNS)
+    assert list(serial['scenario']) == ['nothing', 'closures', 'shortcut']
+    written = pd.read_csv(output).set_index('scenario').loc[serial['scenario']].reset_index()
+    np.testing.assert_allclose(written['aspl'], serial['aspl'])
+
+
+def test_rows_match_direct_computation(dataset, scenarios):
+    result = run_scenarios(dataset, scenarios, sources=32, processes=1)
+    nothing, closures, shortcut = result.to_dict('records')
+    assert nothing['aspl_change'] == 0 and nothing['connectivity_loss'] == 0
+    assert nothing['top_betweenness_change'] == pytest.approx(0)
+    assert closures['aspl_change'] > 0 or closures['connectivity_loss'] > 0
+    assert shortcut['aspl_change'] <= 0 and shortcut['connectivity_loss'] == 0
+
+    arrays = graph_arrays(dataset, 'travel_time')
+    sources = np.sort(np.random.default_rng(0).choice(dataset.node_count, size=32, replace=False))
+    src, dst, weights = scenarios[1].apply(arrays['src'], arrays['dst'], arrays['weight'],
+                                           dataset.adjacency.arc_edge)
+    dist = csgraph.dijkstra(weight_matrix(dataset.node_count, src, dst, weights), directed=False, indices=sources)
+    dist[np.arange(len(sources)), sources] = np.inf
+    assert closures['aspl'] == pytest.approx(dist[np.isfinite(dist)].mean())
@@ -0,0 +1,20 @@
+import numpy as np
+
+from benchmark.suite import compare_results, load_results, run_benchmark, save_results
+
+
+def test_small_run_and_compare(tmp_path):
+    run = run_benchmark(1000, folder=str(tmp_path / 'city'), skip=['draw_traffic_map', 'eigenvector_centrality'])
+    assert run['edges'] > 0 and run['nodes'] > 0
+    for name in ('generate', 'dataset_load', 'load_sets', 'betweenness_centrality', 'topsis_evaluate'):
+        assert run['stages'][name] >= 0
+    assert 'draw_traffic_map' not in run['stages'] and 'eigenvector_centrality' not in run['stages']
+
+    path = str(tmp_path / 'results' / 'benchmark.json')
+    save_results([run], path)
+    baseline = load_results(path)
+    slower = dict(run, stages={name: seconds * 2 for name, seconds in run['stages'].items()})
+    comparison = compare_results(baseline, [slower, dict(run, edges=-1)])
+    assert list(comparison['stage']) == list(run['stages'])
+    assert (comparison['edges'] == run['edges']).all()
+    np.testing.assert_allclose(comparison['ratio'].dropna(), 2)
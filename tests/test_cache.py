@@ -0,0 +1,44 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from data import cache
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DATA_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+def _load(key, builds):
+    def build():
+        builds.append(key)
+        return {'value': np.array([len(key)])}
+    return cache.cached_arrays('table', key, build)
+
+
+def test_keys_of_a_name_are_kept_side_by_side(folder):
+    builds = []
+    for key in ('a', 'b', 'a', 'b'):
+        _load(key, builds)
+        time.sleep(0.01)
+    assert builds == ['a', 'b']
+
+
+def test_least_recently_used_keys_are_evicted(folder):
+    builds = []
+    keys = [f"k{i}" for i in range(cache.CACHE_ENTRIES + 1)]
+    for key in keys[:-1]:
+        _load(key, builds)
+        time.sleep(0.01)
+    _load(keys[0], builds)  # a hit makes k0 the most recently used
+    time.sleep(0.01)
+    _load(keys[-1], builds)
+
+    kept = sorted(name.split('-')[1].split('.')[0] for name in os.listdir(folder))
+    assert len(kept) == cache.CACHE_ENTRIES
+    assert keys[1] not in kept and keys[0] in kept and keys[-1] in kept
+    assert builds == keys
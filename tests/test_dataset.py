@@ -0,0 +1,90 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from data.dataset import Dataset
+from data.geometry import LineStore
+
+
+@pytest.fixture(scope='module')
+def compact(city):
+    dataset = Dataset(bbox=None, cache=False, nodes_file=city['nodes'], edges_file=city['edges'], compact=True)
+    dataset.load()
+    return dataset
+
+
+def _values(column) -> np.ndarray:
+    values = np.asarray(column, dtype=object)
+    return np.array([None if pd.isna(value) else value for value in values], dtype=object)
+
+
+def _assert_same_columns(columns, expected, compact_columns):
+    assert columns.keys() == expected.keys()
+    for name, column in columns.items():
+        if isinstance(column, LineStore):
+            assert np.array_equal(column.offsets, expected[name].offsets)
+            assert np.allclose(column.coordinates, expected[name].coordinates, rtol=0, atol=1e-12)
+        elif np.issubdtype(np.asarray(column).dtype, np.floating):
+            assert np.allclose(column, expected[name], rtol=1e-6), name
+        else:
+            assert list(_values(column)) == list(_values(expected[name])), name
+            if name in compact_columns:
+                assert isinstance(column, pd.Categorical), name
+
+
+def test_compact_mode_loads_the_same_values(dataset, compact):
+    assert compact.node_count == dataset.node_count and compact.edge_count == dataset.edge_count
+    _assert_same_columns(compact._nodes, dataset._nodes, {'ref'})
+    _assert_same_columns(compact._edges, dataset._edges, {'name', 'ref', 'width'})
+    assert compact.node_column('street_count').dtype == np.int16
+    assert compact.edge_column('lanes').dtype == np.int8
+    assert compact.edge_column('length').dtype == np.float32
+    assert np.allclose(compact.edge_travel_times(), dataset.edge_travel_times(), rtol=1e-6)
+    assert compact.footprint().sum() < dataset.footprint().sum()
+
+
+def _text(value):
+    return None if pd.isna(value) else value
+
+
+def test_node_and_edge_views_read_the_table_rows(dataset):
+    """The views over the column arrays return what the per-row Series of the tables held."""
+    nodes = dataset.table_nodes
+    for node in dataset.nodes[::37]:
+        row = nodes.iloc[node.index]
+        assert node.id == row.name and dataset.node(row.name) == node
+        assert (node.type, node.ref, node.railway) == (_text(row['highway']), _text(row['ref']),
+                                                       _text(row['railway']))
+        assert node.street_count == row['street_count']
+        assert node.point.equals(Point(row['x'], row['y']))
+
+    edges = dataset.table_edges
+    for edge in dataset.edges[::29]:
+        row = edges.iloc[edge.index]
+        assert (edge.u, edge.v, edge.key) == row.name and dataset.edge(row.name) == edge
+        assert edge.osm_id == [row['osmid']]
+        assert edge.highway == (_text(row['highway']) or '') and edge.access == (_text(row['access']) or '')
+        assert (edge.name, edge.ref, edge.speed_limit) == (_text(row['name']), _text(row['ref']),
+                                                           _text(row['maxspeed']))
+        # list values like "['2', '3']" are read as their first number
+        assert edge.lanes == (int(re.findall(r'\d+', str(row['lanes']))[0]) if pd.notna(row['lanes']) else 1)
+        assert edge.oneway == (str(row['oneway']).upper() == 'TRUE')
+        assert edge.reversed == (str(row['reversed']).upper() == 'TRUE')
+        assert edge.bridge == (row['bridge'] == 'yes')
+        assert edge.length == row['length']
+        assert edge.geometry.equals_exact(row['geometry'], 0)
+        assert edge.node_u.id == row.name[0] and edge.node_v.id == row.name[1]
+
+
+def test_node_edges_match_a_scan_of_all_edges(dataset):
+    u, v = dataset.edge_column('u_index'), dataset.edge_column('v_index')
+    for node in dataset.nodes[::53]:
+        touching = np.flatnonzero((u == node.index) | (v == node.index))
+        assert sorted(edge.index for edge in node.edges) == list(touching)
+        assert sorted(edge.index for edge in node.out_edges) == list(np.flatnonzero(u == node.index))
+        assert sorted(edge.index for edge in node.in_edges) == list(np.flatnonzero(v == node.index))
+        ends = set(u[touching]) | set(v[touching])
+        assert sorted(other.index for other in node.neighbors) == sorted(ends - {node.index})
@@ -0,0 +1,40 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from data.dataset import Dataset, read_edge_table, read_node_table
+from data.geometry import LineStore
+
+
+def _assert_same_store(store, expected):
+    assert np.array_equal(store.offsets, expected.offsets)
+    assert np.array_equal(store.coordinates, expected.coordinates)
+
+
+def test_from_wkt_matches_shapely(city):
+    texts = pd.read_csv(city['edges'], usecols=['geometry'])['geometry'].to_numpy(dtype=object)
+    texts[::7] = None  # edges without a geometry of their own
+    texts[1] = 'LINESTRING EMPTY'
+    _assert_same_store(LineStore.from_wkt(texts), LineStore.from_shapely(shapely.from_wkt(texts)))
+
+    start, end = np.zeros((len(texts), 2)), np.ones((len(texts), 2))
+    _assert_same_store(LineStore.from_wkt(texts, start, end),
+                       LineStore.from_shapely(shapely.from_wkt(texts), start, end))
+
+
+def test_table_geometries_are_built_on_first_use(city):
+    nodes = read_node_table(city['nodes'], None)
+    edges = read_edge_table(city['edges'], nodes.index)
+    missing = edges.index[::5]
+    edges.loc[missing, 'geometry'] = np.nan
+    dataset = Dataset.from_tables(nodes, edges, 'geometry', bbox=None)
+    dataset.load()
+    assert dataset._edge_table is None
+
+    expected = gpd.GeoSeries.from_wkt(pd.read_csv(city['edges'], index_col=['u', 'v', 'key'])['geometry'])
+    expected.loc[missing] = None
+    geometry = dataset.table_edges.geometry
+    assert geometry.index.equals(edges.index)
+    assert geometry.isna().equals(expected.isna())
+    assert geometry.geom_equals_exact(expected, 0)[expected.notna()].all()
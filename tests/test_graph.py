@@ -0,0 +1,58 @@
+import re
+
+import networkit as nk
+import pytest
+
+from data import cache
+from data.dataset import DEFAULT_SPEED, DEFAULT_SPEEDS, MPH
+from model.metrics import _build_networkit_graph
+
+
+def _speed(edge) -> float:
+    """Free-flow speed of one edge in m/s, from its maxspeed or else the default of its highway type."""
+    match = re.search(r'-?\d+(?:\.\d+)?', str(edge.speed_limit or ''))
+    speed = float(match.group()) if match else 0
+    if speed <= 0:
+        highway = re.search(r'[a-z_]+', edge.highway)
+        speed = DEFAULT_SPEEDS.get(highway.group() if highway else '', DEFAULT_SPEED)
+    return speed * MPH
+
+
+def _reference_graph(dataset, weight, directed):
+    """One edge per row, added one at a time."""
+    graph = nk.Graph(dataset.node_count, weighted=weight is not None, directed=directed)
+    for edge in dataset.edges:
+        u, v = edge.node_u.index, edge.node_v.index
+        if weight is None:
+            graph.addEdge(u, v)
+        else:
+            graph.addEdge(u, v, edge.length if weight == 'length' else edge.length / _speed(edge))
+    return graph
+
+
+def _edges(graph):
+    """The (u, v, weight) triples of the graph, with u < v when undirected."""
+    return sorted(((u, v) if graph.isDirected() else tuple(sorted((u, v)))) + (round(w, 9),)
+                  for u, v, w in graph.iterEdgesWeights())
+
+
+@pytest.mark.parametrize('weight', [None, 'length', 'travel_time'])
+@pytest.mark.parametrize('directed', [False, True])
+def test_graph_matches_a_row_by_row_build(dataset, weight, directed):
+    graph = _build_networkit_graph(dataset, weight, directed, cache=False)
+    reference = _reference_graph(dataset, weight, directed)
+    assert graph.numberOfNodes() == reference.numberOfNodes()
+    assert graph.numberOfEdges() == reference.numberOfEdges() == dataset.edge_count
+    assert _edges(graph) == _edges(reference)
+
+
+def test_cached_graph_is_the_same(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DATA_FOLDER', str(tmp_path))
+    built = _build_networkit_graph(dataset, 'travel_time')
+    loaded = _build_networkit_graph(dataset, 'travel_time')
+    assert _edges(loaded) == _edges(built) == _edges(_build_networkit_graph(dataset, 'travel_time', cache=False))
+
+
+def test_unknown_weight_raises(dataset):
+    with pytest.raises(ValueError):
+        _build_networkit_graph(dataset, 'lanes', cache=False)
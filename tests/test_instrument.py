@@ -0,0 +1,83 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from data import instrument
+from data.instrument import count, stage, timed
+
+
+@pytest.fixture
+def recording():
+    instrument.enable()
+    instrument.reset()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+@timed('work')
+def _work(value):
+    return value * 2
+
+
+def test_nothing_is_recorded_while_off():
+    assert not instrument.enabled()
+    instrument.reset()
+    with stage('outer') as frame:
+        count('rows', 10)
+        assert _work(2) == 4
+    assert frame is None
+    report = instrument.report()
+    assert report['stages'] == {} and report['counters'] == {}
+
+
+def test_stages_nest_and_add_up(recording):
+    for _ in range(2):
+        with stage('outer') as outer:
+            with stage('inner') as inner:
+                count('rows', 5)
+            assert _work(3) == 6
+    assert outer['seconds'] >= inner['seconds'] >= 0
+
+    stages = instrument.report()['stages']
+    assert list(stages) == ['outer/inner', 'outer/work', 'outer']
+    assert all(record['calls'] == 2 for record in stages.values())
+    assert stages['outer']['seconds'] >= stages['outer/inner']['seconds']
+    assert instrument.report()['counters'] == {'rows': 10}
+
+
+def test_threads_keep_their_own_stage_paths(recording):
+    def run():
+        with stage('worker'):
+            count('rows')
+
+    with stage('main'):
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    stages = instrument.report()['stages']
+    assert stages['worker']['calls'] == 4 and 'main/worker' not in stages
+    assert instrument.report()['counters'] == {'rows': 4}
+
+
+def test_memory_peaks_are_traced(tmp_path):
+    instrument.enable(memory=True)
+    instrument.reset()
+    try:
+        with stage('allocate'):
+            block = np.ones(4_000_000, dtype=np.uint8)
+            del block
+        path = instrument.write_report(str(tmp_path / 'report.json'))
+    finally:
+        instrument.disable()
+        instrument.reset()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['memory_traced']
+    assert report['stages']['allocate']['traced_peak'] >= 4_000_000
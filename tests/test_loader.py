@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import cache
+from data.dataset import Dataset
+from data.geometry import LineStore
+from data.loader import load_sets
+from data.traffic import TrafficSet
+from data.transit import TransitSet
+
+
+@pytest.fixture(scope='module')
+def serial(city):
+    dataset = Dataset(bbox=None, cache=False, nodes_file=city['nodes'], edges_file=city['edges'])
+    dataset.load()
+    transit = TransitSet(city['stops'], city['routes'])
+    transit.load()
+    return dataset, TrafficSet(city['traffic']), transit
+
+
+def _load(city, **kwargs):
+    return load_sets(bbox=None, nodes_file=city['nodes'], edges_file=city['edges'], traffic_file=city['traffic'],
+                     stops_file=city['stops'], routes_file=city['routes'], **kwargs)
+
+
+def _assert_same_columns(columns, expected):
+    assert columns.keys() == expected.keys()
+    for name, column in columns.items():
+        if isinstance(column, LineStore):
+            assert np.array_equal(column.offsets, expected[name].offsets)
+            assert np.array_equal(column.coordinates, expected[name].coordinates)
+        else:
+            assert pd.Series(column).equals(pd.Series(expected[name])), name
+
+
+def _assert_same_sets(loaded, serial):
+    dataset, traffic, transit = serial
+    assert loaded.dataset.fingerprint == dataset.fingerprint
+    pd.testing.assert_frame_equal(loaded.dataset.table_nodes, dataset.table_nodes)
+    pd.testing.assert_frame_equal(loaded.dataset.table_edges, dataset.table_edges)
+    _assert_same_columns(loaded.dataset._nodes, dataset._nodes)
+    _assert_same_columns(loaded.dataset._edges, dataset._edges)
+    assert np.array_equal(loaded.dataset.adjacency.arc_src, dataset.adjacency.arc_src)
+    assert np.array_equal(loaded.dataset.adjacency.arc_dst, dataset.adjacency.arc_dst)
+
+    pd.testing.assert_frame_equal(loaded.traffic.data, traffic.data)
+    pd.testing.assert_frame_equal(loaded.traffic.node_traffic_matrix(), traffic.node_traffic_matrix())
+
+    pd.testing.assert_frame_equal(loaded.transit.table_bus_stops, transit.table_bus_stops)
+    pd.testing.assert_frame_equal(loaded.transit.table_bus_routes, transit.table_bus_routes)
+    assert all(np.array_equal(a, b) for a, b in zip(loaded.transit.route_stop_pairs, transit.route_stop_pairs))
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_loaded_sets_match_the_serial_constructors(city, serial, processes):
+    loaded = _load(city, cache=False, processes=processes)
+    _assert_same_sets(loaded, serial)
+    assert set(loaded.timings) >= {'nodes', 'edges', 'dataset', 'traffic', 'transit', 'total'}
+
+
+def test_cached_tables_load_the_same_sets(city, serial, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DATA_FOLDER', str(tmp_path))
+    for _ in range(2):
+        _assert_same_sets(_load(city), serial)
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import cache, instrument
+from model.metrics import calculate_metrics, compare_metrics, load_metrics, save_metrics
+
+METRICS = ['degree_centrality', 'betweenness_centrality', 'closeness_centrality']
+ALL_METRICS = METRICS + ['eigenvector_centrality', 'pagerank']
+
+
+@pytest.mark.parametrize('weight', [None, 'length'])
+def test_approx_mode_within_epsilon_of_exact(dataset, weight):
+    epsilon = 0.02
+    exact = calculate_metrics(dataset, weight, 'exact', metrics=METRICS, cache=False)
+    approx = calculate_metrics(dataset, weight, 'approx', epsilon=epsilon, closeness_epsilon=0.2, metrics=METRICS,
+                               cache=False)
+    run = approx.attrs['run']['betweenness_centrality']
+    assert run['epsilon'] == epsilon and run['samples'] > 0
+    assert approx.attrs['run']['closeness_centrality']['samples'] < dataset.node_count
+
+    report = compare_metrics(exact, approx)
+    assert report['betweenness_centrality_max_error'] <= epsilon
+    assert report['degree_centrality_max_error'] == 0
+    assert report['spearman'] >= 0.99 and report['kendall'] >= 0.9
+    assert np.isfinite(approx.to_numpy()).all()
+
+
+def test_unknown_mode_raises(dataset):
+    with pytest.raises(ValueError):
+        calculate_metrics(dataset, 'length', 'kadabra', cache=False)
+
+
+def test_saved_metrics_load_with_their_run(dataset, tmp_path):
+    metrics = calculate_metrics(dataset, 'length', 'approx', epsilon=0.05, closeness_epsilon=0.3, metrics=METRICS,
+                                cache=False)
+    path = str(tmp_path / 'metrics.csv')
+    save_metrics(metrics, path)
+    assert os.path.exists(tmp_path / 'metrics.json')
+
+    loaded = load_metrics(path)
+    pd.testing.assert_frame_equal(loaded, metrics)
+    assert loaded.attrs['run'] == metrics.attrs['run']
+    assert loaded.attrs['run']['mode'] == 'approx' and loaded.attrs['run']['fingerprint'] == dataset.fingerprint
+
+
+def test_concurrent_metrics_match_serial_ones(dataset):
+    serial = calculate_metrics(dataset, 'length', concurrent=False, cache=False)
+    concurrent = calculate_metrics(dataset, 'length', threads=4, concurrent=True, cache=False)
+    assert list(concurrent.columns) == list(serial.columns) == list(ALL_METRICS)
+    pd.testing.assert_frame_equal(concurrent, serial, rtol=1e-9)
+
+
+def test_metrics_are_cached_one_by_one(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DATA_FOLDER', str(tmp_path))
+    instrument.enable()
+    instrument.reset()
+
+    def counters():
+        report = instrument.report()['counters']
+        return {name: report.get(f"cache.{name}", 0) for name in ('hits', 'misses')}
+
+    # the graph arrays are cached along with the metrics
+    entries = len(ALL_METRICS) + 1
+    try:
+        first = calculate_metrics(dataset, 'length', 'approx', epsilon=0.05, closeness_epsilon=0.3)
+        assert counters() == {'hits': 0, 'misses': entries}
+        again = calculate_metrics(dataset, 'length', 'approx', epsilon=0.05, closeness_epsilon=0.3)
+        assert counters() == {'hits': entries, 'misses': entries}
+        pd.testing.assert_frame_equal(again, first)
+        assert again.attrs['run'] == first.attrs['run']
+
+        # only betweenness and closeness depend on epsilon, so only they are computed again
+        calculate_metrics(dataset, 'length', 'approx', epsilon=0.04, closeness_epsilon=0.3)
+        assert counters() == {'hits': 2 * entries - 2, 'misses': entries + 2}
+    finally:
+        instrument.disable()
+        instrument.reset()
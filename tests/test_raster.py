@@ -0,0 +1,20 @@
+import numpy as np
+
+from graph.raster import Canvas, mercator
+
+
+def test_fit_draws_every_node(dataset):
+    canvas = Canvas.fit(dataset, 64)
+    x, y = mercator(dataset.node_column('x'), dataset.node_column('y'))
+    canvas.points(x, y)
+    assert canvas.counts.sum() == dataset.node_count
+    grid = canvas.counts.reshape(canvas.height, canvas.width)
+    assert grid[:, -1].any() and grid[-1, :].any()
+
+
+def test_points_on_the_bounds_land_in_the_edge_pixels():
+    canvas = Canvas(4, 2, (0.0, 0.0, 1.0, 1.0))
+    canvas.points(np.array([0.0, 1.0, 1.0, 1.5]), np.array([0.0, 1.0, 0.0, 0.5]), np.array([1.0, 2.0, 3.0, 4.0]))
+    grid = canvas.values.reshape(2, 4)
+    assert grid[0, 0] == 1 and grid[1, 3] == 2 and grid[0, 3] == 3
+    assert canvas.counts.sum() == 3
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from data import read_geo
+from data.dataset import read_edge_table, read_node_table
+
+
+def _bbox(city):
+    nodes = pd.read_csv(city['nodes'], usecols=['y', 'x'])
+    return (nodes['y'].quantile(0.2), nodes['y'].quantile(0.7), nodes['x'].quantile(0.3), nodes['x'].quantile(0.9))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_chunked_read_matches_whole_read(city, compact):
+    bbox = _bbox(city)
+    nodes = read_node_table(city['nodes'], bbox, chunksize=None, compact=compact)
+    chunked_nodes = read_node_table(city['nodes'], bbox, chunksize=97, compact=compact)
+    assert 0 < len(nodes) < len(pd.read_csv(city['nodes'], usecols=['osmid']))
+    pd.testing.assert_frame_equal(chunked_nodes, nodes)
+
+    edges = read_edge_table(city['edges'], nodes.index, chunksize=None, compact=compact)
+    chunked_edges = read_edge_table(city['edges'], nodes.index, chunksize=97, compact=compact)
+    assert len(edges) > 0
+    pd.testing.assert_frame_equal(chunked_edges, edges)
+
+
+def test_chunks_inferred_differently_are_read_as_text(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text('id,value,width\n1,10,2.5\n2,11,3\n3,12,x\n4,wide,4\n')
+    whole = read_geo(str(path), 'id')
+    chunked = read_geo(str(path), 'id', chunksize=2)
+    assert list(chunked['value']) == list(whole['value']) == ['10', '11', '12', 'wide']
+    assert list(chunked['width']) == list(whole['width']) == ['2.5', '3', 'x', '4']
@@ -0,0 +1,69 @@
+import json
+import math
+
+import matplotlib.colors as mcolors
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.cm import ScalarMappable
+
+from data.traffic import TrafficSet
+from graph.road_network import _traffic_layer, colormap_array, draw_node_traffic_map, render_traffic_maps
+
+JOBS = [('AADT', 2014), ('AADT', 'current'), ('AAWDT', 2020)]
+
+
+@pytest.fixture(scope='module')
+def traffic(city):
+    return TrafficSet(city['traffic'])
+
+
+def _read(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('geojson', [False, True])
+def test_parallel_rendering_gives_the_same_bytes(dataset, traffic, tmp_path, geojson):
+    serial = render_traffic_maps(dataset, traffic, JOBS, str(tmp_path / 'serial'), processes=1, geojson=geojson)
+    parallel = render_traffic_maps(dataset, traffic, JOBS, str(tmp_path / 'parallel'), processes=2,
+                                   geojson=geojson)
+    assert len(serial) == len(parallel) == len(JOBS)
+    for one, other in zip(serial, parallel):
+        assert _read(one) == _read(other)
+
+    # and the same as drawing every map on its own
+    single = tmp_path / 'single.html'
+    draw_node_traffic_map(dataset, traffic.node_traffic('AADT', 2014), geojson=geojson).save(str(single))
+    assert _read(single) == _read(serial[0])
+
+
+def _scalar_colormap(value: float, low: float, high: float) -> str:
+    """The color of one value as computed before the lookup table."""
+    normalized = (math.sqrt(value) - math.sqrt(low)) / (math.sqrt(high) - math.sqrt(low))
+    normalized = max(0, min(1, normalized))
+    mappable = ScalarMappable(cmap=plt.get_cmap('RdYlGn'), norm=mcolors.Normalize(vmin=0, vmax=1))
+    return mcolors.rgb2hex(mappable.to_rgba(1 - normalized))
+
+
+def test_layer_styles_match_the_circle_colors(tmp_path):
+    ids = np.arange(6, dtype=np.int64) + 100
+    lats, lons = np.linspace(39.2, 39.3, 6), np.linspace(-76.7, -76.5, 6)
+    values = np.array([0.0, 12.0, 250.0, 999.5, 4000.0, 16000.0])
+    low, high = float(values.min()), float(values.max())
+    expected = [_scalar_colormap(value, low, high) for value in values]
+    sweep = np.linspace(low, high, 2001)
+    assert list(colormap_array(sweep, low, high)) == [_scalar_colormap(value, low, high) for value in sweep]
+
+    data_file = tmp_path / 'layer.geojson'
+    for layer in (_traffic_layer(ids, lats, lons, values, low, high),
+                  _traffic_layer(ids, lats, lons, values, low, high, str(data_file))):
+        if layer.embed:
+            features = layer.data['features']
+        else:
+            with open(data_file, encoding='utf-8') as f:
+                features = json.load(f)['features']
+        assert [feature['properties']['style']['color'] for feature in features] == expected
+        assert [feature['properties']['style']['opacity'] for feature in features] == [0.3] + [0.8] * 5
+        assert [feature['properties']['traffic'] for feature in features] == [round(value) for value in values]
+        assert [feature['geometry']['coordinates'] for feature in features] == np.column_stack([lons, lats]).tolist()
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from scipy.sparse import csgraph
+
+from model.routing import Router, contract_chains
+from model.scenario import weight_matrix
+
+
+def _dijkstra(dataset, weights, origins, destinations, directed=True):
+    """Plain Dijkstra on the whole network, one arc per edge row."""
+    adjacency = dataset.adjacency
+    matrix = weight_matrix(dataset.node_count, adjacency.arc_src, adjacency.arc_dst,
+                           weights[adjacency.arc_edge], directed)
+    return csgraph.dijkstra(matrix, directed=True, indices=origins)[:, destinations]
+
+
+@pytest.fixture(scope='module')
+def nodes(dataset):
+    rng = np.random.default_rng(0)
+    return rng.choice(dataset.node_count, 30, replace=False), rng.choice(dataset.node_count, 40, replace=False)
+
+
+@pytest.mark.parametrize('directed', [True, False])
+def test_od_matrix_matches_dijkstra(dataset, nodes, directed):
+    origins, destinations = nodes
+    router = Router(dataset, directed=directed, cache=False)
+    assert router.core_size < dataset.node_count
+    expected = _dijkstra(dataset, dataset.edge_travel_times(), origins, destinations, directed)
+    np.testing.assert_allclose(router.od_matrix(origins, destinations), expected, rtol=1e-9)
+
+
+def test_contract_chains_keeps_core_distances():
+    # a ring 0 - 1 - 2 - 3 - 0 with a spur 3 - 4, keeping 0 and 2
+    src = np.array([0, 1, 2, 3, 3])
+    dst = np.array([1, 2, 3, 0, 4])
+    weights = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    src, dst, weights = np.concatenate([src, dst]), np.concatenate([dst, src]), np.concatenate([weights] * 2)
+    core, core_src, core_dst, core_weights = contract_chains(5, src, dst, weights, keep=np.array([0, 2]))
+    assert core.tolist() == [0, 2]
+    matrix = weight_matrix(len(core), core_src, core_dst, core_weights, directed=True)
+    assert csgraph.dijkstra(matrix, directed=True, indices=[0])[0].tolist() == [0.0, 3.0]
+
+
+@pytest.mark.parametrize('directed', [True, False])
+def test_single_road_closure_takes_effect(dataset, nodes, directed):
+    origins, destinations = nodes
+    router = Router(dataset, directed=directed, cache=False)
+    before = router.od_matrix(origins, destinations)
+
+    # close the first leg of the shortest path between an origin and a destination
+    adjacency = dataset.adjacency
+    matrix = weight_matrix(dataset.node_count, adjacency.arc_src, adjacency.arc_dst,
+                           dataset.edge_travel_times()[adjacency.arc_edge], directed)
+    _, predecessors = csgraph.dijkstra(matrix, directed=True, indices=origins[0], return_predecessors=True)
+    node = destinations[np.argmax(np.where(np.isfinite(before[0]), before[0], -1))]
+    while predecessors[node] != origins[0]:
+        node = predecessors[node]
+    out = adjacency.out_arcs(origins[0])
+    closed = adjacency.arc_edge[out[adjacency.arc_dst[out] == node]]
+
+    closed_router = router.reweight(closed, [np.inf])
+    after = closed_router.od_matrix(origins, destinations)
+    assert (after != before).any()
+
+    weights = dataset.edge_travel_times().copy()
+    reverse = dataset.reverse_edges()[closed]
+    weights[closed] = np.inf
+    if not directed:
+        weights[reverse[reverse >= 0]] = np.inf
+    np.testing.assert_allclose(after, _dijkstra(dataset, weights, origins, destinations, directed), rtol=1e-9)
+    # the migrated matrix equals a fresh query
+    np.testing.assert_allclose(after, closed_router._query(origins, destinations), rtol=1e-9)
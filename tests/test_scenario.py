@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from scipy.sparse import csgraph
+
+from model.metrics import graph_arrays
+from model.scenario import (Scenario, ScenarioEngine, _closeness, base_matrix, scenario_arrays, scenario_matrix,
+                            shortest_path_forest, weight_matrix)
+
+
+@pytest.fixture(scope='module')
+def engine(dataset):
+    return ScenarioEngine(dataset, cache=False)
+
+
+def _two_way_key(dataset, position=0):
+    """(u, v, key) of a two-way road row."""
+    edge = np.flatnonzero(dataset.reverse_edges() >= 0)[position]
+    return tuple(dataset.table_edges.index[edge])
+
+
+def _applied_matrix(dataset, scenario, directed=False):
+    arrays = graph_arrays(dataset, 'travel_time')
+    src, dst, weights = scenario.apply(arrays['src'], arrays['dst'], arrays['weight'],
+                                       dataset.adjacency.arc_edge, 'travel_time', directed)
+    return weight_matrix(dataset.node_count, src, dst, weights, directed), src, dst
+
+
+def _full_recompute(dataset, scenario):
+    matrix, _, _ = _applied_matrix(dataset, scenario)
+    dist, dependency = shortest_path_forest(matrix, np.arange(dataset.node_count))
+    n = dataset.node_count
+    return dependency.sum(axis=0) / ((n - 1) * (n - 2)), _closeness(dist)
+
+
+def test_reverse_edges_pair_opposite_rows(dataset):
+    reverse = dataset.reverse_edges()
+    paired = np.flatnonzero(reverse >= 0)
+    assert len(paired) > 0
+    assert np.array_equal(reverse[reverse[paired]], paired)
+    u, v = dataset.edge_column('u_index'), dataset.edge_column('v_index')
+    assert np.array_equal(u[paired], v[reverse[paired]])
+    assert not dataset.edge_column('oneway')[paired].any()
+    assert (reverse[dataset.edge_column('oneway')] == -1).all()
+
+
+def test_single_road_closure_changes_result(dataset, engine):
+    key = _two_way_key(dataset)
+    scenario = Scenario('closure').remove(dataset, [key])
+    assert len(scenario.removed) == 2
+
+    result = engine.evaluate(scenario)
+    assert result.attrs['scenario']['affected_sources'] > 0
+    assert result[('degree_centrality', 'delta')].abs().sum() > 0
+    assert result[('closeness_centrality', 'delta')].abs().sum() > 0
+
+
+def test_one_direction_of_undirected_road_is_no_change(dataset, engine):
+    scenario = Scenario().remove(dataset, [_two_way_key(dataset)], both_directions=False)
+    result = engine.evaluate(scenario)
+    assert result.attrs['scenario']['affected_sources'] == 0
+
+
+def test_incremental_matches_full_recompute(dataset, engine):
+    nodes = dataset.node_column('id')
+    scenario = (Scenario('mixed')
+                .remove(dataset, [_two_way_key(dataset, 0), _two_way_key(dataset, 40)])
+                .add(dataset, int(nodes[0]), int(nodes[-1])))
+    result = engine.evaluate(scenario)
+    betweenness, closeness = _full_recompute(dataset, scenario)
+    np.testing.assert_allclose(result[('betweenness_centrality', 'scenario')], betweenness, atol=1e-12)
+    np.testing.assert_allclose(result[('closeness_centrality', 'scenario')], closeness, atol=1e-12)
+    _, src, dst = _applied_matrix(dataset, scenario)
+    degree = np.bincount(src, minlength=dataset.node_count) + np.bincount(dst, minlength=dataset.node_count)
+    np.testing.assert_array_equal(result[('degree_centrality', 'scenario')], degree)
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_scenario_matrix_matches_applied_arcs(dataset, directed):
+    arrays = graph_arrays(dataset, 'travel_time')
+    shared = scenario_arrays(dataset.node_count, arrays['src'], arrays['dst'], arrays['weight'],
+                             dataset.adjacency.arc_edge, directed)
+    base = weight_matrix(dataset.node_count, arrays['src'], arrays['dst'], arrays['weight'], directed)
+    assert (base_matrix(shared, dataset.node_count) != base).nnz == 0
+
+    nodes = dataset.node_column('id')
+    u, v = arrays['src'][7], arrays['dst'][7]
+    scenario = (Scenario('mixed')
+                .remove(dataset, [_two_way_key(dataset, i) for i in (0, 5, 40)])
+                .add(dataset, int(nodes[u]), int(nodes[v]), length=1.0)  # shorter arc on an existing pair
+                .add(dataset, int(nodes[0]), int(nodes[-1]), oneway=True))
+    matrix = scenario_matrix(shared, dataset.node_count, scenario, 'travel_time', directed)
+    expected, _, _ = _applied_matrix(dataset, scenario, directed)
+    sources = np.arange(0, dataset.node_count, 97)
+    np.testing.assert_allclose(csgraph.dijkstra(matrix, directed=directed, indices=sources),
+                               csgraph.dijkstra(expected, directed=directed, indices=sources))
+
+    closure = scenario_matrix(shared, dataset.node_count, Scenario().remove(dataset, [_two_way_key(dataset)]),
+                              'travel_time', directed)
+    assert np.shares_memory(closure.indices, shared['indices'])
+    assert not np.shares_memory(closure.data, shared['data'])
+
+
+def test_remove_unknown_edge_raises(dataset):
+    with pytest.raises(KeyError):
+        Scenario().remove(dataset, [(-1, -2, 0)])
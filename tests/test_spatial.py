@@ -0,0 +1,46 @@
+import numpy as np
+import shapely
+
+from data.geometry import haversine
+from data.transit import TransitSet
+
+
+def _points(dataset, count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    x, y = dataset.node_column('x'), dataset.node_column('y')
+    return rng.uniform(x.min(), x.max(), count), rng.uniform(y.min(), y.max(), count)
+
+
+def test_nearest_nodes_match_a_brute_force_search(dataset):
+    lon, lat = _points(dataset)
+    index, distance = dataset.spatial.nearest_nodes(lon, lat)
+    x, y = dataset.node_column('x'), dataset.node_column('y')
+    meters = haversine(lon[:, None], lat[:, None], x[None, :], y[None, :])
+    best = meters.min(axis=1)
+    # the snapped node is the nearest one up to ties within a millimeter,
+    # its planar distance within the error of the local projection
+    assert np.all(meters[np.arange(len(lon)), index] <= best + 1e-3)
+    assert np.allclose(distance, best, rtol=5e-3)
+
+
+def test_nearest_edges_match_a_brute_force_search(dataset):
+    lon, lat = _points(dataset, 50)
+    index, distance = dataset.spatial.nearest_edges(lon, lat)
+    spatial = dataset.spatial
+    coordinates = dataset.edge_geometry.coordinates
+    lines = dataset.edge_geometry.to_shapely(spatial.project(coordinates[:, 0], coordinates[:, 1]))
+    points = shapely.points(spatial.project(lon, lat))
+    meters = shapely.distance(points[:, None], lines[None, :])
+    best = meters.min(axis=1)
+    assert np.allclose(distance, best)
+    assert np.allclose(meters[np.arange(len(lon)), index], best)
+
+
+def test_snapped_stops_are_the_nearest_nodes(city, dataset):
+    transit = TransitSet(city['stops'], city['routes'])
+    transit.snap(dataset)
+    stops = transit.table_bus_stops
+    x, y = dataset.node_column('x'), dataset.node_column('y')
+    meters = haversine(stops['X'].to_numpy()[:, None], stops['Y'].to_numpy()[:, None], x[None, :], y[None, :])
+    snapped = dataset.node_indexer(stops['node'])
+    assert np.all(meters[np.arange(len(stops)), snapped] <= meters.min(axis=1) + 1e-3)
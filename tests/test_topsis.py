@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.metrics import (_topsis_matrix, dirichlet_weights, topsis_batch, topsis_evaluate, topsis_sweep,
+                           topsis_top_k)
+
+
+@pytest.fixture(scope='module')
+def metrics():
+    rng = np.random.default_rng(3)
+    columns = ['degree_centrality', 'betweenness_centrality', 'closeness_centrality', 'pagerank']
+    values = rng.gamma(2.0, size=(500, len(columns)))
+    values[::50, 1] = 0  # nodes on no shortest path
+    return pd.DataFrame(values, columns=columns, index=pd.Index(rng.permutation(500) + 1000, name='node'))
+
+
+def test_batch_matches_evaluate(metrics):
+    columns, norm_data = _topsis_matrix(metrics)
+    weights = dirichlet_weights({column: 1.0 for column in columns}, 20, seed=1)
+    scores = topsis_batch(norm_data, weights[columns].to_numpy())
+    for row, vector in zip(scores, weights.to_dict('records')):
+        np.testing.assert_allclose(row, topsis_evaluate(metrics, vector, as_array=True), rtol=1e-10, atol=1e-12)
+
+
+def test_sweep_ranks(metrics):
+    columns = list(metrics.columns)
+    weights = dirichlet_weights({column: 1.0 for column in columns}, 30, seed=2)
+    result = topsis_sweep(metrics, weights, top=10)
+    assert result['mean_rank'].is_monotonic_increasing
+    assert ((result['best_rank'] <= result['mean_rank']) & (result['mean_rank'] <= result['worst_rank'])).all()
+    assert result['top_frequency'].sum() == pytest.approx(10)
+
+    first = topsis_evaluate(metrics, weights.iloc[0].to_dict(), as_array=True)
+    single = topsis_sweep(metrics, weights.iloc[:1], top=10)
+    expected = metrics.index[np.argsort(-first, kind='stable')]
+    assert list(single.index) == list(expected)
+
+
+def test_sweep_does_not_depend_on_chunks(metrics):
+    weights = dirichlet_weights({column: 1.0 for column in metrics.columns}, 25, seed=4)
+    pd.testing.assert_frame_equal(topsis_sweep(metrics, weights, chunk_size=3), topsis_sweep(metrics, weights))
+
+
+def test_sweep_rejects_negative_weights(metrics):
+    with pytest.raises(ValueError):
+        topsis_sweep(metrics, -np.ones((1, metrics.shape[1])))
+
+
+@pytest.mark.parametrize('k', [1, 50, 500, 800])
+def test_top_k_matches_full_sort(metrics, k):
+    scores = topsis_evaluate(metrics)
+    expected = pd.Series(scores).sort_values(ascending=False, kind='stable').head(k)
+    result = topsis_top_k(metrics, k=k)
+    assert list(result['node']) == list(expected.index)
+    np.testing.assert_array_equal(result['score'], expected.to_numpy())
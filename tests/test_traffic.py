@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from data.traffic import TRAFFIC_METRICS, TRAFFIC_YEARS, TrafficSet, _load_traffic_data
+
+
+@pytest.fixture(scope='module')
+def traffic(city):
+    data = _load_traffic_data(city['traffic'])
+    # stations without traffic in some years are left out of those years
+    data.loc[data.index[::9], 'AADT 2016'] = 0
+    data.loc[data.index[::11], 'AAWDT (Current)'] = 0
+    return TrafficSet.from_table(data)
+
+
+@pytest.mark.parametrize('metric', TRAFFIC_METRICS)
+def test_node_traffic_matches_the_per_node_dict(traffic, metric):
+    for year in TRAFFIC_YEARS:
+        extract = (lambda record: record.aadt(year)) if metric == 'AADT' else (lambda record: record.aawdt(year))
+        expected = traffic.build_node_traffic_dict(extract)
+        node_traffic = traffic.node_traffic(metric, year)
+        assert node_traffic.keys() == expected.keys()
+        assert np.allclose([node_traffic[node] for node in expected], list(expected.values()))
+
+
+def test_unknown_year_is_rejected(traffic):
+    with pytest.raises(ValueError):
+        traffic.node_traffic('AADT', 2013)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.transit import BUS_ROUTE_TYPE_MAPPER, TransitSet
+
+
+@pytest.fixture(scope='module')
+def transit(city):
+    transit = TransitSet(city['stops'], city['routes'])
+    transit.load()
+    return transit
+
+
+def test_compact_mode_reads_the_same_values(city, transit):
+    compact = TransitSet(city['stops'], city['routes'], compact=True)
+    for table, expected in ((compact.table_bus_stops, transit.table_bus_stops),
+                            (compact.table_bus_routes, transit.table_bus_routes)):
+        assert list(table.index.astype(str)) == list(expected.index.astype(str))
+        for name in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[name]):
+                assert np.allclose(table[name].to_numpy(dtype=np.float64), expected[name], rtol=1e-6), name
+            else:
+                assert list(table[name].astype(str)) == list(expected[name].astype(str)), name
+    assert isinstance(compact.table_bus_stops['Mode'].dtype, pd.CategoricalDtype)
+    assert compact.footprint().sum() < transit.footprint().sum()
+
+
+def _serving(stop, route) -> bool:
+    """The per-route scan the index replaced, with the route keys compared as text."""
+    served = stop.routes_served
+    key = str(route.key)
+    return key in served or BUS_ROUTE_TYPE_MAPPER.get(key, key) in served
+
+
+def test_route_index_matches_the_per_route_scan(transit):
+    routes, stops = transit.bus_routes(), transit.bus_stops
+    pairs = 0
+    for route in routes:
+        expected = [stop.id for stop in stops if _serving(stop, route)]
+        assert [stop.id for stop in route.stops] == expected
+        pairs += len(expected)
+    for stop in stops:
+        assert [route.key for route in stop.routes] == [route.key for route in routes if _serving(stop, route)]
+    assert 0 < pairs == len(transit.route_stop_pairs[1])
+
+    riders = pd.Series({stop.id: stop.rider_total for stop in stops})
+    expected = [riders[[stop.id for stop in route.stops]].sum() for route in routes]
+    assert np.allclose(transit.route_ridership(), expected)
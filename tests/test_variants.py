@@ -0,0 +1,98 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import cache, instrument
+from data.dataset import (DRIVE_EXCLUDED_ACCESS, DRIVE_EXCLUDED_HIGHWAYS, DRIVE_EXCLUDED_SERVICES, Dataset,
+                          NetworkView)
+from model.metrics import calculate_metrics
+
+
+@pytest.fixture
+def counters(tmp_path, monkeypatch):
+    """Run against an empty cache folder and return a reader of the cache counters."""
+    monkeypatch.setattr(cache, 'CACHE_DATA_FOLDER', str(tmp_path))
+    instrument.enable()
+    instrument.reset()
+    yield lambda: {name: instrument.report()['counters'].get(f"cache.{name}", 0) for name in ('hits', 'misses')}
+    instrument.disable()
+    instrument.reset()
+
+
+def test_drive_view_filters_the_shared_arrays(dataset):
+    view = dataset.view('drive')
+    assert isinstance(view, NetworkView) and dataset.view('drive') is view
+    assert view.node_column('x') is dataset.node_column('x')
+    mask = dataset.variant_mask('drive')
+    assert 0 < view.edge_count == mask.sum() < dataset.edge_count
+    assert np.array_equal(view.edge_column('u'), dataset.edge_column('u')[mask])
+    highways = set(np.asarray(view.edge_column('highway'), dtype=object))
+    assert not highways & {'footway', 'service'}
+    assert view.fingerprint != dataset.fingerprint
+
+
+def test_unknown_variant_is_rejected(city):
+    with pytest.raises(ValueError):
+        Dataset(bbox=None, cache=False, nodes_file=city['nodes'], edges_file=city['edges'], variant='bike')
+
+
+def test_variants_do_not_evict_each_other(city, counters):
+    for _ in range(2):
+        for variant in ('all', 'drive'):
+            Dataset(bbox=None, nodes_file=city['nodes'], edges_file=city['edges'], variant=variant)
+    assert counters() == {'hits': 4, 'misses': 4}
+
+
+def test_variant_metrics_do_not_evict_each_other(dataset, counters):
+    datasets = [dataset, dataset.view('drive')]
+    for _ in range(2):
+        for network in datasets:
+            calculate_metrics(network, metrics=['degree_centrality'], concurrent=False)
+    # the graph arrays and the metric of both variants, built once each
+    assert counters() == {'hits': 4, 'misses': 4}
+
+
+def _drive_rows(edges: pd.DataFrame) -> np.ndarray:
+    """The rows passing the drive filter, checked one row at a time."""
+    def tokens(value):
+        return set(re.findall(r'[a-z_]+', value)) if isinstance(value, str) else set()
+
+    return np.array([
+        isinstance(row.highway, str) and not tokens(row.highway) & DRIVE_EXCLUDED_HIGHWAYS and
+        not tokens(row.service) & DRIVE_EXCLUDED_SERVICES and not tokens(row.access) & DRIVE_EXCLUDED_ACCESS
+        for row in edges.itertuples()
+    ], dtype=bool)
+
+
+def test_drive_mask_matches_a_row_by_row_filter(city, tmp_path):
+    edges = pd.read_csv(city['edges'], dtype={'highway': object, 'service': object, 'access': object})
+    rows = np.arange(len(edges))
+    edges.loc[rows % 13 == 1, 'highway'] = "['residential', 'footway']"
+    edges.loc[rows % 13 == 2, 'highway'] = "['residential', 'tertiary']"
+    edges.loc[rows % 17 == 3, 'highway'] = np.nan
+    edges.loc[rows % 19 == 4, 'service'] = 'driveway'
+    edges.loc[rows % 19 == 5, 'service'] = "['alley', 'drive-through']"
+    edges.loc[rows % 23 == 6, 'access'] = 'private'
+    edges.loc[rows % 23 == 7, 'access'] = 'destination'
+    edges_file = str(tmp_path / 'edges_all.csv')
+    edges.to_csv(edges_file, index=False)
+
+    dataset = Dataset(bbox=None, cache=False, nodes_file=city['nodes'], edges_file=edges_file)
+    dataset.load()
+    table = dataset.table_edges
+    expected = _drive_rows(table)
+    assert 0 < expected.sum() < len(expected)
+    assert np.array_equal(dataset.variant_mask('drive'), expected)
+
+    view = dataset.view('drive')
+    assert view.table_edges.index.equals(table.index[expected])
+    for name in ('u_index', 'v_index', 'length', 'oneway'):
+        assert np.array_equal(view.edge_column(name), dataset.edge_column(name)[expected]), name
+    lines = dataset.edge_geometry
+    assert np.array_equal(view.edge_geometry.sizes, lines.sizes[expected])
+    assert np.array_equal(view.edge_geometry.coordinates, np.concatenate(
+        [lines.coordinates[lines.offsets[i]:lines.offsets[i + 1]] for i in np.flatnonzero(expected)]))
+    ends = np.concatenate([dataset.edge_column('u_index')[expected], dataset.edge_column('v_index')[expected]])
+    assert np.array_equal(view.node_mask, np.isin(np.arange(view.node_count), ends))